@@ -0,0 +1,769 @@
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from AtlasComposer import AtlasComposer
+from AtlasPacker import (
+    DEFAULT_MAX_SIZE,
+    DEFAULT_PADDING,
+    PACK_MAXRECTS,
+    PACK_NOTES,
+    PACK_SKYLINE,
+    build_pack_manifest,
+    compose_page,
+    occupancy,
+    pack_paths,
+    page_files,
+)
+from AtlasPages import (
+    build_manifest,
+    manifest_path,
+    page_suffix,
+    remove_files,
+    split_pages,
+    stale_pages,
+    write_manifest,
+)
+from FolderWatcher import DEBOUNCE, FolderWatcher
+from FrameReader import DecodeStats, set_decode_workers
+from ImageCache import image_cache, load_image
+from ImageIndex import IMAGE_EXTS, image_index, list_images, natural_key
+from AtlasEngine import (
+    CHANNEL_RES_MODES,
+    GRID_RES_MODES,
+    RES_DOWN_X2,
+    RES_DOWN_X4,
+    RES_KEEP,
+    RES_MERGE,
+    RES_MERGE_2X2,
+    RES_MERGE_X2,
+    RES_SINGLE,
+    build_channel_atlas,
+    build_merge_atlas,
+    build_single_atlas,
+    needs_streaming,
+    write_merge_atlas,
+    write_single_atlas,
+)
+from AtlasWriter import strip_format
+from BlockCompress import TEXTURE_FORMATS, TEXTURE_NOTES
+from Encoders import (
+    ENCODE_BALANCED,
+    ENCODE_FAST,
+    ENCODE_NOTES,
+    ENCODE_SMALLEST,
+    HAS_WEBP,
+    EncodeResult,
+    compress_level,
+    encode_many,
+)
+from Ktx2Writer import HAS_ZSTD
+from Resample import (
+    RESAMPLE_AUTO,
+    RESAMPLE_BICUBIC,
+    RESAMPLE_BILINEAR,
+    RESAMPLE_BOX,
+    RESAMPLE_LANCZOS,
+    RESAMPLE_NOTES,
+    set_resize_workers,
+)
+
+# 命令行批处理：python -m TextureToolkit merge|single|pack|rgba ...
+# merge --overflow pages 帧数超过 行数x列数 时分成多页，每页是一个独立任务，全部完成后写清单
+# pack 尺寸不同的图片紧密排列（MaxRects/Skyline，可旋转、2 的幂），写出带 UV 的清单
+# merge --watch 合成后继续监视输入文件夹，文件变化时只重绘变化的格子并重新写出
+
+# 命令行里可以用英文别名代替界面上的分辨率选项
+# 缩放方式的英文别名
+RESAMPLE_ALIASES = {
+    "auto": RESAMPLE_AUTO,
+    "box": RESAMPLE_BOX,
+    "bilinear": RESAMPLE_BILINEAR,
+    "bicubic": RESAMPLE_BICUBIC,
+    "lanczos": RESAMPLE_LANCZOS,
+}
+# 排列算法的英文别名
+PACK_ALIASES = {"maxrects": PACK_MAXRECTS, "skyline": PACK_SKYLINE}
+# 编码预设的英文别名
+PRESET_ALIASES = {
+    "fast": ENCODE_FAST,
+    "balanced": ENCODE_BALANCED,
+    "smallest": ENCODE_SMALLEST,
+}
+OUTPUT_FORMATS = ["png", "tiff", "jpeg", "bmp", "tga", "dds", "ktx2"]
+if HAS_WEBP:
+    OUTPUT_FORMATS.insert(2, "webp")
+RES_ALIASES = {
+    "keep": RES_KEEP,
+    "merge": RES_MERGE,
+    "down2": RES_DOWN_X2,
+    "down4": RES_DOWN_X4,
+    "single": RES_SINGLE,
+    "merge2": RES_MERGE_X2,
+}
+
+
+def expand_inputs(patterns):
+    # 每个参数可以是文件夹、图片或通配符，返回 (文件夹列表, 图片列表)
+    folders, files = [], []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern), key=natural_key) or [pattern]
+        for path in matches:
+            if os.path.isdir(path):
+                folders.append(path)
+            elif path.lower().endswith(IMAGE_EXTS) and os.path.isfile(path):
+                files.append(path)
+            else:
+                print(f"跳过: {path}", file=sys.stderr)
+    return folders, files
+
+
+def parse_color(text):
+    text = text.strip()
+    if text.startswith("#"):
+        text = text[1:]
+        values = [int(text[i : i + 2], 16) for i in range(0, len(text), 2)]
+    else:
+        values = [int(v) for v in text.split(",")]
+    if len(values) == 3:
+        values.append(255)
+    if len(values) != 4:
+        raise argparse.ArgumentTypeError(f"无法解析颜色: {text}")
+    return tuple(values)
+
+
+def parse_res(text, choices):
+    mode = RES_ALIASES.get(text, text)
+    if mode == RES_MERGE and RES_MERGE not in choices:
+        mode = RES_MERGE_2X2
+    if mode not in choices:
+        raise argparse.ArgumentTypeError(f"不支持的输出分辨率: {text}")
+    return mode
+
+
+def parse_formats(text):
+    # 逗号分隔的多个输出格式，同一张图在多个线程里同时编码
+    formats = []
+    for fmt in text.lower().split(","):
+        fmt = {"jpg": "jpeg", "tif": "tiff"}.get(fmt.strip(), fmt.strip())
+        if fmt not in OUTPUT_FORMATS:
+            raise argparse.ArgumentTypeError(f"不支持的输出格式: {fmt}")
+        if fmt.upper() not in formats:
+            formats.append(fmt.upper())
+    return formats
+
+
+def parse_mips(text):
+    # 级数（包括原图），full 表示一直缩小到 1x1
+    if text.lower() in ("full", "all"):
+        return 0
+    levels = int(text)
+    if levels < 1:
+        raise argparse.ArgumentTypeError(f"mip 级数至少为 1: {text}")
+    return levels
+
+
+def output_path(out_dir, name, suffix, fmt):
+    return os.path.join(out_dir, f"{name}{suffix}.{fmt.lower()}")
+
+
+def use_streaming(job):
+    # --stream 强制按行带写出；否则画布超过阈值且格式支持时自动使用
+    # 多级分辨率和多种格式都需要整张图，超大画布自动放在临时文件映射里
+    whole = job.get("mips") is not None or len(job["targets"]) > 1
+    if job.get("stream"):
+        if whole:
+            raise ValueError("--stream 不能与 --mips 或多种输出格式同时使用")
+        if strip_format(job["output"], job["format"]) is None:
+            raise ValueError("按行带写出只支持 PNG 或 TIFF")
+        return True
+    if whole:
+        return False
+    if strip_format(job["output"], job["format"]) is None:
+        return False
+    info = image_index().get(job["inputs"][0])
+    if info is None:
+        return False
+    return needs_streaming(
+        info.width, info.height, job["rows"], job["cols"], job["res"]
+    )
+
+
+def summary(stats):
+    # DecodeStats 带锁不能跨进程传递，只传文字
+    return stats.summary() if stats is not None else None
+
+
+def run_job(job, composer=None):
+    # 在子进程中执行一个合成任务；监视模式下在主进程中执行，composer 保留上次的图集
+    # 返回 (输出路径, 输出尺寸, 耗时, 解码统计文字, 每种格式的编码统计文字)
+    start = time.perf_counter()
+    kind = job["kind"]
+    if kind == "pack":
+        return run_pack_job(job, start)
+    stats = DecodeStats() if kind == "merge" else None
+    if kind != "rgba" and use_streaming(job):
+        # 按行带合成并写出，内存只占一行格子
+        if kind == "merge":
+            size = write_merge_atlas(
+                job["output"],
+                job["inputs"],
+                job["rows"],
+                job["cols"],
+                job["res"],
+                job["fill"],
+                job["format"],
+                stats=stats,
+                policy=job["resample"],
+                compress_level=compress_level(job["preset"]),
+            )
+        else:
+            size = write_single_atlas(
+                job["output"],
+                load_image(job["inputs"][0]),
+                job["rows"],
+                job["cols"],
+                job["res"],
+                job["fill"],
+                job["repeat"],
+                job["format"],
+                policy=job["resample"],
+                compress_level=compress_level(job["preset"]),
+            )
+        seconds = time.perf_counter() - start
+        result = EncodeResult(
+            job["format"], job["output"], os.path.getsize(job["output"]), seconds
+        )
+        return job["output"], size, seconds, summary(stats), [result.summary()]
+    decode = None
+    if kind == "merge" and composer is not None:
+        # 只重绘文件有变化的格子
+        atlas = composer.compose(
+            job["inputs"],
+            job["rows"],
+            job["cols"],
+            job["res"],
+            job["fill"],
+            job["resample"],
+            stats=stats,
+        )
+        decode = f"{composer.summary()}；{stats.summary()}"
+    elif kind == "merge":
+        atlas = build_merge_atlas(
+            job["inputs"][: job["rows"] * job["cols"]],
+            job["rows"],
+            job["cols"],
+            job["res"],
+            job["fill"],
+            stats=stats,
+            policy=job["resample"],
+        )
+    elif kind == "single":
+        atlas = build_single_atlas(
+            load_image(job["inputs"][0]),
+            job["rows"],
+            job["cols"],
+            job["res"],
+            job["fill"],
+            repeat=job["repeat"],
+            policy=job["resample"],
+        )
+    else:
+        atlas = build_channel_atlas(
+            load_image(job["inputs"][0]), job["res"], job["resample"]
+        )
+    results = encode_job(atlas, job, job["targets"])
+    out = job["output"]
+    if len(results) > 1:
+        out = f"{out} 等 {len(results)} 种格式"
+    return (
+        out,
+        atlas.size,
+        time.perf_counter() - start,
+        decode or summary(stats),
+        [r.summary() for r in results],
+    )
+
+
+def encode_job(img, job, targets):
+    # 同一张图在多个线程里编码成所有输出格式，mip 链只生成一次
+    return encode_many(
+        img,
+        targets,
+        job["preset"],
+        mips=job["mips"],
+        container=job["mip_container"],
+        gpu_format=job["gpu_format"],
+        zstd=job["zstd"],
+        srgb=job["srgb"],
+        policy=job["resample"],
+    )
+
+
+def run_pack_job(job, start):
+    # 紧密排列：排列只用元数据里的尺寸，逐页合成和编码，全部写完后写清单
+    stats = DecodeStats()
+    inputs = job["inputs"]
+    bins = pack_paths(inputs, **job["pack"])
+    # 每页的 [(路径, 格式)]，只有一页时不加页码
+    pages = [[] for _ in bins]
+    for path, fmt in job["targets"]:
+        for page, file in enumerate(page_files(path, bins)):
+            pages[page].append((file, fmt))
+    results = []
+    for packed, targets in zip(bins, pages):
+        results += encode_job(compose_page(inputs, packed, stats=stats), job, targets)
+    manifest = manifest_path(job["output"])
+    write_manifest(
+        manifest,
+        build_pack_manifest(
+            manifest,
+            inputs,
+            bins,
+            [[path for path, _ in targets] for targets in pages],
+            job["pack"],
+        ),
+    )
+    out = job["output"]
+    if len(bins) > 1:
+        out = f"{out} 等 {len(bins)} 页"
+    decode = (
+        f"{len(inputs)} 张，利用率 {occupancy(inputs, bins):.0%}，"
+        f"清单 {os.path.basename(manifest)}；{stats.summary()}"
+    )
+    return (
+        out,
+        bins[0].size,
+        time.perf_counter() - start,
+        decode,
+        [r.summary() for r in results],
+    )
+
+
+def make_job(base, args, inputs, name, suffix, folder=None):
+    # folder 为输入文件夹，监视模式下文件增删后重新列出图片
+    targets = [
+        (output_path(args.output, name, suffix, "jpg" if fmt == "JPEG" else fmt), fmt)
+        for fmt in args.format
+    ]
+    return dict(
+        base, inputs=inputs, output=targets[0][0], targets=targets, folder=folder
+    )
+
+
+def make_jobs(args):
+    os.makedirs(args.output, exist_ok=True)
+    folders, files = expand_inputs(args.inputs)
+    base = {
+        "kind": args.command,
+        "res": args.res,
+        "resample": args.resample,
+        "format": args.format[0],
+        "preset": args.preset,
+        "mips": args.mips,
+        "mip_container": args.mip_container,
+        "gpu_format": args.gpu_format,
+        "zstd": args.zstd,
+        "srgb": args.srgb,
+    }
+    jobs = []
+    if args.command == "merge":
+        base.update(rows=args.rows, cols=args.cols, fill=args.fill, stream=args.stream)
+    elif args.command == "pack":
+        base["pack"] = dict(
+            max_size=args.max_size,
+            power_of_two=args.pot,
+            rotate=args.rotate,
+            padding=args.padding,
+            algorithm=PACK_ALIASES[args.algorithm],
+        )
+    if args.command in ("merge", "pack"):
+        sequences = [
+            (os.path.basename(os.path.normpath(f)), list_images(f), f) for f in folders
+        ]
+        if files:
+            # 直接给出的图片合成为一张
+            name = os.path.basename(os.path.dirname(os.path.abspath(files[0])))
+            sequences.append((name, files, None))
+        for name, inputs, folder in sequences:
+            if not inputs:
+                print(f"跳过空文件夹: {name}", file=sys.stderr)
+                continue
+            if args.command == "pack":
+                jobs.append(make_job(base, args, inputs, name, "_pack", folder))
+                continue
+            pages = split_pages(inputs, args.rows, args.cols)
+            if args.overflow != "pages" or len(pages) == 1:
+                jobs.append(make_job(base, args, inputs, name, "_atlas", folder))
+                continue
+            # 每页一个任务，分给多个进程同时合成和编码
+            manifest = manifest_path(output_path(args.output, name, "_atlas", "json"))
+            for page, chunk in enumerate(pages):
+                suffix = "_atlas" + page_suffix(page, len(pages))
+                job = make_job(base, args, chunk, name, suffix, folder)
+                job.update(manifest=manifest, page=page)
+                jobs.append(job)
+    else:
+        if args.command == "single":
+            base.update(
+                rows=args.rows,
+                cols=args.cols,
+                fill=args.fill,
+                repeat=args.mode == "repeat",
+                stream=args.stream,
+            )
+        suffix = "_atlas" if args.command == "single" else "_rgba"
+        for folder in folders:
+            files.extend(list_images(folder))
+        for path in files:
+            name = os.path.splitext(os.path.basename(path))[0]
+            jobs.append(make_job(base, args, [path], name, suffix))
+    return jobs
+
+
+def init_worker(cache_mb, decode_threads=1):
+    image_cache.set_budget_mb(cache_mb)
+    # 解码和缩放共用同样的线程数，避免进程数 x 线程数 超过核心数
+    set_decode_workers(decode_threads)
+    set_resize_workers(decode_threads)
+
+
+def run_jobs(jobs, workers, cache_mb=0, decode_threads=1):
+    failed = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=init_worker,
+        initargs=(cache_mb, decode_threads),
+    ) as pool:
+        futures = {pool.submit(run_job, job): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                result = future.result()
+                job["size"] = result[1]
+                print_result(*result)
+            except Exception as e:
+                failed += 1
+                print(f"失败 {job['output']}: {e}", file=sys.stderr)
+    elapsed = time.perf_counter() - start
+    print(f"完成 {len(jobs) - failed}/{len(jobs)} 个任务，用时 {elapsed:.2f}s")
+    return failed
+
+
+def write_manifests(jobs):
+    # 分页任务全部成功后写清单：每帧在哪一页、哪一格以及输出图中的像素范围
+    groups = {}
+    for job in jobs:
+        if job.get("manifest"):
+            groups.setdefault(job["manifest"], []).append(job)
+    failed = 0
+    for manifest, pages in groups.items():
+        pages.sort(key=lambda job: job["page"])
+        if any("size" not in job for job in pages):
+            failed += 1
+            print(f"有页面失败，不写清单: {manifest}", file=sys.stderr)
+            continue
+        page_manifest = build_manifest(
+            manifest,
+            [job["inputs"] for job in pages],
+            pages[0]["rows"],
+            pages[0]["cols"],
+            [[path for path, _ in job["targets"]] for job in pages],
+            [job["size"] for job in pages],
+        )
+        # 上次清单里有、这次没有的页（上次页数更多时留下的）在写出新清单后删除
+        stale = stale_pages(manifest, page_manifest)
+        write_manifest(manifest, page_manifest)
+        removed = remove_files(stale)
+        print(f"已写出清单 {manifest}（{len(pages)} 页）")
+        if removed:
+            print(f"已删除上次留下的 {len(removed)} 个页文件")
+    return failed
+
+
+def print_result(out, size, seconds, decode, encoded):
+    print(f"已保存 {out} ({size[0]}x{size[1]}, {seconds:.2f}s)")
+    if decode:
+        print(f"    {decode}")
+    for line in encoded:
+        print(f"    编码 {line}")
+
+
+def run_watch_job(job, composer):
+    # 出错（如文件还没写完）时只打印，下一次变化时重试
+    try:
+        print_result(*run_job(job, composer))
+    except Exception as e:
+        print(f"失败 {job['output']}: {e}", file=sys.stderr)
+    sys.stdout.flush()
+
+
+def watch_jobs(jobs, poll=False, debounce=DEBOUNCE):
+    # 在主进程中逐个合成，之后监视输入文件夹：连续写入合并成一次，
+    # 只重新合成有文件变化的序列，每次只重绘变化的格子；输出先写临时文件再改名
+    composers = [AtlasComposer() for _ in jobs]
+    folders = set()
+    for job in jobs:
+        if job["folder"]:
+            folders.add(os.path.abspath(job["folder"]))
+        else:
+            folders.update(os.path.dirname(os.path.abspath(p)) for p in job["inputs"])
+    # 输出写在输入文件夹里时不触发重新合成
+    outputs = {os.path.abspath(path) for job in jobs for path, _ in job["targets"]}
+    with FolderWatcher(sorted(folders), poll=poll, ignore=outputs) as watcher:
+        for job, composer in zip(jobs, composers):
+            run_watch_job(job, composer)
+        print(f"正在监视 {len(folders)} 个文件夹（{watcher.backend}），按 Ctrl+C 结束")
+        sys.stdout.flush()
+        try:
+            while True:
+                changed = watcher.wait(debounce=debounce)
+                dirs = {os.path.dirname(p) for p in changed}
+                for job, composer in zip(jobs, composers):
+                    if job["folder"]:
+                        if os.path.abspath(job["folder"]) not in dirs:
+                            continue
+                        job["inputs"] = [
+                            p
+                            for p in list_images(job["folder"])
+                            if os.path.abspath(p) not in outputs
+                        ]
+                        if not job["inputs"]:
+                            continue
+                    elif not changed.intersection(map(os.path.abspath, job["inputs"])):
+                        continue
+                    run_watch_job(job, composer)
+        except KeyboardInterrupt:
+            print("已停止监视")
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m TextureToolkit", description="批量合成序列帧贴图"
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_common(p, res_choices, default_res):
+        p.add_argument(
+            "inputs", nargs="+", help="输入文件夹、图片或通配符，如 'shots/*/fx'"
+        )
+        p.add_argument("-o", "--output", default="atlas_out", help="输出文件夹")
+        if res_choices:
+            p.add_argument(
+                "--res",
+                type=lambda t: parse_res(t, res_choices),
+                default=default_res,
+                help="输出分辨率："
+                + ", ".join(res_choices)
+                + "，或 "
+                + "/".join(RES_ALIASES),
+            )
+        else:
+            # 紧密排列按原尺寸放置
+            p.set_defaults(res=default_res)
+        p.add_argument(
+            "--resample",
+            choices=list(RESAMPLE_ALIASES),
+            default="auto",
+            type=str.lower,
+            help="缩放方式："
+            + "；".join(
+                f"{k}={RESAMPLE_NOTES[v]}" for k, v in RESAMPLE_ALIASES.items()
+            ),
+        )
+        p.add_argument(
+            "--format",
+            default=["PNG"],
+            type=parse_formats,
+            help="输出格式："
+            + "/".join(OUTPUT_FORMATS)
+            + "，多个格式用逗号分隔（如 png,webp,dds），合成一次后同时编码",
+        )
+        p.add_argument(
+            "--preset",
+            choices=list(PRESET_ALIASES),
+            default="balanced",
+            type=str.lower,
+            help="编码预设："
+            + "；".join(f"{k}={ENCODE_NOTES[v]}" for k, v in PRESET_ALIASES.items()),
+        )
+        p.add_argument(
+            "--gpu-format",
+            "--dds-format",
+            dest="gpu_format",
+            choices=TEXTURE_FORMATS,
+            default="BC3",
+            type=str.upper,
+            help="--format dds/ktx2 时的数据格式："
+            + "；".join(f"{k}={v}" for k, v in TEXTURE_NOTES.items()),
+        )
+        p.add_argument(
+            "--zstd",
+            action="store_true",
+            help="KTX2 使用 zstd 超压缩（需要 Python 3.14 或 zstandard 包）",
+        )
+        p.add_argument(
+            "--srgb",
+            action="store_true",
+            help="KTX2 标记为 sRGB 颜色（BC4/BC5 没有 sRGB 格式，不受影响）",
+        )
+        p.add_argument(
+            "--mips",
+            type=parse_mips,
+            help="导出多级分辨率：包括原图在内的级数（每级减半），full 为缩小到 1x1；"
+            "每级写成 <名字>_<宽>x<高>.<格式>；DDS 默认带完整 mip 链，所有级在一个文件里",
+        )
+        p.add_argument(
+            "--mip-container",
+            action="store_true",
+            help="与 --mips 一起使用，所有级写入一个多页 TIFF",
+        )
+        p.add_argument(
+            "-j",
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="并行进程数，默认使用全部CPU核心",
+        )
+        p.add_argument(
+            "--cache-mb",
+            type=int,
+            default=0,
+            help="每个进程的解码缓存上限(MB)，批处理时图片通常只读一次，默认不缓存",
+        )
+        p.add_argument(
+            "--decode-threads",
+            type=int,
+            help="每个进程的解码/缩放线程数，默认为 CPU核心数/进程数",
+        )
+        p.add_argument(
+            "--scratch",
+            help="超大画布的临时文件目录（默认系统临时目录），建议放在空间充足的本地磁盘",
+        )
+
+    def add_grid(p):
+        p.add_argument("--rows", type=int, default=2, help="行数")
+        p.add_argument("--cols", type=int, default=2, help="列数")
+        p.add_argument(
+            "--fill",
+            type=parse_color,
+            default=(200, 200, 200, 255),
+            help='填充色，如 "200,200,200,255" 或 "#C8C8C8"',
+        )
+        p.add_argument(
+            "--stream",
+            action="store_true",
+            help="按行带合成并写出（仅PNG/TIFF），超过 TEXTURETOOLKIT_STREAM_MB 时自动启用",
+        )
+
+    p_merge = sub.add_parser("merge", help="多张图片按行列拼接（每个文件夹一张）")
+    add_common(p_merge, GRID_RES_MODES, RES_MERGE)
+    add_grid(p_merge)
+    p_merge.add_argument(
+        "--overflow",
+        choices=["drop", "pages"],
+        default="drop",
+        help="帧数超过 行数x列数 时：drop=只合成前面的帧；pages=分成多页"
+        "（<名字>_atlas_01 ...），各页并行合成，并写出 <名字>_atlas.json 清单",
+    )
+    p_merge.add_argument(
+        "--watch",
+        action="store_true",
+        help="合成后继续监视输入文件夹，图片写入、改名或删除后只重绘变化的格子并重新写出",
+    )
+    p_merge.add_argument(
+        "--poll",
+        action="store_true",
+        help="与 --watch 一起使用，定时扫描代替 inotify（网络盘上收不到其他机器的写入事件）",
+    )
+    p_merge.add_argument(
+        "--debounce",
+        type=int,
+        default=int(DEBOUNCE * 1000),
+        help="与 --watch 一起使用，最后一次写入后等待多少毫秒再合成，连续写入只合成一次",
+    )
+    p_single = sub.add_parser("single", help="单张图片合成序列帧贴图（每张图片一张）")
+    add_common(p_single, GRID_RES_MODES, RES_MERGE)
+    add_grid(p_single)
+    p_single.add_argument(
+        "--mode",
+        choices=["repeat", "color"],
+        default="repeat",
+        help="repeat=全部重复单张, color=单张加颜色",
+    )
+    p_pack = sub.add_parser(
+        "pack", help="尺寸不同的图片紧密排列成图集（每个文件夹一张），写出 UV 清单"
+    )
+    add_common(p_pack, None, RES_KEEP)
+    p_pack.add_argument(
+        "--algorithm",
+        choices=list(PACK_ALIASES),
+        default="maxrects",
+        type=str.lower,
+        help="排列算法："
+        + "；".join(f"{k}={PACK_NOTES[v]}" for k, v in PACK_ALIASES.items()),
+    )
+    p_pack.add_argument(
+        "--max-size",
+        type=int,
+        default=DEFAULT_MAX_SIZE,
+        help="图集的最大宽高，放不下时分成多页（<名字>_pack_01 ...）",
+    )
+    p_pack.add_argument(
+        "--pot", action="store_true", help="图集宽高取 2 的幂（旧 GPU、压缩纹理需要）"
+    )
+    p_pack.add_argument(
+        "--rotate",
+        action="store_true",
+        help="允许顺时针旋转 90° 放置，清单中 rotated 为 true，使用时需要转回",
+    )
+    p_pack.add_argument(
+        "--padding",
+        type=int,
+        default=DEFAULT_PADDING,
+        help="图片之间的间距（像素），避免过滤和 mip 时相邻图片的颜色渗入",
+    )
+    p_rgba = sub.add_parser("rgba", help="RGBA通道合成2x2贴图（每张图片一张）")
+    add_common(p_rgba, CHANNEL_RES_MODES, RES_MERGE_2X2)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    args.resample = RESAMPLE_ALIASES[args.resample]
+    if args.scratch:
+        # 子进程继承环境变量
+        os.environ["TEXTURETOOLKIT_SCRATCH"] = args.scratch
+    args.preset = PRESET_ALIASES[args.preset]
+    if args.mip_container and (args.mips is None or args.format != ["TIFF"]):
+        print("--mip-container 需要同时指定 --mips 和 --format tiff", file=sys.stderr)
+        return 1
+    if args.zstd and not HAS_ZSTD:
+        print("--zstd 需要 Python 3.14 或 zstandard 包", file=sys.stderr)
+        return 1
+    # 参数组合先检查，出错时不创建输出文件夹
+    if getattr(args, "watch", False) and args.overflow == "pages":
+        print("--watch 不能与 --overflow pages 同时使用", file=sys.stderr)
+        return 1
+    jobs = make_jobs(args)
+    if not jobs:
+        print("没有找到需要处理的图片", file=sys.stderr)
+        return 1
+    if getattr(args, "watch", False):
+        # 监视模式在主进程中执行，解码和缩放使用全部线程
+        init_worker(args.cache_mb, args.decode_threads or os.cpu_count() or 1)
+        return watch_jobs(jobs, args.poll, args.debounce / 1000)
+    workers = max(1, args.workers)
+    # 进程数 x 解码线程数 不超过核心数
+    decode_threads = args.decode_threads or max(1, (os.cpu_count() or 1) // workers)
+    failed = run_jobs(jobs, workers, args.cache_mb, decode_threads)
+    failed += write_manifests(jobs)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
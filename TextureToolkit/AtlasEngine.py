@@ -0,0 +1,470 @@
+import os
+import tempfile
+from itertools import chain, islice
+import numpy as np
+from PIL import Image
+from AtlasWriter import AtomicFiles, write_bands
+from FrameReader import read_frames
+from ImageCache import decode_array, load_array, reduce_to
+from ImageIndex import image_index
+from Resample import RESAMPLE_AUTO, resize_bands, resize_image
+
+# 序列帧合成引擎：不依赖Qt，Dock和命令行共用
+
+RES_KEEP = "保持原分辨率"
+RES_MERGE = "合并分辨率(拼接)"
+RES_MERGE_2X2 = "合并分辨率(2x2)"
+RES_DOWN_X2 = "降采样x2"
+RES_DOWN_X4 = "降采样x4"
+RES_SINGLE = "单张分辨率"
+RES_MERGE_X2 = "合并分辨率x2"
+
+# Merge/Single Atlas 的输出分辨率选项
+GRID_RES_MODES = [
+    RES_KEEP,
+    RES_MERGE,
+    RES_DOWN_X2,
+    RES_DOWN_X4,
+    RES_SINGLE,
+    RES_MERGE_X2,
+]
+# RGBA Atlas（固定2x2）的输出分辨率选项
+CHANNEL_RES_MODES = [RES_KEEP, RES_MERGE_2X2, RES_DOWN_X2, RES_DOWN_X4]
+
+DEFAULT_CELL_SIZE = (128, 128)
+# 合成画布超过这个大小(MB)时不在内存中生成整张图，保存时按行带写出
+STREAM_THRESHOLD_MB = int(os.environ.get("TEXTURETOOLKIT_STREAM_MB", 1024))
+# 必须生成整张图时（如保存为JPEG），画布超过这个大小(MB)改用临时文件映射
+MEMMAP_THRESHOLD_MB = int(os.environ.get("TEXTURETOOLKIT_MEMMAP_MB", 1024))
+# 从映射画布缩放时每次读取的行数
+STRIP_ROWS = 256
+
+
+class Cancelled(Exception):
+    # 合成过程中 cancelled() 返回 True 时抛出，调用方丢弃结果即可
+    pass
+
+
+def check_cancelled(cancelled):
+    if cancelled is not None and cancelled():
+        raise Cancelled()
+
+
+def output_size(res_mode, cell_w, cell_h, rows, cols):
+    atlas_w, atlas_h = cell_w * cols, cell_h * rows
+    if res_mode in (RES_KEEP, RES_SINGLE):
+        return cell_w, cell_h
+    if res_mode == RES_DOWN_X2:
+        return max(1, atlas_w // 2), max(1, atlas_h // 2)
+    if res_mode == RES_DOWN_X4:
+        return max(1, atlas_w // 4), max(1, atlas_h // 4)
+    if res_mode == RES_MERGE_X2:
+        return atlas_w * 2, atlas_h * 2
+    # 合并分辨率(拼接) / 合并分辨率(2x2)
+    return atlas_w, atlas_h
+
+
+def canvas_bytes(cell_w, cell_h, rows, cols, channels=4):
+    return cell_w * cell_h * rows * cols * channels
+
+
+def needs_streaming(cell_w, cell_h, rows, cols, res_mode=RES_MERGE):
+    # 合成画布或输出图任一超过阈值时走按行带写出
+    out_w, out_h = output_size(res_mode, cell_w, cell_h, rows, cols)
+    size = max(canvas_bytes(cell_w, cell_h, rows, cols), out_w * out_h * 4)
+    return size > STREAM_THRESHOLD_MB * 1024 * 1024
+
+
+def scratch_array(shape):
+    # 临时文件映射的数组，由系统页缓存决定哪些部分留在内存里
+    # 临时目录可通过 TEXTURETOOLKIT_SCRATCH 指定，数组释放后文件自动删除
+    scratch_dir = os.environ.get("TEXTURETOOLKIT_SCRATCH") or None
+    f = tempfile.TemporaryFile(prefix="atlas_", dir=scratch_dir)
+    return np.memmap(f, dtype=np.uint8, mode="w+", shape=shape)
+
+
+def canvas_array(shape, memmap=None):
+    # memmap 为 None 时按 MEMMAP_THRESHOLD_MB 自动选择
+    if memmap is None:
+        memmap = int(np.prod(shape)) > MEMMAP_THRESHOLD_MB * 1024 * 1024
+    return scratch_array(shape) if memmap else np.empty(shape, dtype=np.uint8)
+
+
+def to_array(frame, mode="RGBA"):
+    # PIL图片转为HxW(xC)的uint8数组，已经是数组的直接返回
+    if isinstance(frame, np.ndarray):
+        return frame
+    if frame.mode != mode:
+        frame = frame.convert(mode)
+    return np.asarray(frame)
+
+
+def _pixel(color, mode):
+    if mode == "L":
+        return color if isinstance(color, int) else color[0]
+    return tuple(color)
+
+
+def peek_cell_size(frames, cell_size=None, mode="RGBA"):
+    # 未指定格子尺寸时取第一帧的尺寸，返回 (包含第一帧的迭代器, 格子尺寸)
+    it = iter(frames)
+    if cell_size is not None:
+        return it, cell_size
+    first = next(it, None)
+    if first is None:
+        return it, DEFAULT_CELL_SIZE
+    first = to_array(first, mode)
+    return chain([first], it), (first.shape[1], first.shape[0])
+
+
+def compose_grid(
+    frames,
+    rows,
+    cols,
+    cell_size=None,
+    fill_color=(200, 200, 200, 255),
+    background=(0, 0, 0, 0),
+    mode="RGBA",
+    out=None,
+):
+    # 按行优先把frames拼到一块预分配的画布上
+    # frames可以是任意可迭代对象（按需解码），多出rows*cols的部分忽略
+    # 不足的格子用fill_color填充；比格子小的图片，剩余区域为background
+    total = rows * cols
+    it = iter(frames)
+    first = next(it, None) if total > 0 else None
+    first = to_array(first, mode) if first is not None else None
+    if cell_size is None:
+        if first is not None:
+            cell_size = (first.shape[1], first.shape[0])
+        else:
+            cell_size = DEFAULT_CELL_SIZE
+    w, h = cell_size
+    shape = (h * rows, w * cols) if mode == "L" else (h * rows, w * cols, 4)
+    canvas = np.empty(shape, dtype=np.uint8) if out is None else out
+    fill = _pixel(fill_color, mode)
+    bg = _pixel(background, mode)
+    frame = first
+    for idx in range(total):
+        r, c = divmod(idx, cols)
+        cell = canvas[r * h : (r + 1) * h, c * w : (c + 1) * w]
+        if idx > 0 and frame is not None:
+            frame = next(it, None)
+            frame = to_array(frame, mode) if frame is not None else None
+        if frame is None:
+            cell[...] = fill
+            continue
+        fh, fw = min(h, frame.shape[0]), min(w, frame.shape[1])
+        if (fh, fw) != (h, w):
+            cell[...] = bg
+        cell[:fh, :fw] = frame[:fh, :fw]
+    return canvas
+
+
+def iter_grid_bands(
+    frames,
+    rows,
+    cols,
+    cell_size=None,
+    fill_color=(200, 200, 200, 255),
+    background=(0, 0, 0, 0),
+    mode="RGBA",
+):
+    # 与 compose_grid 结果相同，但每次只合成并产出一行格子
+    it, cell_size = peek_cell_size(frames, cell_size, mode)
+    for _ in range(rows):
+        yield compose_grid(
+            islice(it, cols), 1, cols, cell_size, fill_color, background, mode
+        )
+
+
+def write_atlas(
+    path,
+    frames,
+    rows,
+    cols,
+    res_mode=RES_MERGE,
+    fill_color=(200, 200, 200, 255),
+    background=(0, 0, 0, 0),
+    mode="RGBA",
+    cell_size=None,
+    fmt=None,
+    policy=RESAMPLE_AUTO,
+    compress_level=6,
+    progress=None,
+):
+    # 按行带合成、缩放并写出 PNG/TIFF，峰值内存约为一行格子，返回输出尺寸
+    # 先写临时文件，写完再改名，中途出错或取消不会留下写了一半的文件
+    it, cell_size = peek_cell_size(frames, cell_size, mode)
+    w, h = cell_size
+    out_size = output_size(res_mode, w, h, rows, cols)
+    bands = iter_grid_bands(it, rows, cols, cell_size, fill_color, background, mode)
+    bands = resize_bands(bands, (w * cols, h * rows), out_size, policy)
+    with AtomicFiles() as files:
+        return write_bands(
+            files.temp(path), out_size, bands, mode, fmt, compress_level, progress
+        )
+
+
+def resize_atlas(atlas, size, policy=RESAMPLE_AUTO):
+    # 缩放策略见 Resample.py，整数倍缩小默认用盒式平均
+    return resize_image(atlas, size, policy)
+
+
+def build_atlas(
+    frames,
+    rows,
+    cols,
+    res_mode=RES_MERGE,
+    fill_color=(200, 200, 200, 255),
+    background=(0, 0, 0, 0),
+    mode="RGBA",
+    cell_size=None,
+    memmap=None,
+    policy=RESAMPLE_AUTO,
+):
+    # 合成 + 输出分辨率调整，返回PIL图片
+    # memmap=True 时画布放在临时文件映射里，逐格写入、按条带缩放；None 为按大小自动选择
+    it, (w, h) = peek_cell_size(frames, cell_size, mode)
+    shape = (h * rows, w * cols) if mode == "L" else (h * rows, w * cols, 4)
+    canvas = canvas_array(shape, memmap)
+    compose_grid(it, rows, cols, (w, h), fill_color, background, mode, out=canvas)
+    out_w, out_h = output_size(res_mode, w, h, rows, cols)
+    if not isinstance(canvas, np.memmap):
+        return resize_atlas(Image.fromarray(canvas), (out_w, out_h), policy)
+    if (out_w, out_h) == (w * cols, h * rows):
+        return Image.fromarray(canvas)
+    out = canvas_array((out_h, out_w) + shape[2:], memmap)
+    strips = (canvas[y : y + STRIP_ROWS] for y in range(0, shape[0], STRIP_ROWS))
+    y = 0
+    for band in resize_bands(strips, (w * cols, h * rows), (out_w, out_h), policy):
+        out[y : y + len(band)] = band
+        y += len(band)
+    return Image.fromarray(out)
+
+
+def build_merge_atlas(
+    paths_or_images,
+    rows,
+    cols,
+    res_mode=RES_MERGE,
+    fill_color=(200, 200, 200, 255),
+    memmap=None,
+    stats=None,
+    policy=RESAMPLE_AUTO,
+):
+    # Merge Atlas：多张图片拼接，不足的格子用填充色，统一为第一张图片的尺寸
+    # 路径通过共享的解码缓存读取，重复预览不再重新解码；多线程按顺序解码
+    # stats 传入 FrameReader.DecodeStats 时记录解码吞吐
+    items = islice(paths_or_images, rows * cols)
+    frames = read_frames(items, _cached_frame, stats=stats)
+    return build_atlas(
+        frames, rows, cols, res_mode, fill_color, memmap=memmap, policy=policy
+    )
+
+
+def _cached_frame(item):
+    return load_array(item) if isinstance(item, str) else item
+
+
+def _decoded_frame(item):
+    return decode_array(item) if isinstance(item, str) else item
+
+
+def write_merge_atlas(
+    path,
+    paths_or_images,
+    rows,
+    cols,
+    res_mode=RES_MERGE,
+    fill_color=(200, 200, 200, 255),
+    fmt=None,
+    stats=None,
+    policy=RESAMPLE_AUTO,
+    compress_level=6,
+    progress=None,
+):
+    # 按行带写出的 Merge Atlas：绕过解码缓存，解码后的帧用完即释放
+    # 最多预读一行格子的帧，内存约为两行格子
+    items = islice(paths_or_images, rows * cols)
+    frames = read_frames(items, _decoded_frame, read_ahead=cols, stats=stats)
+    return write_atlas(
+        path,
+        frames,
+        rows,
+        cols,
+        res_mode,
+        fill_color,
+        fmt=fmt,
+        policy=policy,
+        compress_level=compress_level,
+        progress=progress,
+    )
+
+
+def build_single_atlas(
+    img,
+    rows,
+    cols,
+    res_mode=RES_MERGE,
+    fill_color=(200, 200, 200, 255),
+    repeat=True,
+    memmap=None,
+    policy=RESAMPLE_AUTO,
+):
+    # Single Atlas：单张图片重复铺满，或只放第一格其余为填充色
+    frame = to_array(img)
+    frames = [frame] * (rows * cols) if repeat else [frame]
+    return build_atlas(
+        frames,
+        rows,
+        cols,
+        res_mode,
+        fill_color,
+        fill_color,
+        memmap=memmap,
+        policy=policy,
+    )
+
+
+def write_single_atlas(
+    path,
+    img,
+    rows,
+    cols,
+    res_mode=RES_MERGE,
+    fill_color=(200, 200, 200, 255),
+    repeat=True,
+    fmt=None,
+    policy=RESAMPLE_AUTO,
+    compress_level=6,
+    progress=None,
+):
+    frame = to_array(img)
+    frames = [frame] * (rows * cols) if repeat else [frame]
+    return write_atlas(
+        path,
+        frames,
+        rows,
+        cols,
+        res_mode,
+        fill_color,
+        fill_color,
+        fmt=fmt,
+        policy=policy,
+        compress_level=compress_level,
+        progress=progress,
+    )
+
+
+def build_channel_atlas(img, res_mode=RES_MERGE_2X2, policy=RESAMPLE_AUTO):
+    # RGBA Atlas：R/G/B/A四个通道按2x2排成一张灰度图
+    arr = to_array(img)
+    frames = [arr[..., i] for i in range(4)]
+    return build_atlas(
+        frames, 2, 2, res_mode, fill_color=0, background=0, mode="L", policy=policy
+    )
+
+
+def preview_layout(res_mode, cell_w, cell_h, rows, cols, max_size):
+    # 返回 (输出尺寸, 预览尺寸, 预览中每格尺寸)
+    out_w, out_h = output_size(res_mode, cell_w, cell_h, rows, cols)
+    scale = min(max_size[0] / out_w, max_size[1] / out_h, 1.0)
+    pw, ph = max(1, round(out_w * scale)), max(1, round(out_h * scale))
+    cell = (max(1, round(pw / cols)), max(1, round(ph / rows)))
+    return (out_w, out_h), (pw, ph), cell
+
+
+def _scaled_size(size, cell_size, preview_cell):
+    sx = preview_cell[0] / cell_size[0]
+    sy = preview_cell[1] / cell_size[1]
+    return max(1, round(size[0] * sx)), max(1, round(size[1] * sy))
+
+
+def _finish_preview(canvas, preview_size):
+    img = Image.fromarray(canvas)
+    if img.size != preview_size:
+        img = img.resize(preview_size, Image.Resampling.BILINEAR)
+    return img
+
+
+def build_merge_preview(
+    paths,
+    rows,
+    cols,
+    res_mode=RES_MERGE,
+    fill_color=(200, 200, 200, 255),
+    max_size=(360, 360),
+    cancelled=None,
+    missing=None,
+):
+    # 预览专用：每帧按预览尺寸缩小解码，直接拼到小画布上，布局与填充色与导出一致
+    # cancelled 为可选的无参函数，每解码一帧前检查一次，返回 True 时抛出 Cancelled
+    # 已排队的解码随之取消
+    # 无法读取的帧仍占一格，用填充色显示（导出时会报错），路径追加到 missing 列表
+    # 返回 (预览图, 导出时的输出尺寸)
+    paths = list(paths[: rows * cols])
+    infos = image_index().get_many(paths)
+    first = next((i for i in infos if i is not None), None)
+    cell_size = (first.width, first.height) if first else DEFAULT_CELL_SIZE
+    out_size, preview_size, preview_cell = preview_layout(
+        res_mode, *cell_size, rows, cols, max_size
+    )
+    blank = np.empty((preview_cell[1], preview_cell[0], 4), dtype=np.uint8)
+    blank[...] = _pixel(fill_color, "RGBA")
+
+    def load(item):
+        path, info = item
+        check_cancelled(cancelled)
+        if info is None:
+            return blank
+        return load_array(
+            path, size=_scaled_size((info.width, info.height), cell_size, preview_cell)
+        )
+
+    if missing is not None:
+        missing.extend(path for path, info in zip(paths, infos) if info is None)
+    canvas = compose_grid(
+        read_frames(zip(paths, infos), load), rows, cols, preview_cell, fill_color
+    )
+    check_cancelled(cancelled)
+    return _finish_preview(canvas, preview_size), out_size
+
+
+def build_single_preview(
+    img,
+    rows,
+    cols,
+    res_mode=RES_MERGE,
+    fill_color=(200, 200, 200, 255),
+    repeat=True,
+    max_size=(180, 180),
+):
+    out_size, preview_size, preview_cell = preview_layout(
+        res_mode, img.width, img.height, rows, cols, max_size
+    )
+    frame = to_array(reduce_to(img.convert("RGBA"), preview_cell))
+    frames = [frame] * (rows * cols) if repeat else [frame]
+    canvas = compose_grid(
+        frames, rows, cols, preview_cell, fill_color, background=fill_color
+    )
+    return _finish_preview(canvas, preview_size), out_size
+
+
+def build_channel_preview(img, res_mode=RES_MERGE_2X2, max_size=(180, 180)):
+    out_size, preview_size, preview_cell = preview_layout(
+        res_mode, img.width, img.height, 2, 2, max_size
+    )
+    arr = to_array(reduce_to(img.convert("RGBA"), preview_cell))
+    frames = [arr[..., i] for i in range(4)]
+    canvas = compose_grid(frames, 2, 2, preview_cell, 0, 0, mode="L")
+    return _finish_preview(canvas, preview_size), out_size
+
+
+def fit_preview(img, max_size=(360, 360)):
+    # 等比缩小到预览框内，返回新图片（不修改原图）
+    scale = min(max_size[0] / img.width, max_size[1] / img.height, 1.0)
+    size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    if size == img.size:
+        return img
+    return img.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
@@ -0,0 +1,239 @@
+import json
+import os
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import Resample
+from AtlasEngine import (
+    RES_MERGE,
+    build_merge_atlas,
+    needs_streaming,
+    write_merge_atlas,
+)
+from AtlasWriter import AtomicFiles, strip_format
+from Encoders import ENCODE_BALANCED, EncodeResult, compress_level, encode
+from ImageIndex import image_index
+
+# 多页输出：帧数超过 行数x列数 时按顺序分成多页，每页一张图集，文件名加页码
+# atlas.png -> atlas_01.png, atlas_02.png ...，清单 atlas.json 记录每帧在哪一页哪一格
+# 最多 PAGE_WORKERS 页同时合成和编码（每页内部的解码/缩放/编码已经是多线程），
+# 超大的页按行带写出；所有页和清单先写临时文件，全部写完后一起改名，
+# 出错或取消时磁盘上仍是上次的页和清单；上次清单里有、这次没有的页在改名后删除
+
+OVERFLOW_DROP = "丢弃多余帧"
+OVERFLOW_PAGES = "分页输出"
+OVERFLOW_MODES = [OVERFLOW_DROP, OVERFLOW_PAGES]
+MANIFEST_VERSION = 1
+# 同时合成的页数，每页的完整画布可能有几百 MB
+PAGE_WORKERS = 2
+
+
+def split_pages(paths, rows, cols):
+    per_page = rows * cols
+    return [paths[i : i + per_page] for i in range(0, len(paths), per_page)]
+
+
+def page_suffix(page, pages):
+    # 页码从 1 开始，按总页数补零，文件名排序与页码一致
+    return f"_{page + 1:0{max(2, len(str(pages)))}d}"
+
+
+def page_path(path, page, pages):
+    root, ext = os.path.splitext(path)
+    return f"{root}{page_suffix(page, pages)}{ext}"
+
+
+def manifest_path(path):
+    return os.path.splitext(path)[0] + ".json"
+
+
+def cell_rect(index, cols, rows, size):
+    # 第 index 格在输出图中的 [x, y, 宽, 高]（像素），输出尺寸不能整除时按比例取整
+    r, c = divmod(index, cols)
+    x0, x1 = c * size[0] // cols, (c + 1) * size[0] // cols
+    y0, y1 = r * size[1] // rows, (r + 1) * size[1] // rows
+    return [x0, y0, x1 - x0, y1 - y0]
+
+
+def build_manifest(manifest_file, pages, rows, cols, page_files, sizes):
+    # pages 为每页的帧路径，page_files 为每页写出的文件（多种格式时有多个），sizes 为每页尺寸
+    base = os.path.dirname(os.path.abspath(manifest_file))
+    frames = []
+    for page, (paths, size) in enumerate(zip(pages, sizes)):
+        for cell, path in enumerate(paths):
+            frames.append(
+                {
+                    "frame": len(frames),
+                    "name": os.path.basename(path),
+                    "source": os.path.abspath(path),
+                    "page": page,
+                    "cell": cell,
+                    "row": cell // cols,
+                    "col": cell % cols,
+                    "rect": cell_rect(cell, cols, rows, size),
+                }
+            )
+    return {
+        "version": MANIFEST_VERSION,
+        "rows": rows,
+        "cols": cols,
+        "frame_count": len(frames),
+        "pages": [
+            {
+                "page": page,
+                "files": [os.path.relpath(f, base) for f in files],
+                "size": list(size),
+                "frames": len(paths),
+            }
+            for page, (paths, files, size) in enumerate(zip(pages, page_files, sizes))
+        ],
+        "frames": frames,
+    }
+
+
+def write_manifest(path, manifest, output=None):
+    # output 为调用方的 AtomicFiles 时与各页一起改名
+    with AtomicFiles() if output is None else nullcontext(output) as files:
+        with open(files.temp(path), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+
+def manifest_files(manifest):
+    # 清单里记录的所有页文件（相对清单所在文件夹的路径）
+    return {f for page in manifest.get("pages", []) for f in page.get("files", [])}
+
+
+def stale_pages(manifest_file, manifest):
+    # 上次清单记录、这次清单不再包含的页文件（上次页数更多时留下的）
+    # 只看旧清单，同一文件夹里名字相近的源帧或其他文件不会被当成旧页
+    try:
+        with open(manifest_file, encoding="utf-8") as f:
+            previous = json.load(f)
+        old = manifest_files(previous)
+    except (OSError, ValueError, AttributeError, TypeError):
+        return []
+    base = os.path.dirname(os.path.abspath(manifest_file))
+    stale = []
+    for name in sorted(old - manifest_files(manifest)):
+        # 只删除清单所在文件夹里的文件
+        if not isinstance(name, str) or os.path.isabs(name):
+            continue
+        if os.path.normpath(name).startswith(os.pardir):
+            continue
+        stale.append(os.path.join(base, name))
+    return stale
+
+
+def remove_files(files):
+    removed = []
+    for path in files:
+        try:
+            os.remove(path)
+            removed.append(path)
+        except OSError:
+            pass
+    return removed
+
+
+def _stream_page(path, paths, rows, cols, res_mode, fmt, options):
+    # 超过阈值且格式支持按行带写出的页不生成完整画布
+    if options.get("mips") is not None or strip_format(path, fmt) is None:
+        return False
+    info = next((i for i in image_index().get_many(paths) if i), None)
+    if info is None:
+        return False
+    return needs_streaming(info.width, info.height, rows, cols, res_mode)
+
+
+def write_pages(
+    path,
+    paths,
+    rows,
+    cols,
+    res_mode=RES_MERGE,
+    fill_color=(200, 200, 200, 255),
+    fmt=None,
+    preset=ENCODE_BALANCED,
+    policy=Resample.RESAMPLE_AUTO,
+    options=None,
+    progress=None,
+    workers=None,
+):
+    # 合成并写出所有页和清单，返回 (每页的 EncodeResult, 清单路径)
+    # progress(已完成, 总数) 汇总各页的编码进度，抛出异常时取消还没开始的页
+    options = options or {}
+    pages = split_pages(paths, rows, cols)
+    files = [page_path(path, i, len(pages)) for i in range(len(pages))]
+    done = [0.0] * len(pages)
+
+    def report(page, finished, total):
+        done[page] = finished / total if total else 0.0
+        if progress is not None:
+            progress(int(sum(done) * 1000), len(pages) * 1000)
+
+    def run(output, page):
+        report(page, 0, 1)
+        if _stream_page(files[page], pages[page], rows, cols, res_mode, fmt, options):
+            start = time.perf_counter()
+            temp = output.temp(files[page])
+            size = write_merge_atlas(
+                temp,
+                pages[page],
+                rows,
+                cols,
+                res_mode,
+                fill_color,
+                fmt,
+                policy=policy,
+                compress_level=compress_level(preset),
+                progress=partial(report, page),
+            )
+            result = EncodeResult(
+                strip_format(files[page], fmt),
+                files[page],
+                os.path.getsize(temp),
+                time.perf_counter() - start,
+            )
+            return result, size
+        atlas = build_merge_atlas(
+            pages[page], rows, cols, res_mode, fill_color, policy=policy
+        )
+        result = encode(
+            atlas,
+            files[page],
+            fmt,
+            preset,
+            policy=policy,
+            progress=partial(report, page),
+            output=output,
+            **options,
+        )
+        return result, atlas.size
+
+    manifest_file = manifest_path(path)
+    workers = min(workers or PAGE_WORKERS, len(pages))
+    with AtomicFiles() as output:
+        with ThreadPoolExecutor(
+            max(1, workers), thread_name_prefix="AtlasPage"
+        ) as pool:
+            futures = [pool.submit(run, output, page) for page in range(len(pages))]
+            try:
+                results = [future.result() for future in futures]
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+        manifest = build_manifest(
+            manifest_file,
+            pages,
+            rows,
+            cols,
+            [[f] for f in files],
+            [size for _, size in results],
+        )
+        # 改名前读旧清单，改名后删除旧清单里有、新清单里没有的页
+        stale = stale_pages(manifest_file, manifest)
+        write_manifest(manifest_file, manifest, output)
+    remove_files(stale)
+    return [result for result, _ in results], manifest_file
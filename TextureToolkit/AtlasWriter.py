@@ -0,0 +1,286 @@
+import os
+import struct
+import uuid
+import zlib
+import numpy as np
+
+# 按行带写出 PNG / TIFF：像素一段一段送入并压缩写盘，整张图不需要在内存里
+# 用于超大贴图导出，其他格式仍用 Pillow 整张保存
+
+STRIP_FORMATS = ("PNG", "TIFF")
+CHANNELS = {"L": 1, "RGB": 3, "RGBA": 4}
+
+
+class AtomicFiles:
+    # 先写到目标目录下的临时文件，全部写完后再改名为目标文件（os.replace 是原子操作）
+    # 出错、取消或进程被中断时只删除临时文件，已有的同名文件保持原样
+    def __init__(self):
+        self.files = []  # [(临时路径, 目标路径)]
+
+    def temp(self, path):
+        folder, name = os.path.split(os.path.abspath(path))
+        root, ext = os.path.splitext(name)
+        # 保留扩展名，Pillow 和 strip_format 按扩展名判断格式
+        tmp = os.path.join(folder, f".{root}.{uuid.uuid4().hex[:8]}.tmp{ext}")
+        self.files.append((tmp, path))
+        return tmp
+
+    def commit(self):
+        while self.files:
+            tmp, path = self.files[0]
+            os.replace(tmp, path)
+            self.files.pop(0)
+
+    def discard(self):
+        for tmp, _ in self.files:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+        self.files = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.commit()
+        finally:
+            self.discard()
+        return False
+
+
+def strip_format(path, fmt=None):
+    # 根据格式名或扩展名判断能否按行带写出，不能时返回 None
+    if fmt:
+        fmt = fmt.upper()
+        return "TIFF" if fmt == "TIF" else fmt if fmt in STRIP_FORMATS else None
+    ext = os.path.splitext(path)[1].lower()
+    return {".png": "PNG", ".tif": "TIFF", ".tiff": "TIFF"}.get(ext)
+
+
+def _rows(band, width, channels):
+    band = np.ascontiguousarray(band, dtype=np.uint8)
+    return band.reshape(band.shape[0], width * channels)
+
+
+class PngStripWriter:
+    COLOR_TYPES = {"L": 0, "RGB": 2, "RGBA": 6}
+
+    def __init__(self, path, size, mode="RGBA", compress_level=6):
+        self.width, self.height = size
+        self.channels = CHANNELS[mode]
+        self.rows = 0
+        self.prev_row = np.zeros(self.width * self.channels, dtype=np.uint8)
+        self.pending = []
+        self.pending_bytes = 0
+        self.compressor = zlib.compressobj(compress_level)
+        self.f = open(path, "wb")
+        self.f.write(b"\x89PNG\r\n\x1a\n")
+        ihdr = struct.pack(
+            ">IIBBBBB", self.width, self.height, 8, self.COLOR_TYPES[mode], 0, 0, 0
+        )
+        self._chunk(b"IHDR", ihdr)
+
+    def _chunk(self, tag, data):
+        crc = zlib.crc32(data, zlib.crc32(tag))
+        self.f.write(struct.pack(">I", len(data)) + tag)
+        self.f.write(data)
+        self.f.write(struct.pack(">I", crc))
+
+    def _flush(self, force=False):
+        # 凑够 1MB 再写一个 IDAT 块
+        if self.pending and (force or self.pending_bytes >= 1 << 20):
+            self._chunk(b"IDAT", b"".join(self.pending))
+            self.pending = []
+            self.pending_bytes = 0
+
+    def _filter(self, rows):
+        # 每行在 None/Sub/Up/Average 中选有符号字节绝对值和最小的（libpng 的启发式）
+        # Paeth 用 numpy 算太慢，压缩率差别不大，不参与选择
+        c = self.channels
+        up = np.concatenate([self.prev_row[None], rows[:-1]])
+        left = np.zeros_like(rows)
+        left[:, c:] = rows[:, :-c]
+        average = ((left.astype(np.uint16) + up) >> 1).astype(np.uint8)
+        filtered = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+        cost = None
+        for filter_type, candidate in enumerate(
+            (rows, rows - left, rows - up, rows - average)
+        ):
+            # int8 取绝对值后按 uint8 求和，-128 记为 128
+            c_cost = np.abs(candidate.view(np.int8)).view(np.uint8).sum(axis=1)
+            better = slice(None) if cost is None else c_cost < cost
+            cost = c_cost if cost is None else np.minimum(cost, c_cost)
+            filtered[better, 0] = filter_type
+            filtered[better, 1:] = candidate[better]
+        self.prev_row = rows[-1].copy()
+        return filtered
+
+    def write(self, band):
+        rows = _rows(band, self.width, self.channels)
+        # 分小段滤波，临时数组只占几十行
+        for y in range(0, rows.shape[0], 32):
+            data = self.compressor.compress(self._filter(rows[y : y + 32]))
+            if data:
+                self.pending.append(data)
+                self.pending_bytes += len(data)
+                self._flush()
+        self.rows += rows.shape[0]
+
+    def close(self):
+        if self.f.closed:
+            return
+        try:
+            if self.rows != self.height:
+                raise ValueError(f"写入 {self.rows} 行，应为 {self.height} 行")
+            self.pending.append(self.compressor.flush())
+            self._flush(force=True)
+            self._chunk(b"IEND", b"")
+        finally:
+            self.f.close()
+
+
+class TiffStripWriter:
+    # Deflate 压缩 + 水平差分预测的条带 TIFF，未压缩数据超过 4GB 时写 BigTIFF
+    SHORT, LONG, LONG8 = 3, 4, 16
+    TYPE_FORMATS = {3: "H", 4: "I", 16: "Q"}
+
+    def __init__(self, path, size, mode="RGBA", compress_level=6, rows_per_strip=64):
+        self.width, self.height = size
+        self.mode = mode
+        self.channels = CHANNELS[mode]
+        self.compress_level = compress_level
+        self.rows_per_strip = rows_per_strip
+        self.rows = 0
+        self.pending = None
+        self.offsets = []
+        self.counts = []
+        raw = self.width * self.height * self.channels
+        self.bigtiff = raw > 0xFFFFFFFF - (1 << 24)
+        self.f = open(path, "wb")
+        if self.bigtiff:
+            self.f.write(b"II+\x00" + struct.pack("<HHQ", 8, 0, 0))
+        else:
+            self.f.write(b"II*\x00" + struct.pack("<I", 0))
+
+    def write(self, band):
+        rows = _rows(band, self.width, self.channels)
+        if self.pending is not None:
+            rows = np.concatenate([self.pending, rows])
+        n = self.rows_per_strip
+        full = rows.shape[0] // n * n
+        for y in range(0, full, n):
+            self._write_strip(rows[y : y + n])
+        self.pending = rows[full:] if full < rows.shape[0] else None
+        self.rows += band.shape[0]
+
+    def _write_strip(self, rows):
+        c = self.channels
+        diff = rows.copy()
+        diff[:, c:] -= rows[:, :-c]
+        data = zlib.compress(diff, self.compress_level)
+        self.offsets.append(self.f.tell())
+        self.counts.append(len(data))
+        self.f.write(data)
+
+    def _tags(self):
+        offset_type = self.LONG8 if self.bigtiff else self.LONG
+        tags = [
+            (256, self.LONG, [self.width]),
+            (257, self.LONG, [self.height]),
+            (258, self.SHORT, [8] * self.channels),
+            (259, self.SHORT, [8]),  # Deflate
+            (262, self.SHORT, [1 if self.mode == "L" else 2]),
+            (273, offset_type, self.offsets),
+            (277, self.SHORT, [self.channels]),
+            (278, self.LONG, [self.rows_per_strip]),
+            (279, offset_type, self.counts),
+            (284, self.SHORT, [1]),
+            (317, self.SHORT, [2]),  # 水平差分预测
+        ]
+        if self.mode == "RGBA":
+            tags.append((338, self.SHORT, [2]))  # 非预乘 alpha
+        return tags
+
+    def _write_ifd(self):
+        if self.f.tell() % 2:
+            self.f.write(b"\x00")
+        ifd_offset = self.f.tell()
+        tags = self._tags()
+        if self.bigtiff:
+            head, entry, inline, tail = "<Q", "<HHQ", 8, "<Q"
+        else:
+            head, entry, inline, tail = "<H", "<HHI", 4, "<I"
+        entry_size = struct.calcsize(entry) + inline
+        extra_offset = (
+            ifd_offset
+            + struct.calcsize(head)
+            + entry_size * len(tags)
+            + struct.calcsize(tail)
+        )
+        entries, extra = [struct.pack(head, len(tags))], []
+        for tag, typ, values in tags:
+            data = struct.pack(f"<{len(values)}{self.TYPE_FORMATS[typ]}", *values)
+            if len(data) <= inline:
+                value = data.ljust(inline, b"\x00")
+            else:
+                value = struct.pack("<" + entry[-1], extra_offset)
+                extra.append(data)
+                extra_offset += len(data) + len(data) % 2
+                extra.append(b"\x00" * (len(data) % 2))
+            entries.append(struct.pack(entry, tag, typ, len(values)) + value)
+        entries.append(struct.pack(tail, 0))
+        self.f.write(b"".join(entries + extra))
+        return ifd_offset
+
+    def close(self):
+        if self.f.closed:
+            return
+        try:
+            if self.rows != self.height:
+                raise ValueError(f"写入 {self.rows} 行，应为 {self.height} 行")
+            if self.pending is not None:
+                self._write_strip(self.pending)
+                self.pending = None
+            ifd_offset = self._write_ifd()
+            if self.bigtiff:
+                self.f.seek(8)
+                self.f.write(struct.pack("<Q", ifd_offset))
+            else:
+                self.f.seek(4)
+                self.f.write(struct.pack("<I", ifd_offset))
+        finally:
+            self.f.close()
+
+
+def open_strip_writer(path, size, mode="RGBA", fmt=None, compress_level=6):
+    fmt = strip_format(path, fmt)
+    if fmt == "PNG":
+        return PngStripWriter(path, size, mode, compress_level)
+    if fmt == "TIFF":
+        return TiffStripWriter(path, size, mode, compress_level)
+    raise ValueError("超大贴图只能按行带写出为 PNG 或 TIFF")
+
+
+def write_bands(
+    path, size, bands, mode="RGBA", fmt=None, compress_level=6, progress=None
+):
+    # 把行带依次写入文件，出错时删除写了一半的文件
+    # progress(已写行数, 总行数) 每写完一段调用一次，抛出异常即可中止写出
+    writer = open_strip_writer(path, size, mode, fmt, compress_level)
+    try:
+        for band in bands:
+            writer.write(band)
+            if progress is not None:
+                progress(writer.rows, size[1])
+        writer.close()
+    except BaseException:
+        writer.f.close()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        raise
+    return size
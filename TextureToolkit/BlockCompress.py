@@ -0,0 +1,251 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import Resample
+
+# GPU 块压缩（BC1/BC3/BC4/BC5）编码器，纯 NumPy 实现，所有 4x4 块一起计算
+# BC1：RGB 两个 565 端点 + 每像素 2 位索引，8 字节/块（4 bpp），不保存 alpha
+# BC3：BC1 颜色块 + BC4 格式的 alpha 块，16 字节/块（8 bpp）
+# BC4：单通道两个 8 位端点 + 每像素 3 位索引，8 字节/块（4 bpp）
+# BC5：两个 BC4 块分别存 R、G，16 字节/块（8 bpp），常用于法线贴图
+# 颜色端点取块内颜色主轴（协方差矩阵幂迭代）的两端，再按最小二乘修正一次
+
+BC1, BC3, BC4, BC5 = "BC1", "BC3", "BC4", "BC5"
+BLOCK_BYTES = {BC1: 8, BC3: 16, BC4: 8, BC5: 16}
+# 每种压缩格式使用的源通道
+BLOCK_CHANNELS = {BC1: "RGB", BC3: "RGBA", BC4: "R", BC5: "RG"}
+BLOCK_NOTES = {
+    BC1: "RGB 4 bpp，不含 alpha",
+    BC3: "RGBA 8 bpp",
+    BC4: "单通道 4 bpp（灰度图或 R 通道）",
+    BC5: "双通道 8 bpp（R、G，法线贴图）",
+}
+# DDS/KTX2 共用的贴图数据格式：块压缩或未压缩 RGBA8
+RGBA8 = "RGBA8"
+TEXTURE_FORMATS = (BC1, BC3, BC4, BC5, RGBA8)
+TEXTURE_NOTES = dict(BLOCK_NOTES, **{RGBA8: "未压缩 RGBA 32 bpp"})
+# 每段编码的块数，临时数组只占十几 MB
+BAND_BLOCKS = 16384
+
+_COLOR_BLOCK = np.dtype([("c0", "<u2"), ("c1", "<u2"), ("indices", "<u4")])
+
+
+def block_count(size):
+    w, h = size
+    return (w + 3) // 4, (h + 3) // 4
+
+
+def compressed_size(size, fmt):
+    bx, by = block_count(size)
+    return bx * by * BLOCK_BYTES[fmt]
+
+
+def source_channels(img, fmt):
+    # 取出压缩格式需要的通道，返回 (h, w, c) uint8 数组
+    channels = BLOCK_CHANNELS[fmt]
+    if len(channels) == 1 and img.mode in ("L", "LA"):
+        return np.asarray(img.getchannel(0))[..., None]
+    if img.mode != "RGBA":
+        img = img.convert("RGBA")
+    arr = np.asarray(img)
+    return arr[..., ["RGBA".index(c) for c in channels]]
+
+
+def to_blocks(arr):
+    # (h, w, c) -> (块数, 16, c)，不足 4 的边缘复制最后一行/列补齐
+    h, w, c = arr.shape
+    ph, pw = -h % 4, -w % 4
+    if ph or pw:
+        arr = np.pad(arr, ((0, ph), (0, pw), (0, 0)), mode="edge")
+    by, bx = arr.shape[0] // 4, arr.shape[1] // 4
+    blocks = arr.reshape(by, 4, bx, 4, c).transpose(0, 2, 1, 3, 4)
+    return blocks.reshape(by * bx, 16, c)
+
+
+def _expand565(c):
+    r = (c >> 11) & 31
+    g = (c >> 5) & 63
+    b = c & 31
+    return np.stack([(r << 3) | (r >> 2), (g << 2) | (g >> 4), (b << 3) | (b >> 2)], -1)
+
+
+def _pack565(rgb):
+    rgb = np.clip(np.rint(rgb), 0, 255)
+    r = np.rint(rgb[..., 0] * 31 / 255).astype(np.uint16)
+    g = np.rint(rgb[..., 1] * 63 / 255).astype(np.uint16)
+    b = np.rint(rgb[..., 2] * 31 / 255).astype(np.uint16)
+    return (r << 11) | (g << 5) | b
+
+
+def _principal_endpoints(x):
+    # 块内颜色沿主轴投影的最小/最大点
+    mean = x.mean(axis=1)
+    d = x - mean[:, None]
+    cov = np.einsum("nij,nik->njk", d, d)
+    axis = np.ones((x.shape[0], 3), dtype=np.float32)
+    for _ in range(6):
+        axis = np.einsum("njk,nk->nj", cov, axis)
+        norm = np.linalg.norm(axis, axis=1, keepdims=True)
+        axis = np.where(norm > 1e-6, axis / np.maximum(norm, 1e-6), axis)
+    proj = np.einsum("nij,nj->ni", d, axis)
+    hi = mean + proj.max(axis=1)[:, None] * axis
+    lo = mean + proj.min(axis=1)[:, None] * axis
+    return hi, lo
+
+
+def _fit_indices(x, c0, c1):
+    # 按硬件解码规则生成 4 色调色板，返回 (索引, 每块误差)
+    e0 = _expand565(c0).astype(np.float32)
+    e1 = _expand565(c1).astype(np.float32)
+    palette = np.stack(
+        [e0, e1, np.floor((2 * e0 + e1) / 3), np.floor((e0 + 2 * e1) / 3)], axis=1
+    )
+    dist = np.stack(
+        [((x - palette[:, None, k]) ** 2).sum(-1) for k in range(4)], axis=2
+    )
+    indices = dist.argmin(axis=2)
+    error = np.take_along_axis(dist, indices[..., None], 2)[..., 0].sum(axis=1)
+    return indices, error
+
+
+# 索引对应的端点权重：0=c0，1=c1，2=2/3 c0，3=1/3 c0
+_WEIGHTS = np.array([1.0, 0.0, 2 / 3, 1 / 3], dtype=np.float32)
+
+
+def _refine(x, indices):
+    # 固定索引，用最小二乘重新求两个端点
+    a = _WEIGHTS[indices]
+    b = 1 - a
+    aa, bb, ab = (a * a).sum(1), (b * b).sum(1), (a * b).sum(1)
+    ax = np.einsum("ni,nij->nj", a, x)
+    bx = np.einsum("ni,nij->nj", b, x)
+    det = aa * bb - ab * ab
+    ok = np.abs(det) > 1e-6
+    det = np.where(ok, det, 1)[:, None]
+    c0 = (bb[:, None] * ax - ab[:, None] * bx) / det
+    c1 = (aa[:, None] * bx - ab[:, None] * ax) / det
+    return c0, c1, ok
+
+
+def encode_color_blocks(blocks):
+    # blocks: (n, 16, 3) uint8 -> (n,) BC1 颜色块，总是 4 色模式（c0 > c1）
+    x = blocks.astype(np.float32)
+    hi, lo = _principal_endpoints(x)
+    c0, c1 = _pack565(hi), _pack565(lo)
+    indices, error = _fit_indices(x, c0, c1)
+    r0, r1, ok = _refine(x, indices)
+    n0, n1 = _pack565(r0), _pack565(r1)
+    n_indices, n_error = _fit_indices(x, n0, n1)
+    better = ok & (n_error < error)
+    c0 = np.where(better, n0, c0)
+    c1 = np.where(better, n1, c1)
+    indices = np.where(better[:, None], n_indices, indices)
+    # c0 < c1 时交换端点，索引 0<->1、2<->3 对调；相等时只能用索引 0
+    swap = c0 < c1
+    c0, c1 = np.where(swap, c1, c0), np.where(swap, c0, c1)
+    indices = np.where(swap[:, None], indices ^ 1, indices)
+    indices = np.where((c0 == c1)[:, None], 0, indices)
+    out = np.empty(len(blocks), dtype=_COLOR_BLOCK)
+    out["c0"], out["c1"] = c0, c1
+    shifts = np.arange(16, dtype=np.uint32) * 2
+    out["indices"] = (indices.astype(np.uint32) << shifts).sum(1, dtype=np.uint32)
+    return out.view(np.uint8).reshape(-1, 8)
+
+
+def encode_alpha_blocks(values):
+    # values: (n, 16) uint8 -> (n, 8) BC4 块，8 值模式（a0 > a1）
+    a0 = values.max(axis=1).astype(np.int32)
+    a1 = values.min(axis=1).astype(np.int32)
+    span = np.maximum(a0 - a1, 1)[:, None]
+    # 调色板沿 a0 -> a1 等距分成 7 段，位置 0 为索引 0，位置 7 为索引 1，中间 k 为索引 k+1
+    pos = np.rint((a0[:, None] - values) * 7 / span).astype(np.uint64)
+    codes = np.where(pos == 0, 0, np.where(pos == 7, 1, pos + 1))
+    codes = np.where((a0 == a1)[:, None], 0, codes).astype(np.uint64)
+    bits = (codes << (np.arange(16, dtype=np.uint64) * 3)).sum(1, dtype=np.uint64)
+    out = np.empty((len(values), 8), dtype=np.uint8)
+    out[:, 0] = a0
+    out[:, 1] = a1
+    out[:, 2:] = bits.astype("<u8")[:, None].view(np.uint8)[:, :6]
+    return out
+
+
+def encode_blocks(arr, fmt):
+    # arr: (h, w, c) 源通道数组 -> 按块行顺序排列的压缩数据
+    blocks = to_blocks(arr)
+    if fmt == BC1:
+        data = encode_color_blocks(blocks[..., :3])
+    elif fmt == BC3:
+        data = np.concatenate(
+            [encode_alpha_blocks(blocks[..., 3]), encode_color_blocks(blocks[..., :3])],
+            axis=1,
+        )
+    elif fmt == BC4:
+        data = encode_alpha_blocks(blocks[..., 0])
+    elif fmt == BC5:
+        data = np.concatenate(
+            [encode_alpha_blocks(blocks[..., 0]), encode_alpha_blocks(blocks[..., 1])],
+            axis=1,
+        )
+    else:
+        raise ValueError(f"不支持的块压缩格式: {fmt}")
+    return data.tobytes()
+
+
+def compress_image(img, fmt, workers=None, progress=None):
+    # 按块行分段编码，大图分给多个线程（NumPy 计算时释放 GIL），线程数与缩放相同
+    # progress(已编码行数) 每段完成后调用一次，抛出异常时丢弃还没开始的段
+    arr = source_channels(img, fmt)
+    rows = max(1, BAND_BLOCKS // block_count(img.size)[0]) * 4
+    bands = [arr[y : y + rows] for y in range(0, arr.shape[0], rows)]
+    workers = min(workers or Resample.RESIZE_WORKERS, len(bands))
+    data = []
+
+    def collect(part):
+        data.append(part)
+        if progress is not None:
+            progress(min(len(data) * rows, arr.shape[0]))
+
+    if workers <= 1:
+        for band in bands:
+            collect(encode_blocks(band, fmt))
+        return b"".join(data)
+    with ThreadPoolExecutor(workers, thread_name_prefix="BlockCompress") as pool:
+        futures = [pool.submit(encode_blocks, band, fmt) for band in bands]
+        try:
+            for future in futures:
+                collect(future.result())
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+    return b"".join(data)
+
+
+def level_size(size, fmt):
+    # 一级数据的字节数
+    if fmt == RGBA8:
+        return size[0] * size[1] * 4
+    return compressed_size(size, fmt)
+
+
+def encode_level(img, fmt, workers=None, progress=None):
+    if fmt == RGBA8:
+        data = np.asarray(img.convert("RGBA")).tobytes()
+        if progress is not None:
+            progress(img.height)
+        return data
+    return compress_image(img, fmt, workers, progress)
+
+
+def encode_levels(levels, fmt, workers=None, progress=None):
+    # 依次编码 mip 链的每一级，逐级产出压缩数据
+    # progress(已完成像素数, 总像素数) 按像素数计算，第 0 级约占四分之三
+    total = sum(img.width * img.height for img in levels)
+    done = width = 0
+
+    def report(rows):
+        progress(done + rows * width, total)
+
+    for img in levels:
+        width = img.width
+        yield encode_level(img, fmt, workers, report if progress else None)
+        done += img.width * img.height
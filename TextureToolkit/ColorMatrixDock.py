@@ -7,7 +7,6 @@ from PyQt6.QtWidgets import (
     QSpinBox,
     QFrame,
     QSplitter,
-    QGridLayout,
     QLabel,
     QSizePolicy,
     QLineEdit,
@@ -19,31 +18,23 @@ from PyQt6.QtWidgets import (
     QFileDialog,
     QColorDialog,
 )
-from PyQt6.QtCore import Qt, QSize, QMimeData
-from PyQt6.QtGui import QPixmap, QColor, QPainter, QDrag
-from PIL import Image, ImageQt
-from typing import Optional, List, cast
-
-
-class MatrixButton(QPushButton):
-    def __init__(self, row: int, col: int, grid_ref, parent=None):
-        super().__init__(parent)
-        self.row = row
-        self.col = col
-        self.grid_ref = grid_ref
-        self.setAcceptDrops(True)
-
-    def dragEnterEvent(self, event):
-        if event.mimeData().hasText():
-            event.acceptProposedAction()
-        else:
-            event.ignore()
-
-    def dropEvent(self, event):
-        color = event.mimeData().text()
-        self.setStyleSheet(f"background-color: {color}; border: 2px solid black;")
-        self.grid_ref.set_cell_color(self.row, self.col, color)
-        event.acceptProposedAction()
+from PyQt6.QtCore import Qt, QRect, QSize, QMimeData
+from PyQt6.QtGui import QPixmap, QColor, QPainter, QPen, QDrag
+from bisect import bisect_right
+from PIL import Image
+from typing import Optional, List
+import numpy as np
+from Library.ImageBridge import array_to_qimage
+from Encoders import (
+    GPU_FORMATS,
+    SAVE_FILTERS,
+    encode,
+    filter_format,
+    normalize_format,
+)
+from Library.EncodePresetComboBox import EncodePresetComboBox
+from Library.SaveWorker import SaveWorker
+from functools import partial
 
 
 class ColorButton(QPushButton):
@@ -65,16 +56,105 @@ class ColorButton(QPushButton):
         drag.exec(Qt.DropAction.MoveAction)
 
 
-class FillButton(QPushButton):
-    def __init__(self, axis: str, idx: int, grid_ref, parent=None):
+class MatrixCanvas(QWidget):
+    # 颜色矩阵编辑区：整块自绘，鼠标位置换算成格子，改色时只重绘变化的区域
+    # 顶部一行、左侧一列是整列/整行填充手柄；点击选色，或把历史颜色拖进来
+    HEADER = 24
+
+    def __init__(self, grid_ref, parent=None):
         super().__init__(parent)
-        self.axis = axis  # 'row' or 'col'
-        self.idx = idx
         self.grid_ref = grid_ref
         self.setAcceptDrops(True)
-        self.setFixedSize(24, 24)
-        self.setText("→" if axis == "row" else "↓")
-        self.setStyleSheet("border:1px solid #888; background:#eee; font-size:14px;")
+
+    def edges(self):
+        # 每列/每行的起点（像素），最后一项为终点，格子尺寸不能整除时按比例取整
+        grid = self.grid_ref
+        w, h = self.width() - self.HEADER, self.height() - self.HEADER
+        xs = [self.HEADER + c * w // grid.cols for c in range(grid.cols + 1)]
+        ys = [self.HEADER + r * h // grid.rows for r in range(grid.rows + 1)]
+        return xs, ys
+
+    @staticmethod
+    def span(edges, lo, hi):
+        # 与 [lo, hi] 相交的格子范围 [i0, i1)
+        i0 = max(0, bisect_right(edges, lo) - 1)
+        i1 = min(len(edges) - 1, bisect_right(edges, hi))
+        return i0, i1
+
+    def cells_at(self, pos):
+        # 鼠标位置对应的格子；在手柄上时为整行或整列，不在矩阵上时为空
+        grid = self.grid_ref
+        xs, ys = self.edges()
+        x, y = int(pos.x()), int(pos.y())
+        col = bisect_right(xs, x) - 1 if self.HEADER <= x < xs[-1] else None
+        row = bisect_right(ys, y) - 1 if self.HEADER <= y < ys[-1] else None
+        if row is not None and col is not None:
+            return [(row, col)]
+        if col is not None and y < self.HEADER:
+            return [(r, col) for r in range(grid.rows)]
+        if row is not None and x < self.HEADER:
+            return [(row, c) for c in range(grid.cols)]
+        return []
+
+    def update_cells(self, cells):
+        # 只重绘包住这些格子的矩形
+        xs, ys = self.edges()
+        rows, cols = zip(*cells)
+        r0, r1 = min(rows), max(rows) + 1
+        c0, c1 = min(cols), max(cols) + 1
+        self.update(QRect(xs[c0], ys[r0], xs[c1] - xs[c0], ys[r1] - ys[r0]))
+
+    def paintEvent(self, event):
+        grid = self.grid_ref
+        rect = event.rect()
+        xs, ys = self.edges()
+        c0, c1 = self.span(xs, rect.left(), rect.right())
+        r0, r1 = self.span(ys, rect.top(), rect.bottom())
+        painter = QPainter(self)
+        header_pen, header_fill = QColor("#888"), QColor("#eee")
+        if rect.top() < self.HEADER:
+            for c in range(c0, c1):
+                cell = QRect(xs[c], 0, xs[c + 1] - xs[c], self.HEADER)
+                self.paint_cell(painter, cell, header_fill, header_pen, "↓")
+        if rect.left() < self.HEADER:
+            for r in range(r0, r1):
+                cell = QRect(0, ys[r], self.HEADER, ys[r + 1] - ys[r])
+                self.paint_cell(painter, cell, header_fill, header_pen, "→")
+        # 已填充：本色 + 黑框；未填充：浅灰 + 红框
+        filled_pen, empty_pen = QColor("black"), QColor("red")
+        empty_fill = QColor("lightgrey")
+        colors = grid.color_matrix[r0:r1, c0:c1].tolist()
+        for r, line in zip(range(r0, r1), colors):
+            for c, (red, green, blue, alpha) in zip(range(c0, c1), line):
+                cell = QRect(xs[c], ys[r], xs[c + 1] - xs[c], ys[r + 1] - ys[r])
+                if alpha:
+                    fill, pen = QColor(red, green, blue), filled_pen
+                else:
+                    fill, pen = empty_fill, empty_pen
+                self.paint_cell(painter, cell, fill, pen, str(r * grid.cols + c + 1))
+        painter.end()
+
+    @staticmethod
+    def paint_cell(painter, cell, fill, pen, text):
+        painter.fillRect(cell, fill)
+        # 格子太小时只画颜色
+        if cell.width() < 6 or cell.height() < 6:
+            return
+        width = 2 if min(cell.width(), cell.height()) >= 16 else 1
+        painter.setPen(QPen(pen, width))
+        painter.drawRect(cell.adjusted(width // 2, width // 2, -1, -1))
+        if cell.width() >= 8 * len(text) and cell.height() >= 14:
+            painter.setPen(QColor("black"))
+            painter.drawText(cell, Qt.AlignmentFlag.AlignCenter, text)
+
+    def mousePressEvent(self, event):
+        cells = self.cells_at(event.position())
+        if event.button() != Qt.MouseButton.LeftButton or not cells:
+            super().mousePressEvent(event)
+            return
+        color = QColorDialog.getColor()
+        if color.isValid():
+            self.grid_ref.set_cells_color(cells, color.name())
 
     def dragEnterEvent(self, event):
         if event.mimeData().hasText():
@@ -82,42 +162,39 @@ class FillButton(QPushButton):
         else:
             event.ignore()
 
-    def dropEvent(self, event):
-        color = event.mimeData().text()
-        self.fill(color)
-        event.acceptProposedAction()
-
-    def mousePressEvent(self, event):
-        if event.button() == Qt.MouseButton.LeftButton:
-            color = QColorDialog.getColor()
-            if color.isValid():
-                self.fill(color.name())
+    def dragMoveEvent(self, event):
+        if self.cells_at(event.position()):
+            event.acceptProposedAction()
         else:
-            super().mousePressEvent(event)
+            event.ignore()
 
-    def fill(self, color):
-        if self.axis == "row":
-            for c in range(self.grid_ref.cols):
-                self.grid_ref.set_cell_color(self.idx, c, color)
-        else:
-            for r in range(self.grid_ref.rows):
-                self.grid_ref.set_cell_color(r, self.idx, color)
+    def dropEvent(self, event):
+        cells = self.cells_at(event.position())
+        if not cells:
+            event.ignore()
+            return
+        self.grid_ref.set_cells_color(cells, event.mimeData().text())
+        event.acceptProposedAction()
 
 
 class ColorMatrixGrid(QWidget):
     def __init__(
-        self, rows: int = 3, cols: int = 3, parent=None, on_matrix_changed=None
+        self,
+        rows: int = 3,
+        cols: int = 3,
+        parent=None,
+        on_matrix_changed=None,
+        on_cells_changed=None,
     ):
         super().__init__(parent)
         self.rows = rows
         self.cols = cols
-        self.color_matrix: List[List[Optional[str]]] = [
-            [None] * cols for _ in range(rows)
-        ]
-        self.buttons: List[MatrixButton] = []
+        # rows x cols x RGBA，A=0 表示未填充
+        self.color_matrix = np.zeros((rows, cols, 4), dtype=np.uint8)
         self.history: List[ColorButton] = []
-        self.marked_cells: List[tuple] = []  # 标记未填充格子
         self.on_matrix_changed = on_matrix_changed
+        # 只有部分格子变化时回调 on_cells_changed(cells)，不必整体重建
+        self.on_cells_changed = on_cells_changed
         self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
         self.init_ui()
 
@@ -126,16 +203,10 @@ class ColorMatrixGrid(QWidget):
         layout.setContentsMargins(0, 0, 0, 0)
         layout.setSpacing(8)
 
-        # 新增：矩阵区带行列批量填充按钮
-        self.matrix_area = QWidget()
-        self.matrix_layout = QGridLayout(self.matrix_area)
-        self.matrix_layout.setSpacing(0)
-        self.matrix_layout.setContentsMargins(0, 0, 0, 0)
+        # 矩阵区带行列批量填充手柄，整块自绘
+        self.matrix_area = MatrixCanvas(self)
         layout.addWidget(self.matrix_area, stretch=1)
 
-        self.row_fill_buttons = []
-        self.col_fill_buttons = []
-
         # 历史颜色区域（横向+可滚动）
         self.history_widget = QWidget()
         self.history_area = QHBoxLayout(self.history_widget)
@@ -161,68 +232,45 @@ class ColorMatrixGrid(QWidget):
         history_layout.addWidget(self.history_scroll)
         layout.addWidget(history_group)
 
-        self.create_matrix_buttons(self.rows, self.cols)
-
     def set_matrix_size(self, rows: int, cols: int):
         self.rows = rows
         self.cols = cols
-        self.color_matrix = [[None] * cols for _ in range(rows)]
-        self.create_matrix_buttons(rows, cols)
-        self.adjust_button_size()
+        self.color_matrix = np.zeros((rows, cols, 4), dtype=np.uint8)
+        self.matrix_area.update()
         if self.on_matrix_changed:
             self.on_matrix_changed()
 
     def set_all_white(self):
-        for r in range(self.rows):
-            for c in range(self.cols):
-                self.color_matrix[r][c] = "#FFFFFF"
-        self.update_ui()
-        self.adjust_button_size()
+        self.color_matrix[...] = 255
+        self.matrix_area.update()
         if self.on_matrix_changed:
             self.on_matrix_changed()
 
-    def resizeEvent(self, event):
-        super().resizeEvent(event)
-        self.adjust_button_size()
-
-    def adjust_button_size(self):
-        area_width = self.matrix_area.width()
-        area_height = self.matrix_area.height()
-        rows = self.rows
-        cols = self.cols
-        if cols == 0 or rows == 0:
-            return
-        button_width = max(10, int(area_width / cols))
-        button_height = max(10, int(area_height / rows))
-        for button in self.buttons:
-            button.setFixedSize(button_width, button_height)
-        self.matrix_layout.setSpacing(0)
+    def cell_color(self, row: int, col: int) -> Optional[str]:
+        r, g, b, a = self.color_matrix[row, col]
+        return f"#{r:02x}{g:02x}{b:02x}" if a else None
 
     def set_cell_color(self, row: int, col: int, color: str):
-        self.color_matrix[row][col] = color
-        self.add_to_history(QColor(color))
-        # 移除标记
-        if (row, col) in self.marked_cells:
-            self.marked_cells.remove((row, col))
-        self.update_ui()
-        self.adjust_button_size()
-        if self.on_matrix_changed:
-            self.on_matrix_changed()
+        self.set_cells_color([(row, col)], color)
 
-    def on_button_click(self):
-        sender = self.sender()
-        if sender is None:
-            return
-        button = cast(MatrixButton, sender)
-        if button not in self.buttons:
+    def set_cells_color(self, cells: List[tuple], color: str):
+        if not cells:
             return
-        index = self.buttons.index(button)
-        row, col = divmod(index, self.cols)
-
-        color = QColorDialog.getColor()
-        if color.isValid():
-            self.add_to_history(color)
-            self.set_cell_color(row, col, color.name())
+        qcolor = QColor(color)
+        rows, cols = zip(*cells)
+        self.color_matrix[list(rows), list(cols)] = (
+            qcolor.red(),
+            qcolor.green(),
+            qcolor.blue(),
+            255,
+        )
+        self.add_to_history(qcolor)
+        # 只重绘变化的格子
+        self.matrix_area.update_cells(cells)
+        if self.on_cells_changed:
+            self.on_cells_changed(cells)
+        elif self.on_matrix_changed:
+            self.on_matrix_changed()
 
     def add_to_history(self, color: QColor):
         color_name = color.name()
@@ -230,77 +278,21 @@ class ColorMatrixGrid(QWidget):
             color_cube = ColorButton(color_name)
             self.history_area.insertWidget(0, color_cube)
             self.history.append(color_cube)
-            if self.on_matrix_changed:
-                self.on_matrix_changed()
-
-    def update_ui(self):
-        self.marked_cells.clear()
-        for row in range(self.rows):
-            for col in range(self.cols):
-                index = row * self.cols + col
-                color = self.color_matrix[row][col]
-                if index < len(self.buttons):
-                    if color:
-                        self.buttons[index].setStyleSheet(
-                            f"background-color: {color}; border: 2px solid black;"
-                        )
-                    else:
-                        self.buttons[index].setStyleSheet(
-                            "background-color: lightgrey; border: 2px solid red;"
-                        )
-                        self.marked_cells.append((row, col))
-        self.adjust_button_size()
-
-    def create_matrix_buttons(self, rows: int, cols: int):
-        for button in self.buttons:
-            button.setParent(None)
-        self.buttons.clear()
-        # 清理批量按钮
-        for btn in getattr(self, "row_fill_buttons", []):
-            btn.setParent(None)
-        for btn in getattr(self, "col_fill_buttons", []):
-            btn.setParent(None)
-        self.row_fill_buttons = []
-        self.col_fill_buttons = []
-        layout = self.matrix_layout
-        while layout.count():
-            item = layout.takeAt(0)
-            if item is not None:
-                widget = item.widget()
-                if widget:
-                    widget.setParent(None)
-        # 列批量按钮
-        for c in range(cols):
-            btn = FillButton("col", c, self)
-            self.col_fill_buttons.append(btn)
-            layout.addWidget(btn, 0, c + 1)
-        # 行批量按钮
-        for r in range(rows):
-            btn = FillButton("row", r, self)
-            self.row_fill_buttons.append(btn)
-            layout.addWidget(btn, r + 1, 0)
-        # 矩阵按钮
-        for r in range(rows):
-            for c in range(cols):
-                button = MatrixButton(r, c, self)
-                button.setText(f"{r * cols + c + 1}")
-                button.setStyleSheet(
-                    "background-color: lightgrey; border: 2px solid black;"
-                )
-                button.clicked.connect(self.on_button_click)
-                self.buttons.append(button)
-                layout.addWidget(button, r + 1, c + 1)
+
+    def unfilled_cells(self) -> List[tuple]:
+        rows, cols = np.nonzero(self.color_matrix[..., 3] == 0)
+        return list(zip(rows.tolist(), cols.tolist()))
 
     def get_matrix(self) -> List[List[str]]:
-        color_matrix = []
-        for row in self.color_matrix:
-            color_matrix.append(
-                [button_color if button_color else "#FFFFFF" for button_color in row]
-            )
-        return color_matrix
+        return [
+            [self.cell_color(r, c) or "#FFFFFF" for c in range(self.cols)]
+            for r in range(self.rows)
+        ]
 
-    def on_matrix_button_color_changed(self, row: int, col: int, color: str):
-        self.set_cell_color(row, col, color)
+    def get_array(self, default_rgb=(255, 255, 255)) -> np.ndarray:
+        # rows x cols x RGB，未填充的格子用默认色
+        filled = self.color_matrix[..., 3:] > 0
+        return np.where(filled, self.color_matrix[..., :3], np.uint8(default_rgb))
 
 
 class ColorMatrixDock(QDockWidget):
@@ -311,6 +303,8 @@ class ColorMatrixDock(QDockWidget):
             QDockWidget.DockWidgetFeature.DockWidgetMovable
             | QDockWidget.DockWidgetFeature.DockWidgetClosable
         )
+        # 保存在后台线程编码，显示进度并可以取消
+        self.save_worker = SaveWorker(self)
         self.init_ui()
 
     def init_ui(self):
@@ -321,12 +315,12 @@ class ColorMatrixDock(QDockWidget):
         control_layout = QHBoxLayout()
         control_layout.addWidget(QLabel("行数:"))
         self.spin_rows = QSpinBox()
-        self.spin_rows.setRange(1, 12)
+        self.spin_rows.setRange(1, 128)
         self.spin_rows.setValue(3)
         control_layout.addWidget(self.spin_rows)
         control_layout.addWidget(QLabel("列数:"))
         self.spin_cols = QSpinBox()
-        self.spin_cols.setRange(1, 12)
+        self.spin_cols.setRange(1, 128)
         self.spin_cols.setValue(3)
         control_layout.addWidget(self.spin_cols)
         self.btn_generate = QPushButton("生成矩阵")
@@ -391,6 +385,9 @@ class ColorMatrixDock(QDockWidget):
         output_layout = QHBoxLayout()
         self.btn_save = QPushButton("保存图片")
         output_layout.addWidget(self.btn_save)
+        output_layout.addWidget(QLabel("压缩:"))
+        self.combo_encode = EncodePresetComboBox()
+        output_layout.addWidget(self.combo_encode)
         output_layout.addStretch()
         main_layout.addLayout(output_layout)
 
@@ -398,7 +395,14 @@ class ColorMatrixDock(QDockWidget):
         splitter = QSplitter(Qt.Orientation.Horizontal)
 
         # 左侧：颜色矩阵编辑区
-        self.matrix_grid = ColorMatrixGrid(3, 3, on_matrix_changed=self.update_preview)
+        # 预览缓存：每个格子一个像素，单格修改时直接改像素
+        self.preview_image = None
+        self.matrix_grid = ColorMatrixGrid(
+            3,
+            3,
+            on_matrix_changed=self.update_preview,
+            on_cells_changed=self.update_preview_cells,
+        )
         self.matrix_grid.matrix_area.setFixedSize(300, 300)
         splitter.addWidget(self.matrix_grid)
 
@@ -481,38 +485,53 @@ class ColorMatrixDock(QDockWidget):
         else:
             return self.spin_custom_w.value(), self.spin_custom_h.value()
 
+    def get_color_array(self):
+        return self.matrix_grid.get_array(self.hex_to_rgb(self.default_color))
+
     def update_preview(self):
-        color_matrix = self.matrix_grid.get_matrix()
-        rows = len(color_matrix)
-        cols = len(color_matrix[0]) if rows > 0 else 0
+        rgb = self.get_color_array()
+        rows, cols = rgb.shape[:2]
         if rows == 0 or cols == 0:
+            self.preview_image = None
             self.label_preview.clear()
             return
+        self.preview_image = array_to_qimage(rgb)
+        self.show_preview()
+
+    def update_preview_cells(self, cells):
+        grid = self.matrix_grid
+        if self.preview_image is None or self.preview_image.size() != QSize(
+            grid.cols, grid.rows
+        ):
+            self.update_preview()
+            return
+        default = QColor(self.default_color)
+        for row, col in cells:
+            r, g, b, a = grid.color_matrix[row, col]
+            color = QColor(int(r), int(g), int(b)) if a else default
+            self.preview_image.setPixelColor(col, row, color)
+        self.show_preview()
+
+    def show_preview(self):
+        # 每格一个像素的缓存图按导出比例放大到预览框
         export_w, export_h = self.get_export_resolution()
-        from PIL import Image, ImageQt
-
-        img = Image.new("RGB", (cols, rows), color=self.hex_to_rgb(self.default_color))
-        for r in range(rows):
-            for c in range(cols):
-                color = color_matrix[r][c]
-                rgb = (
-                    self.hex_to_rgb(color)
-                    if color
-                    else self.hex_to_rgb(self.default_color)
-                )
-                img.putpixel((c, r), rgb)
-        img = img.resize((export_w, export_h), resample=Image.Resampling.NEAREST)
-        qimg = ImageQt.ImageQt(img)
-        pix = QPixmap.fromImage(qimg)
+        size = QSize(export_w, export_h).scaled(
+            200, 200, Qt.AspectRatioMode.KeepAspectRatio
+        )
         self.label_preview.setPixmap(
-            pix.scaled(200, 200, Qt.AspectRatioMode.KeepAspectRatio)
+            QPixmap.fromImage(
+                self.preview_image.scaled(
+                    size,
+                    Qt.AspectRatioMode.IgnoreAspectRatio,
+                    Qt.TransformationMode.FastTransformation,
+                )
+            )
         )
 
     def save_output(self):
         try:
-            color_matrix = self.matrix_grid.get_matrix()
-            rows = len(color_matrix)
-            cols = len(color_matrix[0]) if rows > 0 else 0
+            rgb = self.get_color_array()
+            rows, cols = rgb.shape[:2]
             export_w, export_h = self.get_export_resolution()
             if rows == 0 or cols == 0:
                 self.label_status.setText("Matrix not generated")
@@ -521,39 +540,45 @@ class ColorMatrixDock(QDockWidget):
                 self,
                 "保存输出",
                 "colormatrix.png",
-                "PNG Files (*.png);;JPEG Files (*.jpg *.jpeg);;BMP Files (*.bmp);;All Files (*)",
+                SAVE_FILTERS,
             )
             if not file:
                 return
-            if selected_filter.startswith("PNG"):
-                fmt = "PNG"
-            elif selected_filter.startswith("JPEG"):
-                fmt = "JPEG"
-            elif selected_filter.startswith("BMP"):
-                fmt = "BMP"
-            else:
-                fmt = None
-            from PIL import Image
-
-            img = Image.new(
-                "RGB", (cols, rows), color=self.hex_to_rgb(self.default_color)
+            fmt, options = filter_format(selected_filter)
+            job = partial(
+                self.write_output,
+                file,
+                fmt,
+                options,
+                self.combo_encode.get_value(),
+                rgb,
+                (export_w, export_h),
             )
-            for r in range(rows):
-                for c in range(cols):
-                    color = color_matrix[r][c]
-                    rgb = (
-                        self.hex_to_rgb(color)
-                        if color
-                        else self.hex_to_rgb(self.default_color)
-                    )
-                    img.putpixel((c, r), rgb)
-            img = img.resize((export_w, export_h), resample=Image.Resampling.NEAREST)
-            img.save(file, format=fmt)
-            self.label_status.setText(f"Saved to {file}")
-            QMessageBox.information(self, "保存成功", f"已保存到: {file}")
+            self.save_worker.start(job, partial(self.on_saved, file))
         except Exception as e:
             self.label_status.setText(f"Error: {e}")
 
+    @staticmethod
+    def write_output(file, fmt, options, preset, rgb, size, progress):
+        # 工作线程中执行：按导出分辨率放大后编码写出
+        img = Image.fromarray(rgb).resize(size, resample=Image.Resampling.NEAREST)
+        # 颜色矩阵按格取色，DDS/KTX2 只写一级，缩小会混合相邻颜色
+        return encode(
+            img,
+            file,
+            fmt,
+            preset,
+            mips=1 if normalize_format(fmt, file) in GPU_FORMATS else None,
+            progress=progress,
+            **options,
+        )
+
+    def on_saved(self, file, result):
+        self.label_status.setText(f"Saved to {file}")
+        QMessageBox.information(
+            self, "保存成功", f"已保存到: {file}\n{result.summary()}"
+        )
+
     def hex_to_rgb(self, hex_color: str) -> tuple:
         hex_color = hex_color.lstrip("#")
         lv = len(hex_color)
@@ -563,7 +588,6 @@ class ColorMatrixDock(QDockWidget):
         w = self.spin_width.value()
         h = self.spin_height.value()
         self.matrix_grid.matrix_area.setFixedSize(w, h)
-        self.matrix_grid.adjust_button_size()
 
     def pick_default_color(self):
         color = QColorDialog.getColor()
@@ -573,7 +597,8 @@ class ColorMatrixDock(QDockWidget):
                 f"background:{self.default_color}; border:1px solid #888;"
             )
             # 同步填充所有未填充格子
-            for row, col in self.matrix_grid.marked_cells[:]:
-                self.matrix_grid.set_cell_color(row, col, self.default_color)
+            self.matrix_grid.set_cells_color(
+                self.matrix_grid.unfilled_cells(), self.default_color
+            )
             # 无论是否有未填充格子，都刷新预览
             self.update_preview()
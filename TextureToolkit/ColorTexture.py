@@ -1,4 +1,5 @@
 import argparse
+import numpy as np
 from PIL import Image
 from PyQt6.QtWidgets import (
     QDockWidget,
@@ -8,6 +9,7 @@ from PyQt6.QtWidgets import (
     QPushButton,
     QHBoxLayout,
     QLineEdit,
+    QCheckBox,
 )
 from PyQt6.QtCore import Qt
 
@@ -26,6 +28,11 @@ def parse_args():
         "--cell_size", type=int, default=100, help="每格的像素尺寸，正方形"
     )
     parser.add_argument("--output", type=str, default="output.png", help="输出图片路径")
+    parser.add_argument(
+        "--palette",
+        action="store_true",
+        help="输出索引色(P模式)图片，每像素1字节，颜色不超过256种时生效",
+    )
     return parser.parse_args()
 
 
@@ -35,6 +42,27 @@ def hex_to_rgb(hex_color):
     return tuple(int(hex_color[i : i + lv // 3], 16) for i in range(0, lv, lv // 3))
 
 
+def make_grid_image(colors, rows, cols, cell_size, palette=False):
+    # 先得到 rows x cols 的颜色数组，再按格子整块广播成整张图片
+    rgb = np.array(
+        [hex_to_rgb(c) for c in colors[: rows * cols]], dtype=np.uint8
+    ).reshape(rows, cols, 3)
+    if palette:
+        table, index = np.unique(rgb.reshape(-1, 3), axis=0, return_inverse=True)
+        if len(table) <= 256:
+            index = index.reshape(rows, cols).astype(np.uint8)
+            pixels = np.broadcast_to(
+                index[:, None, :, None], (rows, cell_size, cols, cell_size)
+            ).reshape(rows * cell_size, cols * cell_size)
+            img = Image.fromarray(pixels)
+            img.putpalette(table.tobytes())
+            return img
+    pixels = np.broadcast_to(
+        rgb[:, None, :, None, :], (rows, cell_size, cols, cell_size, 3)
+    ).reshape(rows * cell_size, cols * cell_size, 3)
+    return Image.fromarray(pixels)
+
+
 def main():
     args = parse_args()
     rows, cols = args.rows, args.cols
@@ -45,16 +73,8 @@ def main():
     if len(colors) < rows * cols:
         raise ValueError(f"颜色数量不足，需要 {rows * cols} 个颜色")
 
-    img = Image.new("RGB", (cols * cell_size, rows * cell_size), color=(255, 255, 255))
-    for r in range(rows):
-        for c in range(cols):
-            idx = r * cols + c
-            color = colors[idx]
-            rgb = hex_to_rgb(color)
-            for y in range(r * cell_size, (r + 1) * cell_size):
-                for x in range(c * cell_size, (c + 1) * cell_size):
-                    img.putpixel((x, y), rgb)
-    img.save(output)
+    img = make_grid_image(colors, rows, cols, cell_size, palette=args.palette)
+    img.save(output, optimize=img.mode == "P")
     print(f"已保存宫格图片到 {output}")
 
 
@@ -100,6 +120,9 @@ class ColorTextureDock(QDockWidget):
         self.input_output = QLineEdit("output.png")
         output_layout.addWidget(self.input_output)
         layout.addLayout(output_layout)
+        # 索引色输出
+        self.chk_palette = QCheckBox("索引色PNG")
+        layout.addWidget(self.chk_palette)
         # 生成按钮
         self.btn_generate = QPushButton("生成宫格图片")
         layout.addWidget(self.btn_generate)
@@ -121,18 +144,9 @@ class ColorTextureDock(QDockWidget):
             if len(colors) < rows * cols:
                 self.label_status.setText(f"颜色数量不足，需要 {rows * cols} 个颜色")
                 return
-            img = Image.new(
-                "RGB", (cols * cell_size, rows * cell_size), color=(255, 255, 255)
-            )
-            for r in range(rows):
-                for c in range(cols):
-                    idx = r * cols + c
-                    color = colors[idx]
-                    rgb = hex_to_rgb(color)
-                    for y in range(r * cell_size, (r + 1) * cell_size):
-                        for x in range(c * cell_size, (c + 1) * cell_size):
-                            img.putpixel((x, y), rgb)
-            img.save(output)
+            palette = self.chk_palette.isChecked() and output.lower().endswith(".png")
+            img = make_grid_image(colors, rows, cols, cell_size, palette=palette)
+            img.save(output, optimize=img.mode == "P")
             self.label_status.setText(f"已保存宫格图片到 {output}")
         except Exception as e:
             self.label_status.setText(f"错误: {e}")
@@ -13,10 +13,11 @@ from PyQt6.QtWidgets import (
     QSplitter,
     QGridLayout,
     QFileDialog,
+    QCheckBox,
 )
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QPixmap, QColor, QPainter
-from PIL import Image
+from ColorTexture import make_grid_image
 
 
 class ColorTextureDock(QDockWidget):
@@ -62,6 +63,9 @@ class ColorTextureDock(QDockWidget):
         self.input_output = QLineEdit("color_matrix.png")
         self.input_output.setFixedWidth(180)
         btn_layout.addWidget(self.input_output)
+        # 索引色输出
+        self.chk_palette = QCheckBox("索引色PNG")
+        btn_layout.addWidget(self.chk_palette)
         self.btn_save = QPushButton("Save")
         self.btn_save.setSizePolicy(
             QSizePolicy.Policy.Maximum, QSizePolicy.Policy.Fixed
@@ -187,21 +191,10 @@ class ColorTextureDock(QDockWidget):
             if rows == 0 or cols == 0:
                 self.label_status.setText("Matrix not generated")
                 return
-            img = Image.new(
-                "RGB", (cols * cell_size, rows * cell_size), color=(255, 255, 255)
-            )
-            for r in range(rows):
-                for c in range(cols):
-                    rgb = self.hex_to_rgb(self.color_matrix[r][c])
-                    for y in range(r * cell_size, (r + 1) * cell_size):
-                        for x in range(c * cell_size, (c + 1) * cell_size):
-                            img.putpixel((x, y), rgb)
-            img.save(output)
+            colors = [color for row in self.color_matrix for color in row]
+            palette = self.chk_palette.isChecked() and output.lower().endswith(".png")
+            img = make_grid_image(colors, rows, cols, cell_size, palette=palette)
+            img.save(output, optimize=img.mode == "P")
             self.label_status.setText(f"Saved to {output}")
         except Exception as e:
             self.label_status.setText(f"Error: {e}")
-
-    def hex_to_rgb(self, hex_color):
-        hex_color = hex_color.lstrip("#")
-        lv = len(hex_color)
-        return tuple(int(hex_color[i : i + lv // 3], 16) for i in range(0, lv, lv // 3))
@@ -0,0 +1,78 @@
+import struct
+from BlockCompress import (
+    BC1,
+    BC3,
+    BC4,
+    BC5,
+    RGBA8,
+    TEXTURE_FORMATS,
+    encode_levels,
+    level_size,
+)
+
+# DDS 写出：块压缩或未压缩 RGBA8，可带完整 mip 链，GPU 直接采样不需要再转码
+# BC4/BC5 使用 ATI1/ATI2 FourCC，兼容只认旧格式头的引擎和工具
+
+DDS_FORMATS = TEXTURE_FORMATS
+# 保存对话框里的 DDS 选项，每种压缩格式一项
+DDS_FILTERS = ";;".join(f"DDS {fmt} (*.dds)" for fmt in DDS_FORMATS)
+FOURCC = {BC1: b"DXT1", BC3: b"DXT5", BC4: b"ATI1", BC5: b"ATI2"}
+
+DDSD_CAPS, DDSD_HEIGHT, DDSD_WIDTH = 0x1, 0x2, 0x4
+DDSD_PITCH, DDSD_PIXELFORMAT = 0x8, 0x1000
+DDSD_MIPMAPCOUNT, DDSD_LINEARSIZE = 0x20000, 0x80000
+DDPF_ALPHAPIXELS, DDPF_FOURCC, DDPF_RGB = 0x1, 0x4, 0x40
+DDSCAPS_COMPLEX, DDSCAPS_TEXTURE, DDSCAPS_MIPMAP = 0x8, 0x1000, 0x400000
+
+
+def dds_header(size, fmt, mip_count):
+    w, h = size
+    flags = DDSD_CAPS | DDSD_HEIGHT | DDSD_WIDTH | DDSD_PIXELFORMAT
+    caps = DDSCAPS_TEXTURE
+    if mip_count > 1:
+        flags |= DDSD_MIPMAPCOUNT
+        caps |= DDSCAPS_COMPLEX | DDSCAPS_MIPMAP
+    if fmt == RGBA8:
+        flags |= DDSD_PITCH
+        pitch = w * 4
+        pixel_format = struct.pack(
+            "<II4s5I",
+            32,
+            DDPF_RGB | DDPF_ALPHAPIXELS,
+            b"\x00" * 4,
+            32,
+            0x000000FF,
+            0x0000FF00,
+            0x00FF0000,
+            0xFF000000,
+        )
+    else:
+        flags |= DDSD_LINEARSIZE
+        pitch = level_size(size, fmt)
+        pixel_format = struct.pack(
+            "<II4s5I", 32, DDPF_FOURCC, FOURCC[fmt], 0, 0, 0, 0, 0
+        )
+    header = struct.pack("<7I", 124, flags, h, w, pitch, 0, mip_count)
+    header += b"\x00" * 44 + pixel_format
+    header += struct.pack("<5I", caps, 0, 0, 0, 0)
+    return b"DDS " + header
+
+
+def write_dds(path, levels, fmt=BC3, workers=None, progress=None):
+    # levels 为从大到小的 mip 链（PIL 图片），每级依次编码写入，返回文件字节数
+    # progress(已完成, 总数) 见 BlockCompress.encode_levels
+    if fmt not in DDS_FORMATS:
+        raise ValueError(f"DDS 不支持的格式: {fmt}")
+    with open(path, "wb") as f:
+        f.write(dds_header(levels[0].size, fmt, len(levels)))
+        for data in encode_levels(levels, fmt, workers, progress):
+            f.write(data)
+        return f.tell()
+
+
+def dds_format(selected_filter):
+    # 保存对话框选中 DDS 选项时返回压缩格式，否则返回 None
+    parts = selected_filter.split()
+    if len(parts) > 1 and parts[0] == "DDS" and parts[1] in DDS_FORMATS:
+        return parts[1]
+    return None
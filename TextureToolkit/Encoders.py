@@ -0,0 +1,261 @@
+import os
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import features
+import Resample
+from AtlasWriter import CHANNELS, AtomicFiles, write_bands
+from BlockCompress import BC3
+from DdsWriter import DDS_FILTERS, dds_format, write_dds
+from Ktx2Writer import KTX2_FILTERS, ktx2_format, write_ktx2
+from Resample import RESAMPLE_AUTO, build_mips
+
+# 输出编码：按格式选择编码参数，三档预设在编码速度和文件大小之间取舍
+# 同一张图可以在多个线程里同时编码成几种格式（zlib/libwebp/NumPy 编码时释放 GIL）
+# 多级分辨率（mip）也在这里写出：DDS/KTX2 放在一个文件里，其他格式每级一个文件
+# 所有文件先写临时文件，全部写完后再改名，取消或出错时不会留下写了一半的文件
+
+ENCODE_FAST = "快速"
+ENCODE_BALANCED = "均衡"
+ENCODE_SMALLEST = "最小"
+ENCODE_PRESETS = [ENCODE_FAST, ENCODE_BALANCED, ENCODE_SMALLEST]
+ENCODE_NOTES = {
+    ENCODE_FAST: "编码最快，文件较大（PNG/TIFF 压缩级别 1，WebP method 0）",
+    ENCODE_BALANCED: "默认，速度和大小折中（PNG/TIFF 压缩级别 6）",
+    ENCODE_SMALLEST: "文件最小，编码较慢（PNG/TIFF 压缩级别 9，JPEG 渐进式）",
+}
+HAS_WEBP = features.check("webp")
+
+# Pillow 的保存参数，质量相同，只改变编码耗时和文件大小
+ENCODER_OPTIONS = {
+    "PNG": {
+        ENCODE_FAST: {"compress_level": 1},
+        ENCODE_BALANCED: {"compress_level": 6},
+        ENCODE_SMALLEST: {"compress_level": 9, "optimize": True},
+    },
+    "JPEG": {
+        ENCODE_FAST: {"quality": 95},
+        ENCODE_BALANCED: {"quality": 95, "optimize": True},
+        ENCODE_SMALLEST: {"quality": 95, "optimize": True, "progressive": True},
+    },
+    # 无损 WebP，exact 保留全透明像素的颜色（贴图过滤时会采样到）
+    # 实测 method 2 / quality 50 比 method 6 / quality 100 更小，而且快几十倍
+    "WEBP": {
+        ENCODE_FAST: {"lossless": True, "exact": True, "method": 0, "quality": 0},
+        ENCODE_BALANCED: {"lossless": True, "exact": True, "method": 4, "quality": 75},
+        ENCODE_SMALLEST: {"lossless": True, "exact": True, "method": 2, "quality": 50},
+    },
+    "TGA": {
+        ENCODE_FAST: {},
+        ENCODE_BALANCED: {"compression": "tga_rle"},
+        ENCODE_SMALLEST: {"compression": "tga_rle"},
+    },
+}
+# TIFF 用 AtlasWriter 的条带写出（Deflate + 水平差分预测），比 Pillow 的 Deflate TIFF 小得多
+# PNG/TIFF 按行带写出超大贴图时也用这里的压缩级别
+COMPRESS_LEVELS = {ENCODE_FAST: 1, ENCODE_BALANCED: 6, ENCODE_SMALLEST: 9}
+ZSTD_LEVELS = {ENCODE_FAST: 3, ENCODE_BALANCED: 10, ENCODE_SMALLEST: 19}
+GPU_FORMATS = ("DDS", "KTX2")
+EXTENSIONS = {
+    ".png": "PNG",
+    ".jpg": "JPEG",
+    ".jpeg": "JPEG",
+    ".bmp": "BMP",
+    ".tga": "TGA",
+    ".tif": "TIFF",
+    ".tiff": "TIFF",
+    ".webp": "WEBP",
+    ".dds": "DDS",
+    ".ktx2": "KTX2",
+}
+# 可以放下所有 mip 级的容器格式（不含本来就带 mip 链的 DDS/KTX2）
+MIP_CONTAINERS = ("TIFF",)
+# TIFF 每次送入条带写出器的行数，每段之后报告一次进度
+TIFF_BAND_ROWS = 256
+
+# 保存对话框的选项，DDS/KTX2 每种数据格式一项
+FILE_FILTERS = [
+    ("PNG Files (*.png)", "PNG"),
+    ("TIFF Files (*.tif *.tiff)", "TIFF"),
+    ("JPEG Files (*.jpg *.jpeg)", "JPEG"),
+    ("BMP Files (*.bmp)", "BMP"),
+]
+if HAS_WEBP:
+    FILE_FILTERS.insert(2, ("WebP 无损 (*.webp)", "WEBP"))
+SAVE_FILTERS = ";;".join(
+    [f for f, _ in FILE_FILTERS] + [DDS_FILTERS, KTX2_FILTERS, "All Files (*)"]
+)
+
+
+def compress_level(preset):
+    return COMPRESS_LEVELS.get(preset, 6)
+
+
+def normalize_format(fmt, path=None):
+    # 格式名或扩展名 -> Pillow 格式名，不认识时返回 None 交给 Pillow 判断
+    if not fmt and path:
+        return EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    fmt = (fmt or "").upper()
+    return {"JPG": "JPEG", "TIF": "TIFF"}.get(fmt, fmt) or None
+
+
+def filter_format(selected_filter):
+    # 保存对话框选中的选项 -> (格式, encode 的额外参数)
+    dds = dds_format(selected_filter)
+    if dds:
+        return "DDS", {"gpu_format": dds}
+    ktx2 = ktx2_format(selected_filter)
+    if ktx2:
+        return "KTX2", {"gpu_format": ktx2[0], "zstd": ktx2[1]}
+    for name, fmt in FILE_FILTERS:
+        if selected_filter == name:
+            return fmt, {}
+    return None, {}
+
+
+class EncodeResult:
+    def __init__(self, fmt, path, nbytes, seconds, files=1):
+        self.fmt = fmt
+        self.path = path
+        self.nbytes = nbytes
+        self.seconds = seconds
+        self.files = files
+
+    def summary(self):
+        files = f"，{self.files} 个文件" if self.files > 1 else ""
+        return (
+            f"{self.fmt or '自动'} {self.nbytes / 1048576:.2f} MB "
+            f"{self.seconds:.2f}s{files}"
+        )
+
+
+def mip_path(path, size):
+    # atlas.png -> atlas_1024x1024.png
+    root, ext = os.path.splitext(path)
+    return f"{root}_{size[0]}x{size[1]}{ext}"
+
+
+def _prepare(img, fmt):
+    if fmt == "JPEG" and img.mode not in ("L", "RGB", "CMYK"):
+        return img.convert("RGB")
+    if fmt == "TIFF" and img.mode not in CHANNELS:
+        return img.convert("RGBA")
+    return img
+
+
+def _save(img, path, fmt, preset, progress=None):
+    # progress(已完成行数, 总行数)；Pillow 保存中途无法报告，保存完成后报告一次
+    img = _prepare(img, fmt)
+    if fmt == "TIFF":
+        arr = np.asarray(img)
+        bands = (
+            arr[y : y + TIFF_BAND_ROWS] for y in range(0, img.height, TIFF_BAND_ROWS)
+        )
+        write_bands(
+            path, img.size, bands, img.mode, fmt, compress_level(preset), progress
+        )
+    else:
+        img.save(path, format=fmt, **ENCODER_OPTIONS.get(fmt, {}).get(preset, {}))
+        if progress is not None:
+            progress(img.height, img.height)
+    return os.path.getsize(path)
+
+
+def encode(
+    img,
+    path,
+    fmt=None,
+    preset=ENCODE_BALANCED,
+    mips=None,
+    container=False,
+    gpu_format=BC3,
+    zstd=False,
+    srgb=False,
+    policy=RESAMPLE_AUTO,
+    chain=None,
+    progress=None,
+    output=None,
+):
+    # 按格式和预设编码一张图，返回 EncodeResult
+    # mips：None 不导出多级分辨率（DDS/KTX2 仍带完整 mip 链），0 缩小到 1x1，N 为级数
+    # container=True 时所有级写入一个多页 TIFF；chain 为已经生成的 mip 链，多格式共用
+    # progress(已完成, 总数) 在编码过程中多次调用，抛出异常即可取消，已写的临时文件会删除
+    # output 为调用方的 AtomicFiles 时只写临时文件，由调用方与其他文件一起改名
+    start = time.perf_counter()
+    fmt = normalize_format(fmt, path)
+    if progress is not None:
+        progress(0, 1)
+    files = 1
+    if fmt in GPU_FORMATS or mips is not None:
+        if chain is None:
+            chain = build_mips(img, mips or None, policy)
+        levels = chain[: mips or len(chain)]
+    with AtomicFiles() if output is None else nullcontext(output) as output:
+        if fmt == "DDS":
+            nbytes = write_dds(output.temp(path), levels, gpu_format, progress=progress)
+        elif fmt == "KTX2":
+            nbytes = write_ktx2(
+                output.temp(path),
+                levels,
+                gpu_format,
+                zstd,
+                srgb,
+                zstd_level=ZSTD_LEVELS.get(preset, 10),
+                progress=progress,
+            )
+        elif mips is not None and container:
+            if fmt not in MIP_CONTAINERS:
+                raise ValueError(
+                    "多级分辨率容器只支持 " + "/".join(MIP_CONTAINERS) + " 格式"
+                )
+            # 多页 TIFF，每页一级
+            levels = [_prepare(level, fmt) for level in levels]
+            temp = output.temp(path)
+            levels[0].save(
+                temp,
+                format="TIFF",
+                save_all=True,
+                append_images=levels[1:],
+                compression="tiff_adobe_deflate",
+            )
+            nbytes = os.path.getsize(temp)
+            if progress is not None:
+                progress(1, 1)
+        elif mips is not None:
+            # 每级一个文件，进度按像素数计算
+            total = sum(level.width * level.height for level in levels)
+            nbytes = done = 0
+            for level in levels:
+                nbytes += _save(
+                    level, output.temp(mip_path(path, level.size)), fmt, preset
+                )
+                done += level.width * level.height
+                if progress is not None:
+                    progress(done, total)
+            files = len(levels)
+        else:
+            nbytes = _save(img, output.temp(path), fmt, preset, progress)
+    return EncodeResult(fmt, path, nbytes, time.perf_counter() - start, files)
+
+
+def encode_many(img, targets, preset=ENCODE_BALANCED, workers=None, **options):
+    # 同一张图同时编码成多种格式，targets 为 [(路径, 格式)]，按顺序返回 EncodeResult
+    mips = options.get("mips")
+    if mips is not None or any(
+        normalize_format(fmt, path) in GPU_FORMATS for path, fmt in targets
+    ):
+        # mip 链只生成一次，各格式按需要的级数截取
+        options["chain"] = build_mips(img, None, options.get("policy", RESAMPLE_AUTO))
+    if img.readonly:
+        # Pillow 保存只读图片前会先复制，提前复制一次，各线程不再各自复制
+        img = img.copy()
+    workers = min(workers or Resample.RESIZE_WORKERS, len(targets))
+    if workers <= 1:
+        return [encode(img, path, fmt, preset, **options) for path, fmt in targets]
+    with ThreadPoolExecutor(workers, thread_name_prefix="Encode") as pool:
+        futures = [
+            pool.submit(encode, img, path, fmt, preset, **options)
+            for path, fmt in targets
+        ]
+        return [future.result() for future in futures]
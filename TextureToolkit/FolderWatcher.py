@@ -0,0 +1,180 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from ImageIndex import IMAGE_EXTS
+
+# 监视序列帧文件夹：Linux 上用 inotify（ctypes 调用 libc），其他系统、inotify 不可用
+# 或网络盘（inotify 收不到其他机器的写入）时定时扫描文件的修改时间和大小
+# 只关心图片文件写完、改名和删除；以 . 开头的临时文件（如 AtomicFiles 的临时文件）忽略
+
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len
+
+# 扫描间隔和连续写入的合并时间（秒）
+POLL_INTERVAL = 0.25
+DEBOUNCE = 0.2
+
+
+def _load_inotify():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [
+            ctypes.c_int,
+            ctypes.c_char_p,
+            ctypes.c_uint32,
+        ]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+def is_frame(name):
+    return not name.startswith(".") and name.lower().endswith(IMAGE_EXTS)
+
+
+def snapshot(folder):
+    # {路径: (修改时间, 大小)}，只包含图片文件
+    stamps = {}
+    try:
+        entries = list(os.scandir(folder))
+    except OSError:
+        return stamps
+    for entry in entries:
+        if is_frame(entry.name):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            stamps[entry.path] = (st.st_mtime_ns, st.st_size)
+    return stamps
+
+
+class FolderWatcher:
+    def __init__(self, folders, poll=False, ignore=(), interval=POLL_INTERVAL):
+        # ignore 为不需要报告的文件（如写在同一文件夹里的输出图集）
+        self.folders = [os.path.abspath(f) for f in folders]
+        self.ignore = {os.path.abspath(p) for p in ignore}
+        self.interval = interval
+        self.fd = -1
+        self.wds = {}  # inotify 监视描述符 -> 文件夹
+        libc = None if poll else _load_inotify()
+        if libc is not None:
+            self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            for folder in self.folders:
+                if self.fd < 0:
+                    break
+                wd = libc.inotify_add_watch(self.fd, os.fsencode(folder), WATCH_MASK)
+                if wd < 0:
+                    # 监视数量超过系统上限等情况，整体改为扫描
+                    os.close(self.fd)
+                    self.fd = -1
+                    break
+                self.wds[wd] = folder
+        self.polling = self.fd < 0
+        self.stamps = {}
+        self.last_scan = 0.0
+        if self.polling:
+            for folder in self.folders:
+                self.stamps.update(snapshot(folder))
+            self.last_scan = time.monotonic()
+
+    @property
+    def backend(self):
+        return "扫描" if self.polling else "inotify"
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def changes(self):
+        # 不阻塞：返回上次调用以来新增、修改、删除或改名的图片路径
+        if self.polling:
+            return self._scan()
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = data[offset : offset + length].rstrip(b"\0")
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    # 事件队列溢出，不知道哪些文件变了，当作全部变化
+                    for folder in self.folders:
+                        changed.update(snapshot(folder))
+                    continue
+                folder = self.wds.get(wd)
+                if folder is not None and name:
+                    name = os.fsdecode(name)
+                    if is_frame(name):
+                        changed.add(os.path.join(folder, name))
+        return changed - self.ignore
+
+    def _scan(self):
+        now = time.monotonic()
+        if now - self.last_scan < self.interval:
+            return set()
+        self.last_scan = now
+        stamps = {}
+        for folder in self.folders:
+            stamps.update(snapshot(folder))
+        old, self.stamps = self.stamps, stamps
+        changed = {p for p, s in stamps.items() if old.get(p) != s}
+        changed.update(p for p in old if p not in stamps)
+        return changed - self.ignore
+
+    def _sleep(self, timeout):
+        # 等待新事件或超时；扫描模式下等到下一次扫描
+        if self.polling:
+            next_scan = self.last_scan + self.interval - time.monotonic()
+            time.sleep(max(0.0, min(timeout, next_scan)))
+        else:
+            select.select([self.fd], [], [], max(0.0, timeout))
+
+    def wait(self, timeout=None, debounce=DEBOUNCE):
+        # 阻塞直到有变化，再等到 debounce 秒内没有新的变化（连续写入合并成一次），
+        # 返回变化的路径；timeout 秒内没有变化时返回空集合
+        deadline = None if timeout is None else time.monotonic() + timeout
+        changed = self.changes()
+        while not changed:
+            remaining = 1.0 if deadline is None else deadline - time.monotonic()
+            if remaining <= 0:
+                return changed
+            self._sleep(min(remaining, 1.0))
+            changed = self.changes()
+        if self.polling:
+            # 扫描模式下至少再扫描一次才能确认写入已经结束
+            debounce += self.interval
+        quiet_until = time.monotonic() + debounce
+        while True:
+            remaining = quiet_until - time.monotonic()
+            if remaining <= 0:
+                return changed
+            self._sleep(remaining)
+            more = self.changes()
+            if more:
+                changed |= more
+                quiet_until = time.monotonic() + debounce
@@ -0,0 +1,112 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+from PIL import Image
+
+# 进程内共享的解码图片缓存（LRU，按内存预算淘汰）
+# 以 (绝对路径, 模式, 尺寸) 为键，文件 mtime 或大小变化后自动失效
+# 尺寸为 None 表示原图，否则为预览用的缩小版本
+# 缓存的是只读 numpy 数组，所有Dock共用，调用方不要修改
+
+DEFAULT_BUDGET_MB = int(os.environ.get("TEXTURETOOLKIT_CACHE_MB", 2048))
+
+
+def file_stamp(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def reduce_to(img, size):
+    # 先整数倍快速缩小，再缩放到精确尺寸
+    factor = min(img.width // size[0], img.height // size[1])
+    if factor > 1:
+        img = img.reduce(factor)
+    if img.size != size:
+        img = img.resize(size, Image.Resampling.BILINEAR)
+    return img
+
+
+def decode_array(path, mode="RGBA", size=None):
+    with Image.open(path) as img:
+        if size is not None:
+            # JPEG 直接按缩小比例解码
+            img.draft(None, size)
+        if img.mode != mode:
+            img = img.convert(mode)
+        if size is not None:
+            img = reduce_to(img, size)
+        arr = np.asarray(img)
+    arr.setflags(write=False)
+    return arr
+
+
+class ImageCache:
+    def __init__(self, budget_mb=DEFAULT_BUDGET_MB):
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (stamp, array)
+        self._lock = threading.Lock()
+
+    def set_budget_mb(self, budget_mb):
+        with self._lock:
+            self.budget = int(budget_mb * 1024 * 1024)
+            self._evict()
+
+    def _evict(self):
+        while self._entries and self.used > self.budget:
+            _, (_, arr) = self._entries.popitem(last=False)
+            self.used -= arr.nbytes
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.used -= entry[1].nbytes
+
+    def get_array(self, path, mode="RGBA", size=None):
+        key = (os.path.abspath(path), mode, tuple(size) if size else None)
+        stamp = file_stamp(key[0])
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            # 文件已修改，旧数据作废
+            self._drop(key)
+            self.misses += 1
+        arr = decode_array(key[0], mode, key[2])
+        if arr.nbytes <= self.budget:
+            with self._lock:
+                self._drop(key)
+                self._entries[key] = (stamp, arr)
+                self.used += arr.nbytes
+                self._evict()
+        return arr
+
+    def get_image(self, path, mode="RGBA"):
+        # 与缓存共享内存的只读PIL图片
+        return Image.fromarray(self.get_array(path, mode))
+
+    def invalidate(self, path=None):
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self.used = 0
+                return
+            path = os.path.abspath(path)
+            for key in [k for k in self._entries if k[0] == path]:
+                self._drop(key)
+
+
+image_cache = ImageCache()
+
+
+def load_array(path, mode="RGBA", size=None):
+    return image_cache.get_array(path, mode, size)
+
+
+def load_image(path, mode="RGBA"):
+    return image_cache.get_image(path, mode)
@@ -0,0 +1,150 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from collections import namedtuple
+from PIL import Image
+from ImageCache import file_stamp
+
+# 输入图片的元数据索引（SQLite），只读文件头，按 mtime/大小 校验
+# 分辨率检查、缩略图缓存键等都从这里查询，同一文件只解析一次
+
+INDEX_PATH = os.environ.get("TEXTURETOOLKIT_INDEX") or os.path.join(
+    os.path.expanduser("~"), ".cache", "TextureToolkit", "index.sqlite"
+)
+# 批处理的多个进程共用一个索引文件：写锁被占用时最多等这么多秒，仍拿不到就直接读文件头
+BUSY_TIMEOUT = 5.0
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".bmp", ".tga")
+
+ImageInfo = namedtuple("ImageInfo", "path mtime_ns size format width height mode hash")
+
+
+def natural_key(path):
+    # frame_2.png 排在 frame_10.png 前面
+    name = os.path.basename(path).lower()
+    return [int(t) if t.isdigit() else t for t in re.split(r"(\d+)", name)]
+
+
+def list_images(folder):
+    # 跳过隐藏文件，如保存时 AtomicFiles 写在同一文件夹里的 .xxx.tmp.png
+    files = [
+        os.path.join(folder, f)
+        for f in os.listdir(folder)
+        if not f.startswith(".") and f.lower().endswith(IMAGE_EXTS)
+    ]
+    return sorted(files, key=natural_key)
+
+
+class ImageIndex:
+    def __init__(self, db_path=INDEX_PATH, timeout=BUSY_TIMEOUT):
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, timeout=timeout, check_same_thread=False)
+        if db_path != ":memory:":
+            # WAL：读不阻塞写，多个进程同时查询时很少等锁
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS images ("
+            "path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, format TEXT,"
+            " width INTEGER, height INTEGER, mode TEXT, hash TEXT)"
+        )
+        self.conn.commit()
+
+    def _lookup(self, path, stamp):
+        row = self.conn.execute(
+            "SELECT * FROM images WHERE path = ?", (path,)
+        ).fetchone()
+        if row is not None and (row[1], row[2]) == stamp:
+            return ImageInfo(*row)
+        return None
+
+    def _scan(self, path, stamp):
+        # Image.open 只解析文件头，不解码像素
+        with Image.open(path) as img:
+            info = ImageInfo(
+                path, *stamp, img.format, img.width, img.height, img.mode, None
+            )
+        try:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?, ?, ?)", info
+            )
+        except sqlite3.Error:
+            pass  # 索引被其他进程锁住：这次不写入，下次再记录
+        return info
+
+    def _commit(self):
+        try:
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+
+    def get(self, path):
+        return self.get_many([path])[0]
+
+    def get_many(self, paths):
+        # 返回与 paths 一一对应的 ImageInfo，无法读取的文件为 None
+        result = []
+        with self._lock:
+            for path in paths:
+                path = os.path.abspath(path)
+                try:
+                    stamp = file_stamp(path)
+                    try:
+                        info = self._lookup(path, stamp)
+                    except sqlite3.Error:
+                        info = None  # 查询失败时直接读文件头
+                    info = info or self._scan(path, stamp)
+                except (OSError, SyntaxError):
+                    info = None
+                result.append(info)
+            self._commit()
+        return result
+
+    def content_hash(self, path):
+        info = self.get(path)
+        if info is None:
+            raise FileNotFoundError(path)
+        if info.hash:
+            return info.hash
+        h = hashlib.sha1()
+        with open(info.path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        with self._lock:
+            try:
+                self.conn.execute(
+                    "UPDATE images SET hash = ?"
+                    " WHERE path = ? AND mtime_ns = ? AND size = ?",
+                    (digest, info.path, info.mtime_ns, info.size),
+                )
+            except sqlite3.Error:
+                pass
+            self._commit()
+        return digest
+
+    def resolution_report(self, paths):
+        # {"宽x高": [路径, ...]}，用于提示分辨率不一致
+        report = {}
+        for path, info in zip(paths, self.get_many(paths)):
+            if info is not None:
+                report.setdefault(f"{info.width}x{info.height}", []).append(path)
+        return report
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def image_index():
+    # 进程内共享的索引，首次使用时打开
+    global _index
+    with _index_lock:
+        if _index is None:
+            try:
+                _index = ImageIndex()
+            except (OSError, sqlite3.Error):
+                _index = ImageIndex(":memory:")
+        return _index
@@ -0,0 +1,188 @@
+import struct
+from BlockCompress import (
+    BC1,
+    BC3,
+    BC4,
+    BC5,
+    BLOCK_BYTES,
+    RGBA8,
+    TEXTURE_FORMATS,
+    encode_levels,
+)
+
+# KTX2 写出：未压缩或块压缩数据 + 完整 mip 链，可选 zstd 超压缩，纯 Python/NumPy
+# 运行时直接上传 GPU，不需要解码 PNG
+# zstd 使用 Python 3.14 的 compression.zstd 或 zstandard 包，都没有时不能选择 zstd
+
+try:
+    from compression import zstd as _zstd
+
+    def _zstd_compress(data, level):
+        return _zstd.compress(data, level)
+
+except ImportError:
+    try:
+        import zstandard as _zstd
+
+        def _zstd_compress(data, level):
+            return _zstd.ZstdCompressor(level=level).compress(data)
+
+    except ImportError:
+        _zstd_compress = None
+
+HAS_ZSTD = _zstd_compress is not None
+ZSTD_LEVEL = 19
+
+KTX2_FORMATS = TEXTURE_FORMATS
+KTX2_IDENTIFIER = b"\xabKTX 20\xbb\r\n\x1a\n"
+SUPERCOMPRESSION_NONE, SUPERCOMPRESSION_ZSTD = 0, 2
+# (线性 vkFormat, sRGB vkFormat)，BC4/BC5 没有 sRGB 版本
+VK_FORMATS = {
+    RGBA8: (37, 43),
+    BC1: (131, 132),
+    BC3: (137, 138),
+    BC4: (139, 139),
+    BC5: (141, 141),
+}
+# 数据格式描述（DFD）：颜色模型和每个采样的 (通道, 位偏移, 位数)
+KHR_DF_MODEL_RGBSDA = 1
+DFD_MODELS = {RGBA8: 1, BC1: 128, BC3: 130, BC4: 131, BC5: 132}
+DFD_SAMPLES = {
+    RGBA8: [(0, 0, 8), (1, 8, 8), (2, 16, 8), (15, 24, 8)],
+    BC1: [(0, 0, 64)],
+    BC3: [(15, 0, 64), (0, 64, 64)],
+    BC4: [(0, 0, 64)],
+    BC5: [(0, 0, 64), (1, 64, 64)],
+}
+KHR_DF_PRIMARIES_BT709 = 1
+KHR_DF_TRANSFER_LINEAR, KHR_DF_TRANSFER_SRGB = 1, 2
+KHR_DF_SAMPLE_LINEAR = 0x10
+ALPHA_CHANNEL = 15
+
+# 保存对话框里的 KTX2 选项，有 zstd 时每种格式再加一个超压缩选项
+KTX2_FILTERS = ";;".join(
+    f"KTX2 {fmt}{suffix} (*.ktx2)"
+    for fmt in KTX2_FORMATS
+    for suffix in ("", " zstd")[: 2 if HAS_ZSTD else 1]
+)
+
+
+def _texel_bytes(fmt):
+    return 4 if fmt == RGBA8 else BLOCK_BYTES[fmt]
+
+
+def _dfd(fmt, srgb, supercompressed):
+    samples = DFD_SAMPLES[fmt]
+    # 传输函数跟随实际写出的 vkFormat：BC4/BC5 只有 UNORM 版本，--srgb 时也按线性写
+    linear_format, srgb_format = VK_FORMATS[fmt]
+    srgb = srgb and srgb_format != linear_format
+    transfer = KHR_DF_TRANSFER_SRGB if srgb else KHR_DF_TRANSFER_LINEAR
+    block = 0 if fmt == RGBA8 else 0x0303  # 块压缩为 4x4 像素一块（存的是尺寸减 1）
+    # 超压缩时每块字节数未知，按规范写 0
+    bytes_plane = 0 if supercompressed else _texel_bytes(fmt)
+    body = struct.pack(
+        "<IIBBBBI8B",
+        0,  # vendorId = KHR, descriptorType = basic
+        2 | (24 + 16 * len(samples)) << 16,  # versionNumber, descriptorBlockSize
+        DFD_MODELS[fmt],
+        KHR_DF_PRIMARIES_BT709,
+        transfer,
+        0,  # alpha 非预乘
+        block,
+        bytes_plane,
+        *[0] * 7,
+    )
+    upper = 255 if fmt == RGBA8 else 0xFFFFFFFF
+    for channel, offset, bits in samples:
+        qualifiers = KHR_DF_SAMPLE_LINEAR if srgb and channel == ALPHA_CHANNEL else 0
+        body += struct.pack(
+            "<HBBIII",
+            offset,
+            bits - 1,
+            channel | qualifiers,
+            0,  # samplePosition
+            0,
+            upper,
+        )
+    return struct.pack("<I", 4 + len(body)) + body
+
+
+def _kvd(entries):
+    # 键按字节序排序，每项补齐到 4 字节
+    data = b""
+    for key, value in sorted(entries.items()):
+        kv = key.encode() + b"\x00" + value.encode() + b"\x00"
+        data += struct.pack("<I", len(kv)) + kv
+        data += b"\x00" * (-len(kv) % 4)
+    return data
+
+
+def _align(offset, alignment):
+    return offset + -offset % alignment
+
+
+def write_ktx2(
+    path,
+    levels,
+    fmt=BC3,
+    zstd=False,
+    srgb=False,
+    workers=None,
+    zstd_level=ZSTD_LEVEL,
+    progress=None,
+):
+    # levels 为从大到小的 mip 链（PIL 图片），返回文件字节数
+    # progress(已完成, 总数) 见 BlockCompress.encode_levels
+    if fmt not in KTX2_FORMATS:
+        raise ValueError(f"KTX2 不支持的格式: {fmt}")
+    if zstd and not HAS_ZSTD:
+        raise ValueError("zstd 超压缩需要 Python 3.14 或 zstandard 包")
+    scheme = SUPERCOMPRESSION_ZSTD if zstd else SUPERCOMPRESSION_NONE
+    vk_format = VK_FORMATS[fmt][1 if srgb else 0]
+    width, height = levels[0].size
+    payloads = []
+    for raw in encode_levels(levels, fmt, workers, progress):
+        data = _zstd_compress(raw, zstd_level) if zstd else raw
+        payloads.append((data, len(raw)))
+    dfd = _dfd(fmt, srgb, zstd)
+    kvd = _kvd({"KTXorientation": "rd", "KTXwriter": "TextureToolkit"})
+    level_index_offset = len(KTX2_IDENTIFIER) + 36 + 32
+    dfd_offset = level_index_offset + 24 * len(levels)
+    kvd_offset = dfd_offset + len(dfd)
+    # 每级数据从小到大存放，未超压缩时按块大小和 4 字节的公倍数对齐
+    alignment = 1 if zstd else max(4, _texel_bytes(fmt))
+    offset = kvd_offset + len(kvd)
+    level_offsets = [0] * len(levels)
+    for i in reversed(range(len(levels))):
+        offset = _align(offset, alignment)
+        level_offsets[i] = offset
+        offset += len(payloads[i][0])
+    header = KTX2_IDENTIFIER + struct.pack(
+        "<9I",
+        vk_format,
+        1,  # typeSize
+        width,
+        height,
+        0,  # pixelDepth
+        0,  # layerCount
+        1,  # faceCount
+        len(levels),
+        scheme,
+    )
+    header += struct.pack("<4I2Q", dfd_offset, len(dfd), kvd_offset, len(kvd), 0, 0)
+    for (data, raw_len), level_offset in zip(payloads, level_offsets):
+        header += struct.pack("<3Q", level_offset, len(data), raw_len)
+    with open(path, "wb") as f:
+        f.write(header + dfd + kvd)
+        for i in reversed(range(len(levels))):
+            f.write(b"\x00" * (level_offsets[i] - f.tell()))
+            f.write(payloads[i][0])
+        return f.tell()
+
+
+def ktx2_format(selected_filter):
+    # 保存对话框选中 KTX2 选项时返回 (格式, 是否 zstd)，否则返回 None
+    parts = selected_filter.split()
+    if len(parts) > 1 and parts[0] == "KTX2" and parts[1] in KTX2_FORMATS:
+        return parts[1], parts[2] == "zstd"
+    return None
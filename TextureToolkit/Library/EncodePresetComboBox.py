@@ -0,0 +1,8 @@
+from Library.NotedComboBox import NotedComboBox
+from Encoders import ENCODE_BALANCED, ENCODE_NOTES, ENCODE_PRESETS
+
+
+class EncodePresetComboBox(NotedComboBox):
+    # 编码预设选择（快速/均衡/最小），提示显示速度/大小说明
+    def __init__(self, parent=None):
+        super().__init__(ENCODE_PRESETS, ENCODE_NOTES, ENCODE_BALANCED, parent)
@@ -0,0 +1,151 @@
+import os
+from array import array
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, Qt, QTimer
+
+
+class FrameListModel(QAbstractListModel):
+    # 序列帧列表：路径只存一份，顺序是帧 id 的紧凑数组，行号 -> 帧 id -> 路径
+    # 帧 id 在加载时分配，排序后不变；同名文件（不同文件夹）和重复的帧也能区分
+    # 视图按需取缩略图（data 的 DecorationRole），行数通过 fetchMore 分批增加
+    # 上移/下移是两个 id 交换；拖拽移动只轮转起止行之间的一段（等长切片赋值，其余部分不动），
+    # 代价与移动距离成正比，从开头拖到末尾仍要移动整段；都不重建列表
+    FETCH_BATCH = 1024
+    NAME_LIMIT = 16
+
+    def __init__(self, thumb_loader, parent=None):
+        super().__init__(parent)
+        self.thumb_loader = thumb_loader
+        self.thumb_loader.thumbnail_ready.connect(self.on_thumbnail_ready)
+        self.frames = []  # 帧 id -> 路径
+        self.order = array("l")  # 行号 -> 帧 id
+        self.loaded = 0  # 已经交给视图的行数
+        self.icon_size = 64
+        self.show_name = True
+        self.icons = {}  # 帧 id -> 最近显示的缩略图，换档位时新图生成前继续显示
+        # 缩略图陆续生成，合并成一次刷新
+        self.icon_timer = QTimer(self)
+        self.icon_timer.setSingleShot(True)
+        self.icon_timer.setInterval(30)
+        self.icon_timer.timeout.connect(self.refresh_icons)
+
+    def set_paths(self, paths):
+        self.beginResetModel()
+        self.frames = list(paths)
+        self.order = array("l", range(len(self.frames)))
+        self.loaded = min(len(self.frames), self.FETCH_BATCH)
+        self.icons = {}
+        self.endResetModel()
+
+    def paths(self):
+        # 按当前顺序的全部路径（包括视图还没取到的行）
+        frames = self.frames
+        return [frames[i] for i in self.order]
+
+    def path(self, row):
+        return self.frames[self.order[row]]
+
+    def frame_id(self, row):
+        return self.order[row]
+
+    def __len__(self):
+        return len(self.order)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.loaded
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.loaded < len(self.order)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(self.FETCH_BATCH, len(self.order) - self.loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self.loaded, self.loaded + count - 1)
+        self.loaded += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= self.loaded:
+            return None
+        frame = self.order[index.row()]
+        path = self.frames[frame]
+        if role == Qt.ItemDataRole.DisplayRole:
+            if not self.show_name:
+                return ""
+            # 名字超长自动省略
+            name = os.path.basename(path)
+            if len(name) > self.NAME_LIMIT:
+                name = name[:12] + "..." + name[-4:]
+            return name
+        if role == Qt.ItemDataRole.DecorationRole:
+            # 只有视图要画的行才会请求缩略图
+            icon = self.thumb_loader.icon(path, self.icon_size)
+            if icon is self.thumb_loader.placeholder:
+                return self.icons.get(frame, icon)
+            self.icons[frame] = icon
+            return icon
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return path
+        return None
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.isValid():
+            return flags | Qt.ItemFlag.ItemIsDragEnabled
+        return flags | Qt.ItemFlag.ItemIsDropEnabled
+
+    def supportedDropActions(self):
+        return Qt.DropAction.MoveAction
+
+    def moveRows(self, source_parent, row, count, dest_parent, dest):
+        # dest 为移动前的目标行号（插在该行之前），QListView 拖拽排序时逐行调用 moveRow
+        if source_parent.isValid() or dest_parent.isValid() or count <= 0:
+            return False
+        if row < 0 or row + count > self.loaded or not 0 <= dest <= self.loaded:
+            return False
+        if not self.beginMoveRows(
+            QModelIndex(), row, row + count - 1, QModelIndex(), dest
+        ):
+            return False
+        if count == 1 and dest in (row - 1, row + 2):
+            # 和相邻一行交换
+            other = row - 1 if dest < row else row + 1
+            self.order[row], self.order[other] = self.order[other], self.order[row]
+        elif dest > row:
+            # [row, dest) 轮转：移动的行放到这一段末尾
+            span = self.order[row:dest]
+            self.order[row:dest] = span[count:] + span[:count]
+        else:
+            # [dest, row + count) 轮转：移动的行放到这一段开头
+            span = self.order[dest : row + count]
+            self.order[dest : row + count] = span[row - dest :] + span[: row - dest]
+        self.endMoveRows()
+        return True
+
+    def set_icon_size(self, size):
+        self.icon_size = size
+        self.refresh_icons()
+
+    def set_show_name(self, show):
+        self.show_name = show
+        if self.loaded:
+            self.dataChanged.emit(
+                self.index(0),
+                self.index(self.loaded - 1),
+                [Qt.ItemDataRole.DisplayRole],
+            )
+
+    def on_thumbnail_ready(self, path, icon):
+        if not self.icon_timer.isActive():
+            self.icon_timer.start()
+
+    def refresh_icons(self):
+        # 视图只重绘可见的行，可见行再通过 data 取新的缩略图
+        if self.loaded:
+            self.dataChanged.emit(
+                self.index(0),
+                self.index(self.loaded - 1),
+                [Qt.ItemDataRole.DecorationRole],
+            )
@@ -0,0 +1,29 @@
+import numpy as np
+from PyQt6.QtGui import QImage
+
+# PIL / numpy 图片直接包装为 QImage，避免 PNG 编码再解码
+
+
+class BufferQImage(QImage):
+    # 引用像素缓冲区，保证缓冲区与 QImage 同生命周期
+    def __init__(self, buffer, width, height, bytes_per_line, fmt):
+        super().__init__(buffer, width, height, bytes_per_line, fmt)
+        self._buffer = buffer
+
+
+def array_to_qimage(arr):
+    arr = np.ascontiguousarray(arr, dtype=np.uint8)
+    h, w = arr.shape[:2]
+    if arr.ndim == 2:
+        fmt = QImage.Format.Format_Grayscale8
+    elif arr.shape[2] == 3:
+        fmt = QImage.Format.Format_RGB888
+    else:
+        fmt = QImage.Format.Format_RGBA8888
+    return BufferQImage(arr, w, h, arr.strides[0], fmt)
+
+
+def pil_to_qimage(img):
+    if img.mode not in ("RGBA", "RGB", "L"):
+        img = img.convert("RGBA")
+    return array_to_qimage(np.asarray(img))
@@ -0,0 +1,28 @@
+from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QComboBox, QSizePolicy
+
+
+class NotedComboBox(QComboBox):
+    # 带说明的选项：下拉项和控件本身的提示显示当前选项的说明
+    def __init__(self, options, notes, default=None, parent=None):
+        super().__init__(parent)
+        self.notes = notes
+        for i, option in enumerate(options):
+            self.addItem(option)
+            self.setItemData(i, notes.get(option, ""), Qt.ItemDataRole.ToolTipRole)
+        self.setSizePolicy(QSizePolicy.Policy.Maximum, QSizePolicy.Policy.Fixed)
+        self.currentIndexChanged.connect(self.update_tooltip)
+        if default is not None:
+            self.set_value(default)
+        self.update_tooltip()
+
+    def update_tooltip(self):
+        self.setToolTip(self.notes.get(self.currentText(), ""))
+
+    def get_value(self):
+        return self.currentText()
+
+    def set_value(self, value):
+        idx = self.findText(value)
+        if idx >= 0:
+            self.setCurrentIndex(idx)
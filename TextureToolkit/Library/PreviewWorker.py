@@ -0,0 +1,81 @@
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+from AtlasEngine import Cancelled
+
+
+class _PreviewSignals(QObject):
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+
+class _PreviewTask(QRunnable):
+    def __init__(self, generation, job, worker):
+        super().__init__()
+        self.generation = generation
+        self.job = job
+        self.worker = worker
+        self.signals = worker.signals
+
+    def cancelled(self):
+        # 有更新的请求时当前任务作废
+        return self.generation != self.worker.generation
+
+    def run(self):
+        if self.cancelled():
+            return
+        try:
+            result = self.job(self.cancelled)
+        except Cancelled:
+            return
+        except Exception as e:
+            self.signals.failed.emit(self.generation, str(e))
+            return
+        self.signals.finished.emit(self.generation, result)
+
+
+class PreviewWorker(QObject):
+    # 预览请求去抖后在后台线程执行，只发出最新一次请求的结果
+    # job(cancelled) 在工作线程中调用，应定期检查 cancelled()，结果里不要包含 QPixmap
+    ready = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, delay_ms=80, parent=None):
+        super().__init__(parent)
+        self.generation = 0
+        self.job = None
+        self.pool = QThreadPool(self)
+        # 同一时间只合成一张预览，旧任务在下一帧解码前退出
+        self.pool.setMaxThreadCount(1)
+        self.signals = _PreviewSignals(self)
+        self.signals.finished.connect(self._on_finished)
+        self.signals.failed.connect(self._on_failed)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay_ms)
+        self.timer.timeout.connect(self._start)
+
+    def request(self, job):
+        # 连续请求只保留最后一个，并作废正在执行的任务
+        self.generation += 1
+        self.job = job
+        self.timer.start()
+
+    def cancel(self):
+        self.generation += 1
+        self.job = None
+        self.timer.stop()
+        self.pool.clear()
+
+    def _start(self):
+        if self.job is None:
+            return
+        self.pool.clear()
+        self.pool.start(_PreviewTask(self.generation, self.job, self))
+        self.job = None
+
+    def _on_finished(self, generation, result):
+        if generation == self.generation:
+            self.ready.emit(result)
+
+    def _on_failed(self, generation, message):
+        if generation == self.generation:
+            self.failed.emit(message)
@@ -0,0 +1,8 @@
+from Library.NotedComboBox import NotedComboBox
+from Resample import RESAMPLE_AUTO, RESAMPLE_NOTES, RESAMPLE_POLICIES
+
+
+class ResampleComboBox(NotedComboBox):
+    # 缩放策略选择，提示显示速度/质量说明
+    def __init__(self, parent=None):
+        super().__init__(RESAMPLE_POLICIES, RESAMPLE_NOTES, RESAMPLE_AUTO, parent)
@@ -0,0 +1,128 @@
+from PyQt6.QtCore import QObject, QRunnable, Qt, QThreadPool, pyqtSignal
+from PyQt6.QtWidgets import QMessageBox, QProgressDialog
+from AtlasEngine import Cancelled
+
+
+class _SaveSignals(QObject):
+    # 进度的数值可能超过 32 位（像素数），用 object 传递
+    progress = pyqtSignal(int, object, object)
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+
+class _SaveTask(QRunnable):
+    def __init__(self, generation, job, worker):
+        super().__init__()
+        self.generation = generation
+        self.job = job
+        self.worker = worker
+        self.signals = worker.signals
+
+    def progress(self, done, total):
+        # 在工作线程中调用：已取消时抛出 Cancelled，由写出函数删除临时文件
+        if self.generation != self.worker.generation:
+            raise Cancelled()
+        self.signals.progress.emit(self.generation, done, total)
+
+    def run(self):
+        if self.generation != self.worker.generation:
+            return
+        try:
+            result = self.job(self.progress)
+        except Cancelled:
+            return
+        except Exception as e:
+            self.signals.failed.emit(self.generation, str(e))
+            return
+        self.signals.finished.emit(self.generation, result)
+
+
+class SaveWorker(QObject):
+    # 保存在后台线程执行，界面显示进度对话框，可以随时取消
+    # job(progress) 在工作线程中调用，progress(已完成, 总数) 报告进度，取消后抛出 Cancelled
+    # 输出先写临时文件再改名（AtlasWriter.AtomicFiles），取消或出错不会留下半个文件
+    # done(result) 在界面线程中调用，失败时弹出警告框
+    # quiet=True 时不显示进度对话框（如监视文件夹时的自动保存）
+    PROGRESS_STEPS = 1000
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.generation = 0
+        self.pool = QThreadPool(self)
+        # 同一时间只保存一个文件，取消的任务结束后才开始下一个
+        self.pool.setMaxThreadCount(1)
+        self.signals = _SaveSignals(self)
+        self.signals.progress.connect(self._on_progress)
+        self.signals.finished.connect(self._on_finished)
+        self.signals.failed.connect(self._on_failed)
+        self.dialog = None
+        self.done = None
+        # 正在执行、还没结束的任务；quiet 保存没有对话框，忙碌状态看这里
+        self.task = None
+
+    def start(self, job, done, label="正在保存...", quiet=False):
+        self.cancel()
+        self.done = done
+        self.task = _SaveTask(self.generation, job, self)
+        if quiet:
+            self.pool.start(self.task)
+            return
+        # 窗口模态：保存期间不能修改参数，界面照常刷新
+        self.dialog = QProgressDialog(label, "取消", 0, 0, self.parent())
+        self.dialog.setWindowTitle("保存")
+        self.dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        self.dialog.setAutoReset(False)
+        self.dialog.setAutoClose(False)
+        # 很快完成的保存不弹出对话框
+        self.dialog.setMinimumDuration(400)
+        self.dialog.canceled.connect(self.cancel)
+        self.pool.start(self.task)
+
+    def busy(self):
+        return self.task is not None
+
+    def cancel(self):
+        # 正在执行的编码在下一次报告进度时中止
+        # 取消的任务不再发出结束信号；之后的任务在线程池里排在它后面
+        self.generation += 1
+        self.done = None
+        self.task = None
+        self._close_dialog()
+
+    def wait(self, msecs=-1):
+        return self.pool.waitForDone(msecs)
+
+    def _close_dialog(self):
+        if self.dialog is not None:
+            dialog, self.dialog = self.dialog, None
+            dialog.canceled.disconnect(self.cancel)
+            dialog.close()
+            dialog.deleteLater()
+
+    def _on_progress(self, generation, done, total):
+        if generation != self.generation or self.dialog is None or not total:
+            return
+        if self.dialog.maximum() != self.PROGRESS_STEPS:
+            self.dialog.setRange(0, self.PROGRESS_STEPS)
+        self.dialog.setValue(
+            min(self.PROGRESS_STEPS, done * self.PROGRESS_STEPS // total)
+        )
+
+    def _on_finished(self, generation, result):
+        if generation != self.generation:
+            return
+        done = self.done
+        self.done = None
+        self.task = None
+        self._close_dialog()
+        if done is not None:
+            done(result)
+
+    def _on_failed(self, generation, message):
+        if generation != self.generation:
+            return
+        self.done = None
+        self.task = None
+        parent = self.parent()
+        self._close_dialog()
+        QMessageBox.warning(parent, "保存失败", message)
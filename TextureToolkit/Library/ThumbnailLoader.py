@@ -0,0 +1,88 @@
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt6.QtGui import QColor, QIcon, QImage, QPainter, QPixmap
+from Library.ImageBridge import pil_to_qimage
+from Thumbnails import load_thumbnail, size_bucket
+
+
+class _ThumbnailSignals(QObject):
+    finished = pyqtSignal(str, int, QImage)
+
+
+class _ThumbnailTask(QRunnable):
+    def __init__(self, path, bucket, signals):
+        super().__init__()
+        self.path = path
+        self.bucket = bucket
+        self.signals = signals
+
+    def run(self):
+        try:
+            # 跨线程传递前深拷贝，不再引用工作线程里的缓冲区
+            qimg = pil_to_qimage(load_thumbnail(self.path, self.bucket)).copy()
+        except Exception:
+            qimg = QImage()
+        self.signals.finished.emit(self.path, self.bucket, qimg)
+
+
+class ThumbnailLoader(QObject):
+    # 在线程池中生成缩略图，完成后发出 thumbnail_ready(path, icon)
+    thumbnail_ready = pyqtSignal(str, QIcon)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        # 留一个核心给界面线程
+        self.pool.setMaxThreadCount(
+            max(2, QThreadPool.globalInstance().maxThreadCount() - 1)
+        )
+        self.icons = {}  # (path, bucket) -> QIcon
+        self.pending = set()
+        self.signals = _ThumbnailSignals(self)
+        self.signals.finished.connect(self._on_finished)
+        self.placeholder = self.make_placeholder()
+
+    @staticmethod
+    def make_placeholder(size=64, grid=8):
+        pix = QPixmap(size, size)
+        pix.fill(QColor(235, 235, 235))
+        painter = QPainter(pix)
+        for y in range(0, size, grid):
+            for x in range(0, size, grid):
+                if (x // grid + y // grid) % 2 == 0:
+                    painter.fillRect(x, y, grid, grid, QColor(215, 215, 215))
+        painter.end()
+        return QIcon(pix)
+
+    def icon(self, path, size):
+        # 已有缩略图直接返回，否则排队生成并先返回占位图
+        key = (path, size_bucket(size))
+        icon = self.icons.get(key)
+        if icon is not None:
+            return icon
+        if key not in self.pending:
+            self.pending.add(key)
+            self.pool.start(_ThumbnailTask(path, key[1], self.signals))
+        return self.placeholder
+
+    def clear(self):
+        # 丢弃排队中的任务（切换文件夹时调用）
+        self.pool.clear()
+        self.pending.clear()
+        self.icons.clear()
+
+    def invalidate(self, paths):
+        # 文件修改后丢弃旧缩略图，下次显示时重新生成（磁盘缓存按内容哈希，不会读到旧图）
+        paths = set(paths)
+        self.icons = {k: v for k, v in self.icons.items() if k[0] not in paths}
+        self.pending = {k for k in self.pending if k[0] not in paths}
+
+    def _on_finished(self, path, bucket, qimg):
+        key = (path, bucket)
+        if key not in self.pending:
+            return
+        self.pending.discard(key)
+        if qimg.isNull():
+            return
+        icon = QIcon(QPixmap.fromImage(qimg))
+        self.icons[key] = icon
+        self.thumbnail_ready.emit(path, icon)
@@ -11,8 +11,6 @@ from PyQt6.QtWidgets import (
     QColorDialog,
     QSizePolicy,
     QSpinBox,
-    QListWidget,
-    QListWidgetItem,
     QFrame,
     QSplitter,
     QAbstractItemView,
@@ -21,23 +19,75 @@ from PyQt6.QtWidgets import (
     QSlider,
     QListView,
 )
-from PyQt6.QtCore import Qt, QSize
-from PyQt6.QtGui import QPixmap, QImage, QPainter, QColor, QIcon
-from PIL import Image
+from PyQt6.QtCore import Qt, QModelIndex, QSize, QTimer
+from PyQt6.QtGui import QPixmap, QPainter, QColor
+from AtlasEngine import (
+    GRID_RES_MODES,
+    build_merge_atlas,
+    build_merge_preview,
+    fit_preview,
+    needs_streaming,
+    write_merge_atlas,
+)
+from AtlasComposer import AtlasComposer
+from AtlasPacker import (
+    DEFAULT_MAX_SIZE,
+    DEFAULT_PADDING,
+    LAYOUT_MODES,
+    LAYOUT_PACK,
+    MAX_SIZES,
+    PACK_ALGORITHMS,
+    PACK_NOTES,
+    compose_page,
+    occupancy,
+    pack_paths,
+    write_packed,
+)
+from AtlasPages import OVERFLOW_MODES, OVERFLOW_PAGES, split_pages, write_pages
+from AtlasWriter import strip_format
+from Encoders import (
+    FILE_FILTERS,
+    SAVE_FILTERS,
+    EncodeResult,
+    compress_level,
+    encode,
+    filter_format,
+    mip_path,
+)
+from FolderWatcher import DEBOUNCE, FolderWatcher
+from FrameReader import DecodeStats
+from ImageIndex import image_index, list_images
+from Library.ImageBridge import pil_to_qimage
+from Library.PreviewWorker import PreviewWorker
+from Library.ResampleComboBox import ResampleComboBox
+from Library.EncodePresetComboBox import EncodePresetComboBox
+from Library.FrameListModel import FrameListModel
+from Library.NotedComboBox import NotedComboBox
+from Library.SaveWorker import SaveWorker
+from Library.ThumbnailLoader import ThumbnailLoader
+from Resample import mip_sizes
+from functools import partial
 import os
-import io
+import time
 
 
-class AdaptiveListWidget(QListWidget):
+class AdaptiveListView(QListView):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.base_icon_size = 64
         self.setViewMode(QListView.ViewMode.IconMode)
         self.setResizeMode(QListView.ResizeMode.Adjust)
-        self.setMovement(QListView.Movement.Free)
+        # Static：拖拽时不在视图里自由摆放，而是通过 model.moveRow 改变顺序
+        self.setMovement(QListView.Movement.Static)
         self.setSpacing(8)
         self.setIconSize(QSize(self.base_icon_size, self.base_icon_size))
         self.setUniformItemSizes(True)
+        # 一次只排版一批，上万帧时界面也不会卡住
+        self.setLayoutMode(QListView.LayoutMode.Batched)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.setDragEnabled(True)
+        self.setDragDropMode(QAbstractItemView.DragDropMode.InternalMove)
+        self.setDefaultDropAction(Qt.DropAction.MoveAction)
 
     def setBaseIconSize(self, size):
         self.base_icon_size = size
@@ -68,12 +118,38 @@ class MergeAtlasDock(QDockWidget):
         self.setAllowedAreas(
             Qt.DockWidgetArea.LeftDockWidgetArea | Qt.DockWidgetArea.RightDockWidgetArea
         )
-        self.image_paths = []
         self.folder_path = None
         self.output_img = None
+        self.res_map = {}
         self.fill_color = (200, 200, 200, 255)
         self.icon_size = 64
         self.show_name = True
+        # 缩略图在线程池中生成，列表先显示占位图，只为可见的行生成
+        self.thumb_loader = ThumbnailLoader(self)
+        self.frame_model = FrameListModel(self.thumb_loader, self)
+        # 拖拽或上移/下移后刷新预览
+        self.frame_model.rowsMoved.connect(self.preview_refresh)
+        # 预览在后台线程合成，连续修改参数时只合成最后一次
+        self.preview_worker = PreviewWorker(parent=self)
+        self.preview_worker.ready.connect(self.on_preview_ready)
+        self.preview_worker.failed.connect(self.on_preview_failed)
+        # 保留上次合并的完整分辨率图集，换位置、改填充色或文件修改后只重绘变化的格子
+        self.composer = AtlasComposer()
+        # 保存在后台线程编码，显示进度并可以取消
+        self.save_worker = SaveWorker(self)
+        # 监视文件夹：图片写入/改名/删除后刷新列表和图集，保存过时自动重新写出
+        self.watcher = None
+        self.watch_changed = set()
+        self.last_save = None  # (路径, 格式, 编码参数)
+        self.saved_files = set()  # 本窗口写出的文件，写在输入文件夹里时不触发更新
+        self.watch_poll_timer = QTimer(self)
+        self.watch_poll_timer.setInterval(100)
+        self.watch_poll_timer.timeout.connect(self.check_watch)
+        # 连续写入合并成一次更新
+        self.watch_timer = QTimer(self)
+        self.watch_timer.setSingleShot(True)
+        self.watch_timer.setInterval(int(DEBOUNCE * 1000))
+        self.watch_timer.timeout.connect(self.apply_watch_changes)
         self.init_ui()
 
     def init_ui(self):
@@ -99,6 +175,14 @@ class MergeAtlasDock(QDockWidget):
         )
         self.btn_select_images.clicked.connect(self.select_images)
         btn_layout.addWidget(self.btn_select_images)
+        self.chk_watch = QCheckBox("监视文件夹")
+        self.chk_watch.setToolTip(
+            "文件夹中的图片写入、改名或删除后自动更新列表和预览；"
+            "合并过时只重绘变化的格子，保存过时自动重新写出"
+        )
+        self.chk_watch.setEnabled(False)
+        self.chk_watch.toggled.connect(self.toggle_watch)
+        btn_layout.addWidget(self.chk_watch)
         self.btn_merge = QPushButton("合并序列帧贴图")
         self.btn_merge.setSizePolicy(
             QSizePolicy.Policy.Maximum, QSizePolicy.Policy.Fixed
@@ -113,16 +197,56 @@ class MergeAtlasDock(QDockWidget):
         self.btn_save.clicked.connect(self.save_output)
         self.btn_save.setEnabled(False)
         btn_layout.addWidget(self.btn_save)
+        btn_layout.addWidget(QLabel("压缩:"))
+        # 编码预设：同样的画质，在编码速度和文件大小之间取舍
+        self.combo_encode = EncodePresetComboBox()
+        btn_layout.addWidget(self.combo_encode)
+        # 合成一次完整分辨率，逐级减半导出
+        self.btn_mips = QPushButton("导出多级分辨率")
+        self.btn_mips.setSizePolicy(
+            QSizePolicy.Policy.Maximum, QSizePolicy.Policy.Fixed
+        )
+        self.btn_mips.clicked.connect(self.export_mips)
+        self.btn_mips.setEnabled(False)
+        btn_layout.addWidget(self.btn_mips)
+        btn_layout.addWidget(QLabel("级数:"))
+        self.spin_mips = QSpinBox()
+        self.spin_mips.setRange(1, 16)
+        self.spin_mips.setValue(4)
+        self.spin_mips.setToolTip("包括输出分辨率在内的级数，每级宽高减半")
+        btn_layout.addWidget(self.spin_mips)
+        # 网格：统一为第一张的尺寸；紧密排列：尺寸不同的图片按原尺寸排列，写出 UV 清单
+        btn_layout.addWidget(QLabel("排列:"))
+        self.combo_layout = QComboBox()
+        self.combo_layout.addItems(LAYOUT_MODES)
+        self.combo_layout.setToolTip(
+            "紧密排列：按原尺寸放进尽量小的图集（可旋转、2 的幂），"
+            "同时写出 名字.json 清单（每张图的像素范围和 UV）"
+        )
+        self.combo_layout.currentIndexChanged.connect(self.change_layout)
+        btn_layout.addWidget(self.combo_layout)
         btn_layout.addWidget(QLabel("行数:"))
         self.spin_rows = QSpinBox()
         self.spin_rows.setRange(1, 12)
         self.spin_rows.setValue(2)
+        self.spin_rows.valueChanged.connect(self.preview_refresh)
         btn_layout.addWidget(self.spin_rows)
         btn_layout.addWidget(QLabel("列数:"))
         self.spin_cols = QSpinBox()
         self.spin_cols.setRange(1, 12)
         self.spin_cols.setValue(2)
+        self.spin_cols.valueChanged.connect(self.preview_refresh)
         btn_layout.addWidget(self.spin_cols)
+        # 帧数超过 行数x列数 时丢弃多余的帧，或分成多页保存
+        btn_layout.addWidget(QLabel("多余帧:"))
+        self.combo_overflow = QComboBox()
+        self.combo_overflow.addItems(OVERFLOW_MODES)
+        self.combo_overflow.setToolTip(
+            "分页输出：按顺序每 行数x列数 帧一页，保存为 名字_01、名字_02 ...，"
+            "各页并行合成，同时写出 名字.json 清单（每帧所在的页和格子）"
+        )
+        self.combo_overflow.currentIndexChanged.connect(self.preview_refresh)
+        btn_layout.addWidget(self.combo_overflow)
         self.btn_color = QPushButton("填充色")
         self.btn_color.clicked.connect(self.choose_color)
         btn_layout.addWidget(self.btn_color)
@@ -136,23 +260,62 @@ class MergeAtlasDock(QDockWidget):
         btn_layout.addWidget(self.label_color_tip)
         btn_layout.addWidget(QLabel("输出分辨率:"))
         self.combo_res = QComboBox()
-        self.combo_res.addItems(
-            [
-                "保持原分辨率",
-                "合并分辨率(拼接)",
-                "降采样x2",
-                "降采样x4",
-                "单张分辨率",
-                "合并分辨率x2",
-            ]
-        )
+        self.combo_res.addItems(GRID_RES_MODES)
         self.combo_res.setSizePolicy(
             QSizePolicy.Policy.Maximum, QSizePolicy.Policy.Fixed
         )
         self.combo_res.currentIndexChanged.connect(self.preview_refresh)
         btn_layout.addWidget(self.combo_res)
+        btn_layout.addWidget(QLabel("缩放:"))
+        # 缩放方式只影响导出，切换后重新生成完整分辨率结果
+        self.combo_resample = ResampleComboBox()
+        self.combo_resample.currentIndexChanged.connect(self.preview_refresh)
+        btn_layout.addWidget(self.combo_resample)
         btn_layout.addStretch()
-        btn_frame.setLayout(btn_layout)
+        # 紧密排列的选项，只在选择紧密排列时显示
+        self.pack_bar = QWidget()
+        pack_layout = QHBoxLayout()
+        pack_layout.setContentsMargins(8, 0, 8, 4)
+        pack_layout.setSpacing(6)
+        pack_layout.addWidget(QLabel("算法:"))
+        self.combo_pack = NotedComboBox(PACK_ALGORITHMS, PACK_NOTES)
+        self.combo_pack.currentIndexChanged.connect(self.preview_refresh)
+        pack_layout.addWidget(self.combo_pack)
+        pack_layout.addWidget(QLabel("最大尺寸:"))
+        self.combo_max_size = QComboBox()
+        self.combo_max_size.addItems([str(size) for size in MAX_SIZES])
+        self.combo_max_size.setCurrentText(str(DEFAULT_MAX_SIZE))
+        self.combo_max_size.setToolTip("放不下时分成多页：名字_01、名字_02 ...")
+        self.combo_max_size.currentIndexChanged.connect(self.preview_refresh)
+        pack_layout.addWidget(self.combo_max_size)
+        self.chk_pot = QCheckBox("2的幂")
+        self.chk_pot.setToolTip("图集宽高取 2 的幂（旧 GPU、压缩纹理需要）")
+        self.chk_pot.toggled.connect(self.preview_refresh)
+        pack_layout.addWidget(self.chk_pot)
+        self.chk_rotate = QCheckBox("允许旋转")
+        self.chk_rotate.setToolTip(
+            "可以顺时针旋转 90° 放置，清单中 rotated 为 true，使用时需要转回"
+        )
+        self.chk_rotate.toggled.connect(self.preview_refresh)
+        pack_layout.addWidget(self.chk_rotate)
+        pack_layout.addWidget(QLabel("间距:"))
+        self.spin_padding = QSpinBox()
+        self.spin_padding.setRange(0, 32)
+        self.spin_padding.setValue(DEFAULT_PADDING)
+        self.spin_padding.setToolTip(
+            "图片之间的间距（像素），避免过滤和 mip 时颜色渗入"
+        )
+        self.spin_padding.valueChanged.connect(self.preview_refresh)
+        pack_layout.addWidget(self.spin_padding)
+        pack_layout.addStretch()
+        self.pack_bar.setLayout(pack_layout)
+        self.pack_bar.setVisible(False)
+        bar_layout = QVBoxLayout()
+        bar_layout.setContentsMargins(0, 0, 0, 0)
+        bar_layout.setSpacing(0)
+        bar_layout.addLayout(btn_layout)
+        bar_layout.addWidget(self.pack_bar)
+        btn_frame.setLayout(bar_layout)
         # 分割线
         line = QFrame()
         line.setFrameShape(QFrame.Shape.HLine)
@@ -203,13 +366,13 @@ class MergeAtlasDock(QDockWidget):
         self.slider_icon.valueChanged.connect(self.change_icon_size)
         slider_layout.addWidget(self.slider_icon)
         left_layout.addLayout(slider_layout)
-        self.list_widget = AdaptiveListWidget()
-        self.list_widget.setSizePolicy(
+        self.list_view = AdaptiveListView()
+        self.list_view.setSizePolicy(
             QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding
         )
-        self.list_widget.setBaseIconSize(self.icon_size)
-        self.list_widget.setDragDropMode(QAbstractItemView.DragDropMode.InternalMove)
-        left_layout.addWidget(self.list_widget)
+        self.list_view.setBaseIconSize(self.icon_size)
+        self.list_view.setModel(self.frame_model)
+        left_layout.addWidget(self.list_view)
         # 数组数量显示
         self.label_count = QLabel()
         self.label_count.setAlignment(Qt.AlignmentFlag.AlignCenter)
@@ -235,7 +398,7 @@ class MergeAtlasDock(QDockWidget):
         preview_layout.addWidget(self.label_preview)
         self.label_res = QLabel("")
         self.label_res.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.label_res.setFixedHeight(36)
+        self.label_res.setMinimumHeight(36)
         preview_layout.addWidget(self.label_res)
         right_frame.setLayout(preview_layout)
         splitter.addWidget(right_frame)
@@ -275,59 +438,69 @@ class MergeAtlasDock(QDockWidget):
         painter.end()
         return pix
 
-    def refresh_list(self):
-        self.list_widget.clear()
-        res_set = set()
-        res_map = {}
-        for path in self.image_paths:
-            icon = QIcon(path)
-            name = os.path.basename(path) if self.show_name else ""
-            # 名字超长自动省略
-            if len(name) > 16:
-                name = name[:12] + "..." + name[-4:]
-            item = QListWidgetItem(icon, name)
-            self.list_widget.addItem(item)
-            try:
-                img = Image.open(path)
-                res = f"{img.width}x{img.height}"
-                res_set.add(res)
-                res_map.setdefault(res, []).append(name)
-            except Exception:
-                pass
-        self.label_count.setText(f"图片数量: {len(self.image_paths)}")
-        self.list_widget.setBaseIconSize(self.icon_size)
-        # 分辨率显示
-        if len(res_set) == 1:
-            self.label_img_res.setText(f"图片分辨率: {list(res_set)[0]}")
-        elif len(res_set) > 1:
+    @property
+    def image_paths(self):
+        return self.frame_model.paths()
+
+    def set_image_paths(self, paths, keep_atlas=False):
+        # keep_atlas：监视文件夹时增删了图片，保留缩略图和已合成的图集
+        if not keep_atlas:
+            self.thumb_loader.clear()
+            self.composer.reset()
+        self.preview_worker.cancel()
+        self.frame_model.set_paths(paths)
+        self.label_count.setText(f"图片数量: {len(paths)}")
+        self.list_view.setBaseIconSize(self.icon_size)
+        # 分辨率显示（从元数据索引查询，不重复读取文件）
+        self.res_map = image_index().resolution_report(paths)
+        self.update_res_label()
+
+    def update_res_label(self):
+        res_map = self.res_map
+        if len(res_map) > 1 and self.packing():
+            # 紧密排列按原尺寸放置，尺寸不同是正常的
+            self.label_img_res.setText(
+                f"<span style='color:gray'>图片尺寸: {len(res_map)} 种"
+                "（紧密排列按原尺寸放置）</span>"
+            )
+        elif len(res_map) == 1:
+            self.label_img_res.setText(f"图片分辨率: {list(res_map)[0]}")
+        elif len(res_map) > 1:
             diff = []
-            for r, names in res_map.items():
-                diff.append(f"<span style='color:red'>{r}: {', '.join(names)}</span>")
-            self.label_img_res.setText("分辨率不一致:<br>" + "<br>".join(diff))
+            for r, same in res_map.items():
+                # 帧数很多时只列出前几张
+                names = ", ".join(os.path.basename(p) for p in same[:5])
+                if len(same) > 5:
+                    names += f" 等 {len(same)} 张"
+                diff.append(f"<span style='color:red'>{r}: {names}</span>")
+            # 网格会统一为第一张的尺寸
+            self.label_img_res.setText(
+                "分辨率不一致（可选择 排列: 紧密排列）:<br>" + "<br>".join(diff)
+            )
         else:
             self.label_img_res.setText("")
 
     def toggle_show_name(self, state):
-        self.show_name = state == Qt.CheckState.Checked
-        self.refresh_list()
-        self.preview_refresh()
+        self.show_name = state == Qt.CheckState.Checked.value
+        self.frame_model.set_show_name(self.show_name)
 
     def change_icon_size(self, value):
         self.icon_size = value
-        self.list_widget.setBaseIconSize(self.icon_size)
-        self.preview_refresh()
+        self.list_view.setBaseIconSize(self.icon_size)
+        # 缩略图档位变化时重新请求，已有的图标保留到新缩略图生成为止
+        self.frame_model.set_icon_size(self.icon_size)
 
     def select_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "选择图片文件夹", "")
         if folder:
             self.folder_path = folder
-            self.image_paths = [
-                os.path.join(folder, f)
-                for f in os.listdir(folder)
-                if f.lower().endswith((".png", ".jpg", ".jpeg", ".bmp", ".tga"))
-            ]
-            self.refresh_list()
-            self.btn_merge.setEnabled(bool(self.image_paths))
+            self.set_image_paths(list_images(folder))
+            self.last_save = None
+            self.chk_watch.setEnabled(True)
+            if self.watcher is not None:
+                self.start_watch()
+            self.btn_merge.setEnabled(bool(self.frame_model))
+            self.btn_mips.setEnabled(bool(self.frame_model))
             self.btn_save.setEnabled(False)
             self.label_preview.setPixmap(self.make_checkerboard())
             self.label_res.clear()
@@ -339,107 +512,298 @@ class MergeAtlasDock(QDockWidget):
             self, "选择图片", "", "Images (*.png *.jpg *.bmp *.tga)"
         )
         if files:
-            self.image_paths = files
             self.folder_path = None
-            self.refresh_list()
-            self.btn_merge.setEnabled(bool(self.image_paths))
+            self.chk_watch.setChecked(False)
+            self.chk_watch.setEnabled(False)
+            self.set_image_paths(files)
+            self.btn_merge.setEnabled(bool(self.frame_model))
+            self.btn_mips.setEnabled(bool(self.frame_model))
             self.btn_save.setEnabled(False)
             self.label_preview.setPixmap(self.make_checkerboard())
             self.label_res.clear()
             self.output_img = None
             self.preview_refresh()
 
+    def toggle_watch(self, checked):
+        if checked and self.folder_path:
+            self.start_watch()
+        else:
+            self.stop_watch()
+
+    def start_watch(self):
+        self.stop_watch()
+        # Linux 上用 inotify，其他系统定时扫描
+        self.watcher = FolderWatcher([self.folder_path])
+        self.watch_poll_timer.start()
+        self.chk_watch.setToolTip(
+            f"正在监视 {self.folder_path}（{self.watcher.backend}）"
+        )
+
+    def stop_watch(self):
+        self.watch_poll_timer.stop()
+        self.watch_timer.stop()
+        self.watch_changed.clear()
+        if self.watcher is not None:
+            self.watcher.close()
+            self.watcher = None
+
+    def check_watch(self):
+        changed = self.watcher.changes() - self.saved_files
+        if changed:
+            self.watch_changed |= changed
+            self.watch_timer.start()
+
+    def apply_watch_changes(self):
+        if self.save_worker.busy():
+            # 正在保存（包括上一次自动保存），结束后再更新
+            self.watch_timer.start()
+            return
+        changed, self.watch_changed = self.watch_changed, set()
+        self.thumb_loader.invalidate(changed)
+        # 新增的图片排在最后，删除的图片移出列表，其余保持当前顺序
+        paths = self.image_paths
+        files = [
+            f
+            for f in list_images(self.folder_path)
+            if os.path.abspath(f) not in self.saved_files
+        ]
+        if set(files) != set(paths):
+            exists = set(files)
+            known = set(paths)
+            paths = [p for p in paths if p in exists]
+            paths += [p for p in files if p not in known]
+            self.set_image_paths(paths, keep_atlas=True)
+            self.btn_merge.setEnabled(bool(self.frame_model))
+            self.btn_mips.setEnabled(bool(self.frame_model))
+        else:
+            self.frame_model.refresh_icons()
+        if not self.frame_model:
+            return
+        merged = self.btn_save.isEnabled()
+        self.preview_refresh()
+        if merged and self.last_save is not None:
+            # 只重绘变化的格子，先写临时文件再改名
+            file, fmt, options = self.last_save
+            self.save_worker.start(
+                self.save_job(file, fmt, options),
+                partial(self.on_auto_saved, file),
+                quiet=True,
+            )
+
+    def on_auto_saved(self, file, result):
+        if isinstance(result, tuple):
+            # 分页输出
+            summary = f"{len(result[0])} 页和清单"
+        else:
+            summary = result.summary()
+        self.label_res.setText(
+            f"{self.label_res.text()}<br><span style='color:gray'>"
+            f"{time.strftime('%H:%M:%S')} 已自动保存 {os.path.basename(file)} "
+            f"{summary}</span>"
+        )
+
     def choose_color(self):
         color = QColorDialog.getColor(QColor(*self.fill_color), self, "选择填充色")
         if color.isValid():
             self.fill_color = (color.red(), color.green(), color.blue(), 255)
             self.update_color_preview()
+            self.preview_refresh()
 
     def move_up(self):
-        row = self.list_widget.currentRow()
+        # 当前行跟随移动，预览由 rowsMoved 刷新
+        row = self.list_view.currentIndex().row()
         if row > 0:
-            self.image_paths[row - 1], self.image_paths[row] = (
-                self.image_paths[row],
-                self.image_paths[row - 1],
-            )
-            self.refresh_list()
-            self.list_widget.setCurrentRow(row - 1)
-            self.preview_refresh()
+            self.frame_model.moveRow(QModelIndex(), row, QModelIndex(), row - 1)
 
     def move_down(self):
-        row = self.list_widget.currentRow()
-        if 0 <= row < len(self.image_paths) - 1:
-            self.image_paths[row + 1], self.image_paths[row] = (
-                self.image_paths[row],
-                self.image_paths[row + 1],
-            )
-            self.refresh_list()
-            self.list_widget.setCurrentRow(row + 1)
-            self.preview_refresh()
+        row = self.list_view.currentIndex().row()
+        if 0 <= row < self.frame_model.rowCount() - 1:
+            self.frame_model.moveRow(QModelIndex(), row, QModelIndex(), row + 2)
+
+    def current_mode(self):
+        return (
+            self.combo_res.currentText()
+            if hasattr(self, "combo_res")
+            else "合并分辨率(拼接)"
+        )
+
+    def packing(self):
+        return self.combo_layout.currentText() == LAYOUT_PACK
+
+    def pack_options(self):
+        return dict(
+            max_size=int(self.combo_max_size.currentText()),
+            power_of_two=self.chk_pot.isChecked(),
+            rotate=self.chk_rotate.isChecked(),
+            padding=self.spin_padding.value(),
+            algorithm=self.combo_pack.currentText(),
+        )
+
+    def change_layout(self):
+        # 行列、多余帧、填充色和输出分辨率只对网格有效
+        packing = self.packing()
+        for widget in (
+            self.spin_rows,
+            self.spin_cols,
+            self.combo_overflow,
+            self.btn_color,
+            self.combo_res,
+        ):
+            widget.setEnabled(not packing)
+        self.pack_bar.setVisible(packing)
+        self.update_res_label()
+        self.preview_refresh()
 
     def preview_refresh(self):
-        # 只刷新预览，不保存
-        self.merge_images(preview_only=True)
+        # 只刷新预览，不保存；请求去抖后在后台合成，界面不等待
+        if not self.frame_model:
+            return
+        self.output_img = None
+        if self.packing():
+            self.preview_worker.request(
+                partial(
+                    self.render_packed_preview, self.image_paths, self.pack_options()
+                )
+            )
+            return
+        job = partial(
+            self.render_preview,
+            self.composer,
+            self.used_paths(),
+            self.spin_rows.value(),
+            self.spin_cols.value(),
+            self.current_mode(),
+            self.fill_color,
+            self.combo_resample.currentText(),
+        )
+        self.preview_worker.request(job)
+
+    @staticmethod
+    def render_preview(
+        composer, paths, rows, cols, mode, fill_color, policy, cancelled
+    ):
+        # 工作线程中执行：已经合并过且布局没变时增量更新完整分辨率图集（通常只重绘几格），
+        # 否则按预览尺寸解码和合成，完整分辨率只在合并/保存时计算
+        missing = []
+        if composer.can_update(paths, rows, cols, mode, policy):
+            atlas = composer.compose(
+                paths, rows, cols, mode, fill_color, policy, cancelled=cancelled
+            )
+            preview_img, out_size = fit_preview(atlas, (360, 360)), atlas.size
+            missing = composer.missing
+        else:
+            atlas = None
+            preview_img, out_size = build_merge_preview(
+                paths, rows, cols, mode, fill_color, (360, 360), cancelled, missing
+            )
+        # 跨线程传递前深拷贝，不再引用工作线程里的缓冲区
+        return pil_to_qimage(preview_img).copy(), out_size, atlas, None, missing
+
+    @staticmethod
+    def render_packed_preview(paths, pack_options, cancelled):
+        # 排列只用元数据里的尺寸（几百张只需几毫秒），再按原尺寸合成第一页
+        # 只有一页时返回的图集保存时直接使用
+        bins = pack_paths(paths, **pack_options)
+        atlas = compose_page(paths, bins[0], cancelled=cancelled)
+        note = f"（{len(paths)} 张，利用率 {occupancy(paths, bins):.0%}"
+        if len(bins) > 1:
+            note += f"，共 {len(bins)} 页，预览为第 1 页"
+            atlas_out = None
+        else:
+            atlas_out = atlas
+        preview = pil_to_qimage(fit_preview(atlas, (360, 360))).copy()
+        return preview, atlas.size, atlas_out, note + "）", []
 
     def merge_images(self, preview_only=False):
-        if not self.image_paths:
+        if not self.frame_model:
+            return
+        if preview_only:
+            self.preview_refresh()
+            return
+        if self.packing():
+            self.preview_worker.cancel()
+            try:
+                result = self.render_packed_preview(
+                    self.image_paths, self.pack_options(), None
+                )
+            except ValueError as e:
+                QMessageBox.warning(self, "无法排列", str(e))
+                return
+            self.on_preview_ready(result)
+            self.btn_save.setEnabled(True)
             return
-        # 拖拽排序后同步image_paths
-        self.sync_image_paths_from_list()
         rows = self.spin_rows.value()
         cols = self.spin_cols.value()
-        total = rows * cols
-        imgs = []
-        img_sizes = []
-        for path in self.image_paths[:total]:
-            img = Image.open(path).convert("RGBA")
-            imgs.append(img)
-            img_sizes.append(img.size)
-        # 统一尺寸为第一张图片的尺寸
-        if imgs:
-            w, h = imgs[0].size
-        else:
-            w, h = 128, 128
-        # 填充不足
-        while len(imgs) < total:
-            fill = Image.new("RGBA", (w, h), self.fill_color)
-            imgs.append(fill)
-            img_sizes.append((w, h))
-        # 合成
-        mode = (
-            self.combo_res.currentText()
-            if hasattr(self, "combo_res")
-            else "合并分辨率(拼接)"
+        if self.large_output():
+            # 超大贴图不在内存里合成，只显示预览，保存时按行带写出
+            self.composer.reset()
+            self.preview_refresh()
+            self.btn_save.setEnabled(True)
+            return
+        # 排队中的预览已过期，不再覆盖合并结果
+        self.preview_worker.cancel()
+        stats = DecodeStats()
+        atlas = self.composer.compose(
+            self.used_paths(),
+            rows,
+            cols,
+            self.current_mode(),
+            self.fill_color,
+            self.combo_resample.currentText(),
+            stats=stats,
         )
-        if mode == "保持原分辨率":
-            out_w, out_h = w, h
-        elif mode == "合并分辨率(拼接)":
-            out_w, out_h = w * cols, h * rows
-        elif mode == "降采样x2":
-            out_w, out_h = max(1, w * cols // 2), max(1, h * rows // 2)
-        elif mode == "降采样x4":
-            out_w, out_h = max(1, w * cols // 4), max(1, h * rows // 4)
-        elif mode == "单张分辨率":
-            out_w, out_h = w, h
-        elif mode == "合并分辨率x2":
-            out_w, out_h = w * cols * 2, h * rows * 2
-        else:
-            out_w, out_h = w * cols, h * rows
-        atlas = Image.new("RGBA", (w * cols, h * rows), (0, 0, 0, 0))
-        for idx, img in enumerate(imgs):
-            r = idx // cols
-            c = idx % cols
-            atlas.paste(img, (c * w, r * h))
-        # 输出分辨率调整
-        if (out_w, out_h) != atlas.size:
-            atlas = atlas.resize((out_w, out_h), Image.Resampling.LANCZOS)
-        if not preview_only:
+        self.output_img = atlas
+        self.show_preview((pil_to_qimage(fit_preview(atlas, (360, 360))), atlas.size))
+        # 解码吞吐显示在分辨率下方，用于调整解码线程数
+        self.label_res.setText(
+            f"{self.label_res.text()}<br>"
+            f"<span style='color:gray'>{self.composer.summary()}<br>"
+            f"{stats.summary()}</span>"
+        )
+        self.show_missing(self.composer.missing)
+        self.btn_save.setEnabled(True)
+
+    def used_paths(self):
+        # 只有前 行数x列数 帧参与合成
+        model = self.frame_model
+        count = min(len(model), self.spin_rows.value() * self.spin_cols.value())
+        return [model.path(row) for row in range(count)]
+
+    def large_output(self):
+        info = next((i for i in image_index().get_many(self.used_paths()) if i), None)
+        if info is None:
+            return False
+        return needs_streaming(
+            info.width,
+            info.height,
+            self.spin_rows.value(),
+            self.spin_cols.value(),
+            self.current_mode(),
+        )
+
+    def on_preview_ready(self, result):
+        qt_img, out_size, atlas, note, missing = result
+        if atlas is not None:
+            # 增量更新或紧密排列得到的完整分辨率图集，保存时直接使用
             self.output_img = atlas
-        # 预览
-        buf = io.BytesIO()
-        atlas.thumbnail((360, 360), Image.Resampling.LANCZOS)
-        atlas.save(buf, format="PNG")
-        qt_img = QImage.fromData(buf.getvalue())
+        self.show_preview((qt_img, out_size), note)
+        self.show_missing(missing)
+
+    def show_missing(self, missing):
+        # 无法读取的帧显示为填充色（增量合并同样），按行带写出的超大图集保存时会报错
+        if not missing:
+            return
+        names = ", ".join(os.path.basename(p) for p in missing[:3])
+        if len(missing) > 3:
+            names += f" 等 {len(missing)} 张"
+        self.label_res.setText(
+            f"{self.label_res.text()}<br>"
+            f"<span style='color:red'>无法读取: {names}</span>"
+        )
+
+    def show_preview(self, result, note=None):
+        # note 为分辨率后面的说明，默认为分页提示
+        qt_img, (out_w, out_h) = result
         preview = self.make_checkerboard()
         pixmap = QPixmap.fromImage(qt_img)
         painter = QPainter(preview)
@@ -448,42 +812,262 @@ class MergeAtlasDock(QDockWidget):
         painter.drawPixmap(x, y, pixmap)
         painter.end()
         self.label_preview.setPixmap(preview)
-        self.label_res.setText(f"输出分辨率: {out_w}x{out_h}")
-        if not preview_only:
-            self.btn_save.setEnabled(True)
+        if note is None:
+            note = self.page_note()
+        self.label_res.setText(f"输出分辨率: {out_w}x{out_h}{note}")
 
-    def sync_image_paths_from_list(self):
-        # 拖拽排序后同步image_paths
-        new_paths = []
-        for i in range(self.list_widget.count()):
-            item = self.list_widget.item(i)
-            if item is None:
-                continue
-            name = item.text()
-            for path in self.image_paths:
-                if os.path.basename(path) == name or not self.show_name:
-                    new_paths.append(path)
-                    break
-        self.image_paths = new_paths
+    def paging(self):
+        return (
+            not self.packing()
+            and self.combo_overflow.currentText() == OVERFLOW_PAGES
+            and len(self.frame_model) > self.spin_rows.value() * self.spin_cols.value()
+        )
+
+    def page_note(self):
+        # 帧数超过 行数x列数 时提示页数或未使用的帧数
+        extra = len(self.frame_model) - self.spin_rows.value() * self.spin_cols.value()
+        if extra <= 0:
+            return ""
+        if self.paging():
+            pages = split_pages(
+                self.image_paths, self.spin_rows.value(), self.spin_cols.value()
+            )
+            return f"（共 {len(pages)} 页，预览为第 1 页）"
+        return f"<span style='color:#c60'>（多余 {extra} 帧未使用）</span>"
+
+    def on_preview_failed(self, message):
+        self.label_res.setText(f"<span style='color:red'>预览失败: {message}</span>")
 
     def save_output(self):
-        if self.output_img is None:
+        if self.output_img is None and not self.btn_save.isEnabled():
             QMessageBox.warning(self, "未生成图片", "请先合并后再保存！")
             return
         file, selected_filter = QFileDialog.getSaveFileName(
+            self, "保存输出", "output.png", SAVE_FILTERS
+        )
+        if not file:
+            return
+        # DDS/KTX2 总是带完整 mip 链
+        fmt, options = filter_format(selected_filter)
+        # 分页输出和紧密排列都写出多个文件和清单
+        paged = self.paging() or self.packing()
+        done = self.on_pages_saved if paged else self.on_saved
+        self.save_worker.start(
+            self.save_job(file, fmt, options), partial(done, file, fmt, options)
+        )
+
+    def save_job(self, file, fmt, options):
+        if self.packing():
+            # 排列、逐页合成和编码，最后写清单
+            return partial(
+                write_packed,
+                file,
+                self.image_paths,
+                fmt,
+                self.combo_encode.get_value(),
+                self.combo_resample.currentText(),
+                options,
+                self.pack_options(),
+            )
+        if self.paging():
+            # 各页在多个线程里同时合成和编码，全部写完后写清单
+            return partial(
+                write_pages,
+                file,
+                self.image_paths,
+                self.spin_rows.value(),
+                self.spin_cols.value(),
+                self.current_mode(),
+                self.fill_color,
+                fmt,
+                self.combo_encode.get_value(),
+                self.combo_resample.currentText(),
+                options,
+            )
+        return partial(
+            self.write_output,
+            file,
+            fmt,
+            options,
+            self.combo_encode.get_value(),
+            self.combo_resample.currentText(),
+            self.output_img,
+            self.composer,
+            self.large_output(),
+            self.used_paths(),
+            self.spin_rows.value(),
+            self.spin_cols.value(),
+            self.current_mode(),
+            self.fill_color,
+        )
+
+    @staticmethod
+    def write_output(
+        file,
+        fmt,
+        options,
+        preset,
+        policy,
+        atlas,
+        composer,
+        stream,
+        paths,
+        rows,
+        cols,
+        mode,
+        fill_color,
+        progress,
+    ):
+        # 工作线程中执行：需要时按当前参数合成完整分辨率，再编码写出
+        if stream and strip_format(file, fmt):
+            start = time.perf_counter()
+            write_merge_atlas(
+                file,
+                paths,
+                rows,
+                cols,
+                mode,
+                fill_color,
+                fmt,
+                policy=policy,
+                compress_level=compress_level(preset),
+                progress=progress,
+            )
+            return EncodeResult(
+                strip_format(file, fmt),
+                file,
+                os.path.getsize(file),
+                time.perf_counter() - start,
+            )
+        if atlas is None and stream:
+            # 超大画布放在临时文件映射里
+            atlas = build_merge_atlas(
+                paths[: rows * cols], rows, cols, mode, fill_color, True, policy=policy
+            )
+        elif atlas is None:
+            # 合并后又改过参数或文件有变化，只重绘变化的格子
+            atlas = composer.compose(paths, rows, cols, mode, fill_color, policy)
+        return encode(
+            atlas, file, fmt, preset, policy=policy, progress=progress, **options
+        )
+
+    def on_saved(self, file, fmt, options, result):
+        # 监视文件夹时按同样的路径和格式自动重新写出
+        self.last_save = (file, fmt, options)
+        self.saved_files.add(os.path.abspath(file))
+        QMessageBox.information(
+            self, "保存成功", f"已保存到: {file}\n{result.summary()}"
+        )
+
+    def on_pages_saved(self, file, fmt, options, result):
+        results, manifest = result
+        self.last_save = (file, fmt, options)
+        self.saved_files.update(os.path.abspath(r.path) for r in results)
+        names = "\n".join(os.path.basename(r.path) for r in results[:5])
+        if len(results) > 5:
+            names += f"\n... 共 {len(results)} 页"
+        nbytes = sum(r.nbytes for r in results)
+        QMessageBox.information(
             self,
-            "保存输出",
+            "保存成功",
+            f"已保存 {len(results)} 页:\n{names}\n"
+            f"清单: {os.path.basename(manifest)}\n共 {nbytes / 1048576:.2f} MB",
+        )
+
+    def export_mips(self):
+        if not self.frame_model:
+            return
+        file, selected_filter = QFileDialog.getSaveFileName(
+            self,
+            "导出多级分辨率",
             "output.png",
-            "PNG Files (*.png);;JPEG Files (*.jpg *.jpeg);;BMP Files (*.bmp);;All Files (*)",
-        )
-        if file:
-            if selected_filter.startswith("PNG"):
-                fmt = "PNG"
-            elif selected_filter.startswith("JPEG"):
-                fmt = "JPEG"
-            elif selected_filter.startswith("BMP"):
-                fmt = "BMP"
-            else:
-                fmt = None
-            self.output_img.save(file, format=fmt)
-            QMessageBox.information(self, "保存成功", f"已保存到: {file}")
+            ";;".join(
+                [name for name, _ in FILE_FILTERS]
+                + ["TIFF 多页 (*.tif *.tiff)", "All Files (*)"]
+            ),
+        )
+        if not file:
+            return
+        container = selected_filter.startswith("TIFF 多页")
+        fmt = "TIFF" if container else filter_format(selected_filter)[0]
+        if self.packing() and self.output_img is None:
+            # 紧密排列先合成，多页时没有单张图集
+            self.merge_images()
+            if self.output_img is None:
+                QMessageBox.warning(
+                    self, "无法导出", "紧密排列分成了多页，多级分辨率只支持单页图集"
+                )
+                return
+        job = partial(
+            self.write_mips,
+            file,
+            fmt,
+            container,
+            self.spin_mips.value(),
+            self.combo_encode.get_value(),
+            self.combo_resample.currentText(),
+            self.output_img,
+            self.large_output(),
+            self.used_paths(),
+            self.spin_rows.value(),
+            self.spin_cols.value(),
+            self.current_mode(),
+            self.fill_color,
+        )
+        self.save_worker.start(
+            job, partial(self.on_mips_saved, file, container), "正在导出多级分辨率..."
+        )
+
+    @staticmethod
+    def write_mips(
+        file,
+        fmt,
+        container,
+        levels,
+        preset,
+        policy,
+        atlas,
+        large,
+        paths,
+        rows,
+        cols,
+        mode,
+        fill_color,
+        progress,
+    ):
+        # 工作线程中执行：只合成一次完整分辨率，超大画布放在临时文件映射里
+        if atlas is None:
+            atlas = build_merge_atlas(
+                paths[: rows * cols],
+                rows,
+                cols,
+                mode,
+                fill_color,
+                memmap=True if large else None,
+                policy=policy,
+            )
+        result = encode(
+            atlas,
+            file,
+            fmt,
+            preset,
+            mips=levels,
+            container=container,
+            policy=policy,
+            progress=progress,
+        )
+        return result, mip_sizes(atlas.size, levels)
+
+    def on_mips_saved(self, file, container, result):
+        result, sizes = result
+        if container:
+            names = os.path.basename(file)
+        else:
+            names = "\n".join(
+                f"{os.path.basename(mip_path(file, size))}" for size in sizes
+            )
+        QMessageBox.information(
+            self,
+            "导出成功",
+            f"已导出 {len(sizes)} 级分辨率:\n{names}\n{result.summary()}",
+        )
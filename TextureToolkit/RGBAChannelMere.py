@@ -12,9 +12,20 @@ from PyQt6.QtWidgets import (
     QSizePolicy,
 )
 from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QPixmap, QImage, QPainter, QColor, QBrush
-from PIL import Image
-import io
+from PyQt6.QtGui import QPixmap, QPainter, QColor, QBrush
+from ImageCache import load_image
+from AtlasEngine import (
+    CHANNEL_RES_MODES,
+    build_channel_atlas,
+    build_channel_preview,
+    fit_preview,
+)
+from Encoders import SAVE_FILTERS, encode, filter_format
+from Library.EncodePresetComboBox import EncodePresetComboBox
+from Library.ImageBridge import pil_to_qimage
+from Library.ResampleComboBox import ResampleComboBox
+from Library.SaveWorker import SaveWorker
+from functools import partial
 
 
 class RGBAChannelMere(QDockWidget):
@@ -26,6 +37,8 @@ class RGBAChannelMere(QDockWidget):
         self.input_path = None
         self.input_img = None
         self.output_img = None
+        # 保存在后台线程编码，显示进度并可以取消
+        self.save_worker = SaveWorker(self)
         self.init_ui()
 
     def init_ui(self):
@@ -53,17 +66,24 @@ class RGBAChannelMere(QDockWidget):
         self.btn_save.clicked.connect(self.save_output)
         self.btn_save.setEnabled(False)
         btn_layout.addWidget(self.btn_save)
+        btn_layout.addWidget(QLabel("压缩:"))
+        # 编码预设：同样的画质，在编码速度和文件大小之间取舍
+        self.combo_encode = EncodePresetComboBox()
+        btn_layout.addWidget(self.combo_encode)
         # 输出分辨率策略下拉菜单
         self.combo_res = QComboBox()
-        self.combo_res.addItems(
-            ["保持原分辨率", "合并分辨率(2x2)", "降采样x2", "降采样x4"]
-        )
+        self.combo_res.addItems(CHANNEL_RES_MODES)
         self.combo_res.setSizePolicy(
             QSizePolicy.Policy.Maximum, QSizePolicy.Policy.Fixed
         )
         self.combo_res.currentIndexChanged.connect(self.update_output_by_combo)
         btn_layout.addWidget(QLabel("输出分辨率:"))
         btn_layout.addWidget(self.combo_res)
+        btn_layout.addWidget(QLabel("缩放:"))
+        # 缩放方式只影响导出，切换后重新生成完整分辨率结果
+        self.combo_resample = ResampleComboBox()
+        self.combo_resample.currentIndexChanged.connect(self.update_output_by_combo)
+        btn_layout.addWidget(self.combo_resample)
         btn_layout.addStretch()
         main_layout.addLayout(btn_layout)
         # 预览区
@@ -117,7 +137,7 @@ class RGBAChannelMere(QDockWidget):
         )
         if file:
             self.input_path = file
-            self.input_img = Image.open(file).convert("RGBA")
+            self.input_img = load_image(file)
             # 合成棋盘格和图片
             preview = self.make_checkerboard()
             pixmap = QPixmap(file).scaled(180, 180, Qt.AspectRatioMode.KeepAspectRatio)
@@ -136,35 +156,24 @@ class RGBAChannelMere(QDockWidget):
             self.label_output_res.clear()
             self.output_img = None
 
-    def process_image(self):
+    def process_image(self, preview_only=False):
         if not self.input_img:
             return
-        img = self.input_img
-        r, g, b, a = img.split()
-        w, h = img.size
         mode = self.combo_res.currentText()
-        # 生成2x2合成贴图
-        new_img = Image.new("L", (w * 2, h * 2))
-        new_img.paste(r, (0, 0))
-        new_img.paste(g, (w, 0))
-        new_img.paste(b, (0, h))
-        new_img.paste(a, (w, h))
-        # 根据分辨率策略调整输出
-        if mode == "保持原分辨率":
-            out_img = new_img.resize((w, h), Image.Resampling.LANCZOS)
-        elif mode == "合并分辨率(2x2)":
-            out_img = new_img
-        elif mode == "降采样x2":
-            out_img = new_img.resize((w, h), Image.Resampling.LANCZOS)
-        elif mode == "降采样x4":
-            out_img = new_img.resize((w // 2, h // 2), Image.Resampling.LANCZOS)
+        if preview_only:
+            # 只合成预览尺寸，完整分辨率在保存时生成
+            preview_img, (ow, oh) = build_channel_preview(self.input_img, mode)
+            self.output_img = None
         else:
-            out_img = new_img
-        self.output_img = out_img
+            # 生成2x2合成贴图并根据分辨率策略调整输出
+            out_img = build_channel_atlas(
+                self.input_img, mode, self.combo_resample.currentText()
+            )
+            self.output_img = out_img
+            ow, oh = out_img.size
+            preview_img = fit_preview(out_img, (180, 180))
         # 显示输出预览（叠加棋盘格）
-        buf = io.BytesIO()
-        out_img.save(buf, format="PNG")
-        qt_img = QImage.fromData(buf.getvalue())
+        qt_img = pil_to_qimage(preview_img)
         preview = self.make_checkerboard()
         pixmap = QPixmap.fromImage(qt_img).scaled(
             180, 180, Qt.AspectRatioMode.KeepAspectRatio
@@ -175,36 +184,51 @@ class RGBAChannelMere(QDockWidget):
         painter.drawPixmap(x, y, pixmap)
         painter.end()
         self.label_output.setPixmap(preview)
-        ow, oh = out_img.size
         self.label_output_res.setText(f"输出分辨率: {ow}x{oh}")
         self.btn_save.setEnabled(True)
 
     def save_output(self):
-        if self.output_img is None:
+        if self.input_img is None or not self.btn_save.isEnabled():
             QMessageBox.warning(self, "未生成图片", "请先生成图片后再保存！")
             return
         file, selected_filter = QFileDialog.getSaveFileName(
-            self,
-            "保存输出",
-            "output.png",
-            "PNG Files (*.png);;JPEG Files (*.jpg *.jpeg);;BMP Files (*.bmp);;All Files (*)",
+            self, "保存输出", "output.png", SAVE_FILTERS
+        )
+        if not file:
+            return
+        # 通道打包贴图保存为 DDS/KTX2 时也带完整 mip 链
+        fmt, options = filter_format(selected_filter)
+        job = partial(
+            self.write_output,
+            file,
+            fmt,
+            options,
+            self.combo_encode.get_value(),
+            self.combo_resample.currentText(),
+            self.output_img,
+            self.input_img,
+            self.combo_res.currentText(),
+        )
+        self.save_worker.start(job, partial(self.on_saved, file))
+
+    @staticmethod
+    def write_output(file, fmt, options, preset, policy, atlas, img, mode, progress):
+        # 工作线程中执行：只有预览时按当前参数生成完整分辨率，再编码写出
+        if atlas is None:
+            atlas = build_channel_atlas(img, mode, policy)
+        return encode(
+            atlas, file, fmt, preset, policy=policy, progress=progress, **options
+        )
+
+    def on_saved(self, file, result):
+        QMessageBox.information(
+            self, "保存成功", f"已保存到: {file}\n{result.summary()}"
         )
-        if file:
-            if selected_filter.startswith("PNG"):
-                fmt = "PNG"
-            elif selected_filter.startswith("JPEG"):
-                fmt = "JPEG"
-            elif selected_filter.startswith("BMP"):
-                fmt = "BMP"
-            else:
-                fmt = None  # 让Pillow自动判断
-            self.output_img.save(file, format=fmt)
-            QMessageBox.information(self, "保存成功", f"已保存到: {file}")
 
     def update_output_by_combo(self):
         # 只要有输入图片且已经合成过，切换分辨率策略时自动更新输出
         if self.input_img:
-            self.process_image()
+            self.process_image(preview_only=True)
 
 
 class MainWindow(QMainWindow):
@@ -11,11 +11,34 @@ from PyQt6.QtWidgets import (
     QSpinBox,
     QFrame,
     QFileDialog,
+    QMessageBox,
 )
 from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QPixmap, QImage, QPainter, QColor
-from PIL import Image
-import io
+from PyQt6.QtGui import QPixmap, QPainter, QColor
+from ImageCache import load_image
+from AtlasEngine import (
+    GRID_RES_MODES,
+    build_single_atlas,
+    build_single_preview,
+    fit_preview,
+    needs_streaming,
+    write_single_atlas,
+)
+from AtlasWriter import strip_format
+from Encoders import (
+    SAVE_FILTERS,
+    EncodeResult,
+    compress_level,
+    encode,
+    filter_format,
+)
+from Library.EncodePresetComboBox import EncodePresetComboBox
+from Library.ImageBridge import pil_to_qimage
+from Library.ResampleComboBox import ResampleComboBox
+from Library.SaveWorker import SaveWorker
+from functools import partial
+import os
+import time
 
 
 class SingleAtlasDock(QDockWidget):
@@ -30,6 +53,8 @@ class SingleAtlasDock(QDockWidget):
         self.input_img = None
         self.output_img = None
         self.fill_color = (200, 200, 200, 255)
+        # 保存在后台线程编码，显示进度并可以取消
+        self.save_worker = SaveWorker(self)
         self.init_ui()
 
     def init_ui(self):
@@ -59,6 +84,10 @@ class SingleAtlasDock(QDockWidget):
         self.btn_save.clicked.connect(self.save_output)
         self.btn_save.setEnabled(False)
         btn_layout.addWidget(self.btn_save)
+        btn_layout.addWidget(QLabel("压缩:"))
+        # 编码预设：同样的画质，在编码速度和文件大小之间取舍
+        self.combo_encode = EncodePresetComboBox()
+        btn_layout.addWidget(self.combo_encode)
         # 新增模式选择
         btn_layout.addWidget(QLabel("模式:"))
         self.combo_mode = QComboBox()
@@ -84,21 +113,17 @@ class SingleAtlasDock(QDockWidget):
         btn_layout.addWidget(self.color_preview)
         btn_layout.addWidget(QLabel("输出分辨率:"))
         self.combo_res = QComboBox()
-        self.combo_res.addItems(
-            [
-                "保持原分辨率",
-                "合并分辨率(拼接)",
-                "降采样x2",
-                "降采样x4",
-                "单张分辨率",
-                "合并分辨率x2",
-            ]
-        )
+        self.combo_res.addItems(GRID_RES_MODES)
         self.combo_res.setSizePolicy(
             QSizePolicy.Policy.Maximum, QSizePolicy.Policy.Fixed
         )
         self.combo_res.currentIndexChanged.connect(self.preview_refresh)
         btn_layout.addWidget(self.combo_res)
+        btn_layout.addWidget(QLabel("缩放:"))
+        # 缩放方式只影响导出，切换后重新生成完整分辨率结果
+        self.combo_resample = ResampleComboBox()
+        self.combo_resample.currentIndexChanged.connect(self.preview_refresh)
+        btn_layout.addWidget(self.combo_resample)
         btn_layout.addStretch()
         main_layout.addLayout(btn_layout)
         # 预览区
@@ -152,7 +177,7 @@ class SingleAtlasDock(QDockWidget):
         )
         if file:
             self.input_path = file
-            self.input_img = Image.open(file).convert("RGBA")
+            self.input_img = load_image(file)
             # 合成棋盘格和图片
             preview = self.make_checkerboard()
             pixmap = QPixmap(file).scaled(180, 180, Qt.AspectRatioMode.KeepAspectRatio)
@@ -171,46 +196,36 @@ class SingleAtlasDock(QDockWidget):
             self.label_output_res.clear()
             self.output_img = None
 
-    def process_image(self):
+    def process_image(self, preview_only=False):
         if not self.input_img:
             return
-        img = self.input_img
-        w, h = img.size
         rows = self.spin_rows.value()
         cols = self.spin_cols.value()
         mode = self.combo_res.currentText()
-        # 新增：合成模式
-        fill_mode = self.combo_mode.currentText()
-        # 生成序列帧合成贴图
-        new_img = Image.new("RGBA", (w * cols, h * rows), self.fill_color)
-        if fill_mode == "全部重复单张":
-            for r in range(rows):
-                for c in range(cols):
-                    new_img.paste(img, (c * w, r * h))
-        else:  # 单张加颜色
-            new_img.paste(img, (0, 0))
-        # 根据分辨率策略调整输出
-        if mode == "保持原分辨率":
-            out_img = new_img.resize((w, h), Image.Resampling.LANCZOS)
-        elif mode == "合并分辨率(拼接)":
-            out_img = new_img
-        elif mode == "降采样x2":
-            out_img = new_img.resize((w, h), Image.Resampling.LANCZOS)
-        elif mode == "降采样x4":
-            out_img = new_img.resize((w // 2, h // 2), Image.Resampling.LANCZOS)
-        elif mode == "单张分辨率":
-            out_img = img
-        elif mode == "合并分辨率x2":
-            out_img = new_img.resize(
-                (w * cols // 2, h * rows // 2), Image.Resampling.LANCZOS
+        # 合成模式：全部重复单张 / 单张加颜色
+        repeat = self.combo_mode.currentText() == "全部重复单张"
+        # 超大贴图不在内存里合成，只显示预览，保存时按行带写出
+        if preview_only or self.large_output():
+            # 只合成预览尺寸，完整分辨率在保存时生成
+            preview_img, (ow, oh) = build_single_preview(
+                self.input_img, rows, cols, mode, self.fill_color, repeat
             )
+            self.output_img = None
         else:
-            out_img = new_img
-        self.output_img = out_img
+            out_img = build_single_atlas(
+                self.input_img,
+                rows,
+                cols,
+                mode,
+                self.fill_color,
+                repeat=repeat,
+                policy=self.combo_resample.currentText(),
+            )
+            self.output_img = out_img
+            ow, oh = out_img.size
+            preview_img = fit_preview(out_img, (180, 180))
         # 显示输出预览（叠加棋盘格）
-        buf = io.BytesIO()
-        out_img.save(buf, format="PNG")
-        qt_img = QImage.fromData(buf.getvalue())
+        qt_img = pil_to_qimage(preview_img)
         preview = self.make_checkerboard()
         pixmap = QPixmap.fromImage(qt_img).scaled(
             180, 180, Qt.AspectRatioMode.KeepAspectRatio
@@ -221,7 +236,6 @@ class SingleAtlasDock(QDockWidget):
         painter.drawPixmap(x, y, pixmap)
         painter.end()
         self.label_output.setPixmap(preview)
-        ow, oh = out_img.size
         self.label_output_res.setText(f"输出分辨率: {ow}x{oh}")
         self.btn_save.setEnabled(True)
 
@@ -235,25 +249,104 @@ class SingleAtlasDock(QDockWidget):
             self.preview_refresh()
 
     def preview_refresh(self):
-        if self.output_img is not None:
-            self.process_image()
+        # 合成过之后参数变化只刷新预览
+        if self.input_img and self.btn_save.isEnabled():
+            self.process_image(preview_only=True)
+
+    def large_output(self):
+        w, h = self.input_img.size
+        return needs_streaming(
+            w,
+            h,
+            self.spin_rows.value(),
+            self.spin_cols.value(),
+            self.combo_res.currentText(),
+        )
 
     def save_output(self):
-        if self.output_img is None:
+        if self.input_img is None or not self.btn_save.isEnabled():
             return
         file, selected_filter = QFileDialog.getSaveFileName(
-            self,
-            "保存输出",
-            "output.png",
-            "PNG Files (*.png);;JPEG Files (*.jpg *.jpeg);;BMP Files (*.bmp);;All Files (*)",
+            self, "保存输出", "output.png", SAVE_FILTERS
+        )
+        if not file:
+            return
+        # DDS/KTX2 总是带完整 mip 链
+        fmt, options = filter_format(selected_filter)
+        job = partial(
+            self.write_output,
+            file,
+            fmt,
+            options,
+            self.combo_encode.get_value(),
+            self.combo_resample.currentText(),
+            self.output_img,
+            self.large_output(),
+            self.input_img,
+            self.spin_rows.value(),
+            self.spin_cols.value(),
+            self.combo_res.currentText(),
+            self.fill_color,
+            self.combo_mode.currentText() == "全部重复单张",
+        )
+        self.save_worker.start(job, partial(self.on_saved, file))
+
+    @staticmethod
+    def write_output(
+        file,
+        fmt,
+        options,
+        preset,
+        policy,
+        atlas,
+        stream,
+        img,
+        rows,
+        cols,
+        mode,
+        fill_color,
+        repeat,
+        progress,
+    ):
+        # 工作线程中执行：需要时按当前参数合成完整分辨率，再编码写出
+        if stream and strip_format(file, fmt):
+            start = time.perf_counter()
+            write_single_atlas(
+                file,
+                img,
+                rows,
+                cols,
+                mode,
+                fill_color,
+                repeat,
+                fmt,
+                policy=policy,
+                compress_level=compress_level(preset),
+                progress=progress,
+            )
+            return EncodeResult(
+                strip_format(file, fmt),
+                file,
+                os.path.getsize(file),
+                time.perf_counter() - start,
+            )
+        if atlas is None:
+            # 合成后又改过参数；超大画布放在临时文件映射里
+            atlas = build_single_atlas(
+                img,
+                rows,
+                cols,
+                mode,
+                fill_color,
+                repeat,
+                memmap=True if stream else None,
+                policy=policy,
+            )
+        return encode(
+            atlas, file, fmt, preset, policy=policy, progress=progress, **options
+        )
+
+    def on_saved(self, file, result):
+        QMessageBox.information(
+            self, "保存成功", f"已保存到: {file}\n{result.summary()}"
         )
-        if file:
-            if selected_filter.startswith("PNG"):
-                fmt = "PNG"
-            elif selected_filter.startswith("JPEG"):
-                fmt = "JPEG"
-            elif selected_filter.startswith("BMP"):
-                fmt = "BMP"
-            else:
-                fmt = None
-            self.output_img.save(file, format=fmt)
@@ -0,0 +1,57 @@
+import os
+import tempfile
+from PIL import Image
+from ImageIndex import image_index
+
+# 缩略图生成与磁盘缓存（不依赖Qt，可在工作线程中调用）
+# 缓存文件以 "内容哈希_尺寸档位.png" 命名，文件内容不变时跨文件夹、跨会话复用
+
+THUMB_DIR = os.environ.get("TEXTURETOOLKIT_THUMB_DIR") or os.path.join(
+    os.path.expanduser("~"), ".cache", "TextureToolkit", "thumbs"
+)
+SIZE_BUCKETS = (64, 128, 192, 256)
+
+
+def size_bucket(size):
+    for bucket in SIZE_BUCKETS:
+        if size <= bucket:
+            return bucket
+    return SIZE_BUCKETS[-1]
+
+
+def make_thumbnail(path, bucket):
+    with Image.open(path) as img:
+        # JPEG 直接按缩小比例解码，其他格式解码后先整数倍快速缩小
+        img.draft("RGB", (bucket, bucket))
+        factor = min(img.width, img.height) // (bucket * 2)
+        if factor > 1:
+            img = img.reduce(factor)
+        img = img.convert("RGBA")
+    img.thumbnail((bucket, bucket), Image.Resampling.BILINEAR)
+    return img
+
+
+def thumbnail_path(digest, bucket):
+    return os.path.join(THUMB_DIR, digest[:2], f"{digest}_{bucket}.png")
+
+
+def load_thumbnail(path, size):
+    # 先查磁盘缓存，没有再生成并写入
+    bucket = size_bucket(size)
+    cached = thumbnail_path(image_index().content_hash(path), bucket)
+    if os.path.exists(cached):
+        try:
+            with Image.open(cached) as img:
+                return img.convert("RGBA")
+        except OSError:
+            pass
+    img = make_thumbnail(path, bucket)
+    try:
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(suffix=".png", dir=os.path.dirname(cached))
+        with os.fdopen(fd, "wb") as f:
+            img.save(f, format="PNG", compress_level=1)
+        os.replace(tmp, cached)
+    except OSError:
+        pass
+    return img
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# 支持 python -m TextureToolkit ...，模块之间按脚本目录平铺导入
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from AtlasBatch import main
+
+if __name__ == "__main__":
+    sys.exit(main())
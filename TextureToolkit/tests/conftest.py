@@ -0,0 +1,7 @@
+import os
+import sys
+
+# 工具模块按平铺方式导入（与 main.py 相同），测试时把包目录加到搜索路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# 测试不写用户目录下的图片索引
+os.environ.setdefault("TEXTURETOOLKIT_INDEX", ":memory:")
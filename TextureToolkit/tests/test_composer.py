@@ -0,0 +1,37 @@
+import os
+
+import numpy as np
+from PIL import Image
+
+from AtlasComposer import AtlasComposer
+from AtlasEngine import RES_MERGE
+
+
+def _frames(folder, count):
+    paths = []
+    for i in range(count):
+        path = os.path.join(folder, f"f_{i}.png")
+        Image.new("RGBA", (8, 8), (i * 40, 100, 0, 255)).save(path)
+        paths.append(path)
+    return paths
+
+
+def test_deleted_frame_is_filled_and_reported(tmp_path):
+    # 帧文件被删除后增量合成不报错：该格用填充色，路径记在 missing 里
+    paths = _frames(str(tmp_path), 4)
+    fill = (10, 20, 30, 255)
+    composer = AtlasComposer()
+    composer.compose(paths, 2, 2, RES_MERGE, fill)
+    assert composer.missing == []
+    os.remove(paths[1])
+    assert composer.can_update(paths, 2, 2, RES_MERGE)
+    atlas = np.asarray(composer.compose(paths, 2, 2, RES_MERGE, fill))
+    assert composer.missing == [paths[1]]
+    assert (atlas[0:8, 8:16] == fill).all()
+    assert (atlas[0:8, 0:8] == (0, 100, 0, 255)).all()
+    assert composer.redrawn == 1
+    # 文件恢复后重绘该格
+    Image.new("RGBA", (8, 8), (255, 0, 0, 255)).save(paths[1])
+    atlas = np.asarray(composer.compose(paths, 2, 2, RES_MERGE, fill))
+    assert composer.missing == []
+    assert (atlas[0:8, 8:16] == (255, 0, 0, 255)).all()
@@ -0,0 +1,33 @@
+import random
+
+from PyQt6.QtCore import QModelIndex, QObject, pyqtSignal
+
+from Library.FrameListModel import FrameListModel
+
+
+class _Loader(QObject):
+    thumbnail_ready = pyqtSignal(str, object)
+
+
+def test_move_rows_matches_list_reorder():
+    # 交换、向前/向后拖拽多行，结果与列表上的删除再插入相同
+    model = FrameListModel(_Loader())
+    paths = [f"f_{i}.png" for i in range(50)]
+    model.set_paths(paths)
+    expected = list(paths)
+    rng = random.Random(0)
+    root = QModelIndex()
+    for _ in range(300):
+        count = rng.randint(1, 4)
+        row = rng.randint(0, len(paths) - count)
+        dest = rng.choice(
+            [d for d in range(len(paths) + 1) if not row <= d <= row + count]
+        )
+        assert model.moveRows(root, row, count, root, dest)
+        block = expected[row : row + count]
+        del expected[row : row + count]
+        at = dest - count if dest > row else dest
+        expected[at:at] = block
+        assert model.paths() == expected
+    # 目标在移动范围内时拒绝
+    assert not model.moveRows(root, 3, 2, root, 4)
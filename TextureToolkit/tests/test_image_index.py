@@ -0,0 +1,32 @@
+import os
+import sqlite3
+
+from PIL import Image
+
+from ImageIndex import ImageIndex, list_images
+
+
+def test_list_images_skips_hidden_temp_files(tmp_path):
+    # 保存过程中 AtomicFiles 写在同一文件夹里的临时文件不能当成帧
+    for name in ("f_2.png", "f_10.png", ".out.1a2b3c4d.tmp.png"):
+        Image.new("RGBA", (4, 4)).save(tmp_path / name)
+    names = [os.path.basename(p) for p in list_images(str(tmp_path))]
+    assert names == ["f_2.png", "f_10.png"]
+
+
+def test_locked_index_falls_back_to_reading_files(tmp_path):
+    # 另一个进程长时间持有写锁时，查询不报错，直接读文件头
+    db = str(tmp_path / "index.sqlite")
+    frame = tmp_path / "f.png"
+    Image.new("RGBA", (6, 4)).save(frame)
+    holder = sqlite3.connect(db)
+    ImageIndex(db)  # 建表
+    holder.execute("BEGIN EXCLUSIVE")
+    index = ImageIndex(db, timeout=0.05)
+    info = index.get(str(frame))
+    assert (info.width, info.height) == (6, 4)
+    assert index.content_hash(str(frame))
+    holder.rollback()
+    # 锁释放后正常写入索引
+    assert index.get(str(frame)).width == 6
+    assert holder.execute("SELECT COUNT(*) FROM images").fetchone()[0] == 1
@@ -0,0 +1,46 @@
+import struct
+
+import pytest
+from PIL import Image
+
+from BlockCompress import BC3, BC4, BC5
+from Ktx2Writer import (
+    KHR_DF_SAMPLE_LINEAR,
+    KHR_DF_TRANSFER_LINEAR,
+    KHR_DF_TRANSFER_SRGB,
+    VK_FORMATS,
+    write_ktx2,
+)
+
+
+def _read_dfd(path):
+    # 返回 (vkFormat, transfer, 各采样的通道字节)
+    data = path.read_bytes()
+    vk_format = struct.unpack_from("<I", data, 12)[0]
+    dfd_offset, dfd_length = struct.unpack_from("<2I", data, 48)
+    dfd = data[dfd_offset : dfd_offset + dfd_length]
+    transfer = dfd[14]
+    block_size = struct.unpack_from("<I", dfd, 8)[0] >> 16
+    channels = [dfd[4 + offset + 3] for offset in range(24, block_size, 16)]
+    return vk_format, transfer, channels
+
+
+@pytest.mark.parametrize("fmt", [BC4, BC5])
+def test_single_channel_formats_stay_linear_with_srgb(tmp_path, fmt):
+    # BC4/BC5 只有 UNORM 的 vkFormat，DFD 不能声明 sRGB
+    path = tmp_path / "atlas.ktx2"
+    write_ktx2(path, [Image.new("RGBA", (8, 8), (200, 100, 50, 255))], fmt, srgb=True)
+    vk_format, transfer, channels = _read_dfd(path)
+    assert vk_format == VK_FORMATS[fmt][0]
+    assert transfer == KHR_DF_TRANSFER_LINEAR
+    assert not any(channel & KHR_DF_SAMPLE_LINEAR for channel in channels)
+
+
+def test_srgb_format_declares_srgb_transfer(tmp_path):
+    path = tmp_path / "atlas.ktx2"
+    write_ktx2(path, [Image.new("RGBA", (8, 8), (200, 100, 50, 128))], BC3, srgb=True)
+    vk_format, transfer, channels = _read_dfd(path)
+    assert vk_format == VK_FORMATS[BC3][1]
+    assert transfer == KHR_DF_TRANSFER_SRGB
+    # alpha 采样标记为线性
+    assert channels[0] & KHR_DF_SAMPLE_LINEAR
@@ -0,0 +1,36 @@
+import json
+import os
+
+from PIL import Image
+
+from AtlasPages import write_pages
+
+
+def _frames(folder, names):
+    paths = []
+    for i, name in enumerate(names):
+        path = os.path.join(folder, name)
+        Image.new("RGBA", (8, 8), (i * 20, 0, 0, 255)).save(path)
+        paths.append(path)
+    return paths
+
+
+def test_paged_save_keeps_same_prefix_files(tmp_path):
+    # 源帧与输出同名前缀（fx_0001.png ...），分页保存时不能被当成旧页删除
+    folder = str(tmp_path)
+    paths = _frames(folder, [f"fx_{i:04d}.png" for i in range(1, 10)])
+    other = _frames(folder, ["fx_05.png"])[0]
+    target = os.path.join(folder, "fx.png")
+    write_pages(target, paths, 2, 2, workers=1)
+    assert os.path.exists(os.path.join(folder, "fx_03.png"))
+    write_pages(target, paths, 3, 2, workers=1)
+    for path in paths + [other]:
+        assert os.path.exists(path)
+    # 上次清单里的第 3 页这次不再写出，被删除
+    assert not os.path.exists(os.path.join(folder, "fx_03.png"))
+    with open(os.path.join(folder, "fx.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert [page["files"] for page in manifest["pages"]] == [
+        ["fx_01.png"],
+        ["fx_02.png"],
+    ]
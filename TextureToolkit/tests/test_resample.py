@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from Resample import (
+    RESAMPLE_BOX,
+    RESAMPLE_FILTERS,
+    RESAMPLE_LANCZOS,
+    resize_bands,
+)
+
+
+def _strips(src, rows):
+    return (src[y : y + rows] for y in range(0, len(src), rows))
+
+
+@pytest.mark.parametrize("policy", [RESAMPLE_BOX, RESAMPLE_LANCZOS])
+@pytest.mark.parametrize("dst_size", [(61, 250), (97, 401), (97, 900)])
+@pytest.mark.parametrize("rows", [7, 64, 256])
+def test_strips_match_whole_resize(policy, dst_size, rows):
+    # 非整数倍缩放：按行带缩放与整图 resize 最多差一个色阶
+    # 601 -> 250 时盒式滤波的窗口边缘正好落在输入行的边界上
+    rng = np.random.default_rng(0)
+    src = rng.integers(0, 256, (601, 97, 4), dtype=np.uint8)
+    img = Image.fromarray(src)
+    whole = np.asarray(img.resize(dst_size, RESAMPLE_FILTERS[policy]))
+    bands = resize_bands(_strips(src, rows), img.size, dst_size, policy)
+    out = np.concatenate(list(bands))
+    assert out.shape == whole.shape
+    assert np.abs(out.astype(int) - whole.astype(int)).max() <= 1